@@ -0,0 +1,3 @@
+from code_big_picture.api import BuildCancelled, abuild, build
+
+__all__ = ["BuildCancelled", "abuild", "build"]
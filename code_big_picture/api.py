@@ -0,0 +1,152 @@
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import Executor
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, Optional, Sequence, Union
+
+from code_big_picture.parser import CodeParser, Event, build_structure
+from code_big_picture.renderer import SVGRenderer
+
+# progress(stage, done, total): stage "parse" counts files (total unknown while
+# the walk streams, so None) and stage "layout" counts nodes laid out of the total
+ProgressCallback = Callable[[str, int, Optional[int]], None]
+Output = Union[None, str, "os.PathLike[str]", BinaryIO]
+
+# Bytes handed to a writer per write() call
+WRITE_CHUNK = 1024 * 1024
+
+
+class BuildCancelled(Exception):
+    """Raised by ``build`` when its ``cancel`` event is set before it finishes."""
+
+
+def build(path: Union[str, "os.PathLike[str]"], output: Output = None, *,
+          progress: Optional[ProgressCallback] = None, cancel: Optional[threading.Event] = None,
+          color_by: Optional[str] = None, profile_data: Sequence[str] = (), max_nodes: Optional[int] = None,
+          executor: Optional[Executor] = None, readers: int = 0, parse_timeout: Optional[float] = None,
+          parse_memory: Optional[int] = None, **render_options: Any) -> Optional[bytes]:
+    """Parses and renders one project (or archive) into the interactive HTML map.
+
+    The library counterpart of ``main.py``: nothing is printed. ``output``
+    may be None to get the page back as UTF-8 bytes, a file path, or a
+    binary writer the page is streamed to in chunks. ``color_by`` defaults
+    to ``type``, or to ``cumtime``/``alloc`` when ``profile_data`` is given.
+    ``parse_memory`` is in bytes. ``executor`` may be a process or thread
+    pool; it parses files and lays out subtrees, each task on its own copy
+    of the renderer settings. Remaining keyword arguments go to
+    SVGRenderer. Cancellation is cooperative: ``cancel`` is checked after
+    every parsed file and every reported layout step, raising
+    BuildCancelled. Errors from ``progress`` propagate the same way.
+    """
+    if not Path(path).exists():
+        raise FileNotFoundError(f"Path '{path}' does not exist")
+    structure = _parse(path, progress, cancel, executor=executor, readers=readers,
+                       timeout=parse_timeout, max_memory=parse_memory)
+    html_output = _render(structure, progress, cancel, color_by, profile_data, max_nodes,
+                          dict(render_options, executor=executor))
+    return _write(html_output.encode("utf-8"), output)
+
+
+async def abuild(path: Union[str, "os.PathLike[str]"], output: Any = None, *,
+                 progress: Optional[ProgressCallback] = None, **options: Any) -> Optional[bytes]:
+    """Async ``build``: parsing and rendering run off the event loop.
+
+    The build runs in the loop's default thread pool, so a service can
+    build many maps at once without blocking its loop; a process
+    ``executor`` option still spreads file parsing and subtree layout over
+    processes. ``progress`` is called on the event loop thread. Cancelling
+    the awaiting task sets the build's cancel event, and the worker thread
+    stops at its next checkpoint. ``output`` may also be an asyncio
+    StreamWriter, or anything with ``write`` and an awaitable ``drain``.
+    Other options are as for ``build``.
+    """
+    loop = asyncio.get_running_loop()
+    cancel = threading.Event()
+
+    def report_on_loop(stage: str, done: int, total: Optional[int]) -> None:
+        loop.call_soon_threadsafe(progress, stage, done, total)
+
+    report = report_on_loop if progress is not None else None
+    try:
+        data = await loop.run_in_executor(
+            None, functools.partial(build, path, None, progress=report, cancel=cancel, **options))
+    except asyncio.CancelledError:
+        cancel.set()
+        raise
+
+    if hasattr(output, "drain"):
+        for start in range(0, len(data), WRITE_CHUNK):
+            output.write(data[start:start + WRITE_CHUNK])
+            await output.drain()
+        return None
+    if output is not None and not hasattr(output, "write"):
+        return await loop.run_in_executor(None, _write, data, output)
+    return _write(data, output)
+
+
+def _check(cancel: Optional[threading.Event]) -> None:
+    if cancel is not None and cancel.is_set():
+        raise BuildCancelled("build cancelled")
+
+
+def _parse(path: Union[str, "os.PathLike[str]"], progress: Optional[ProgressCallback],
+           cancel: Optional[threading.Event], **parser_options: Any) -> Dict[str, Any]:
+    """Parses through iter_parse so progress and cancellation are seen file by file."""
+    _check(cancel)
+    parser = CodeParser(str(path), **parser_options)
+
+    def watched(events: Iterable[Event]) -> Iterator[Event]:
+        files = 0
+        for event, node in events:
+            yield event, node
+            if event in ("module", "error"):
+                files += 1
+                _check(cancel)
+                if progress is not None:
+                    progress("parse", files, None)
+
+    iterator = parser.iter_parse()
+    try:
+        return build_structure(watched(iterator))
+    finally:
+        iterator.close()
+
+
+def _render(structure: Dict[str, Any], progress: Optional[ProgressCallback], cancel: Optional[threading.Event],
+            color_by: Optional[str], profile_data: Sequence[str], max_nodes: Optional[int],
+            render_options: Dict[str, Any]) -> str:
+    """Applies profiles and the node budget, then renders with layout progress."""
+    _check(cancel)
+    if profile_data:
+        from code_big_picture.profiling import apply_profile
+        for profile_path in profile_data:
+            kind, _ = apply_profile(structure, profile_path)
+            if color_by is None:
+                color_by = "cumtime" if kind == "time" else "alloc"
+    if max_nodes:
+        from code_big_picture.lod import apply_node_budget
+        structure = apply_node_budget(structure, max_nodes)
+
+    def layout_progress(done: int, total: int) -> None:
+        _check(cancel)
+        if progress is not None:
+            progress("layout", done, total)
+
+    watch = layout_progress if progress is not None or cancel is not None else None
+    return SVGRenderer(structure, color_by=color_by or "type", progress=watch, **render_options).render()
+
+
+def _write(data: bytes, output: Output) -> Optional[bytes]:
+    """Returns ``data`` when there is no output, else writes it to a path or binary writer."""
+    if output is None:
+        return data
+    if hasattr(output, "write"):
+        for start in range(0, len(data), WRITE_CHUNK):
+            output.write(data[start:start + WRITE_CHUNK])
+        return None
+    Path(output).parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "wb") as f:
+        f.write(data)
+    return None
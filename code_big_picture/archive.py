@@ -0,0 +1,48 @@
+import tarfile
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import Callable, Iterator, Tuple
+
+ZIP_SUFFIXES = (".zip", ".whl", ".egg", ".pyz")
+TAR_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+
+# (path parts inside the archive, callable returning the member's bytes)
+Member = Tuple[Tuple[str, ...], Callable[[], bytes]]
+
+
+def is_archive(path: Path) -> bool:
+    """Whether ``path`` is a file CodeParser should read as an archive."""
+    name = path.name.lower()
+    return path.is_file() and name.endswith(ZIP_SUFFIXES + TAR_SUFFIXES)
+
+
+def iter_members(path: Path) -> Iterator[Member]:
+    """Yields the regular files of a zip/wheel or (compressed) tar archive in archive order.
+
+    Tar archives are read as a stream, so a member's reader is only valid
+    until the iteration advances. Member paths are normalized to their parts;
+    absolute paths and ``..`` components are skipped rather than trusted.
+    """
+    if path.name.lower().endswith(ZIP_SUFFIXES):
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if info.is_dir():
+                    continue
+                parts = _member_parts(info.filename)
+                if parts:
+                    yield parts, (lambda info=info: archive.read(info))
+    else:
+        with tarfile.open(path, mode="r|*") as archive:
+            for info in archive:
+                if not info.isfile():
+                    continue
+                parts = _member_parts(info.name)
+                if parts:
+                    yield parts, (lambda info=info: archive.extractfile(info).read())
+
+
+def _member_parts(name: str) -> Tuple[str, ...]:
+    pure = PurePosixPath(name)
+    if pure.is_absolute() or ".." in pure.parts:
+        return ()
+    return tuple(part for part in pure.parts if part != ".")
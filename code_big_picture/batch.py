@@ -0,0 +1,108 @@
+import os
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+from code_big_picture.parser import CodeParser, ParseCache
+from code_big_picture.renderer import SVGRenderer
+from code_big_picture.render_cache import RenderCache
+
+
+def load_manifest(manifest_path: str) -> Dict[str, Any]:
+    """Reads a batch manifest.
+
+    Expected layout::
+
+        workers = 8              # optional, defaults to os.cpu_count()
+        cache_dir = ".map-cache" # optional, render cache shared by all targets
+
+        [[target]]
+        path = "services/auth"
+        output = "maps/auth.html"
+
+    Relative paths are resolved against the manifest's directory.
+    """
+    if tomllib is None:
+        raise RuntimeError("Reading TOML manifests requires Python 3.11+ or the 'tomli' package")
+
+    manifest_file = Path(manifest_path).resolve()
+    with open(manifest_file, "rb") as f:
+        data = tomllib.load(f)
+
+    base = manifest_file.parent
+    targets = []
+    for entry in data.get("target", []):
+        if "path" not in entry or "output" not in entry:
+            raise ValueError(f"Manifest target is missing 'path' or 'output': {entry}")
+        targets.append({
+            "path": str((base / entry["path"]).resolve()),
+            "output": str((base / entry["output"]).resolve()),
+        })
+
+    cache_dir = data.get("cache_dir")
+    if cache_dir is not None:
+        cache_dir = str((base / cache_dir).resolve())
+
+    return {"workers": data.get("workers"), "cache_dir": cache_dir, "targets": targets}
+
+
+def _render_to_file(structure: Dict[str, Any], output_path: str, cache_dir: Optional[str] = None) -> float:
+    """Renders one structure and writes it out; runs inside a pool worker."""
+    start = time.perf_counter()
+    cache = RenderCache(cache_dir) if cache_dir else None
+    html_output = SVGRenderer(structure, cache=cache).render()
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write(html_output)
+    return time.perf_counter() - start
+
+
+def run_batch(targets: List[Dict[str, str]], workers: Optional[int] = None,
+              executor: Optional[Executor] = None, cache_dir: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Parses and renders every target in one process with a shared pool and cache.
+
+    Files of all roots are parsed on the same worker pool, and each root's
+    render is handed to that pool while the next root is being parsed, so
+    wall time is bounded by cores rather than by interpreter launches. With
+    ``cache_dir`` all renders share one subtree render cache.
+    Returns one result dict per target, in manifest order.
+    """
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=workers or os.cpu_count())
+
+    cache: ParseCache = {}
+    results: List[Dict[str, Any]] = []
+    renders: List[Tuple[Dict[str, Any], Future]] = []
+    try:
+        for target in targets:
+            result = {"path": target["path"], "output": target["output"], "error": None}
+            results.append(result)
+            if not Path(target["path"]).is_dir():
+                result["error"] = f"Path '{target['path']}' does not exist"
+                continue
+
+            start = time.perf_counter()
+            structure = CodeParser(target["path"], executor=executor, cache=cache).parse()
+            result["parse_seconds"] = time.perf_counter() - start
+            renders.append((result, executor.submit(_render_to_file, structure, target["output"], cache_dir)))
+
+        for result, future in renders:
+            try:
+                result["render_seconds"] = future.result()
+            except Exception as e:
+                result["error"] = str(e)
+    finally:
+        if own_executor:
+            executor.shutdown()
+
+    return results
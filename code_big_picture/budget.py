@@ -0,0 +1,84 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from code_big_picture.lod import apply_node_budget, count_nodes
+from code_big_picture.renderer import SVGRenderer
+
+SIZE_SUFFIXES = {"k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}
+
+
+def parse_size(text: str) -> int:
+    """Parses a byte count such as ``5000000``, ``800K`` or ``20M``."""
+    text = text.strip().lower().rstrip("b")
+    factor = SIZE_SUFFIXES.get(text[-1:], 1)
+    if factor != 1:
+        text = text[:-1]
+    try:
+        return int(float(text) * factor)
+    except ValueError:
+        raise ValueError(f"Invalid size '{text}'") from None
+
+
+def budget_violations(report: Dict[str, Any], max_bytes: Optional[int] = None,
+                      max_elements: Optional[int] = None) -> List[str]:
+    """Returns a message per exceeded budget; empty when the page fits."""
+    violations = []
+    if max_bytes is not None and report["total_bytes"] > max_bytes:
+        violations.append(f"page is {report['total_bytes']:,} bytes, budget {max_bytes:,}")
+    if max_elements is not None and report["elements"] > max_elements:
+        violations.append(f"page has {report['elements']:,} elements, budget {max_elements:,}")
+    return violations
+
+
+def render_within_budget(structure: Dict[str, Any], max_bytes: Optional[int] = None,
+                         max_elements: Optional[int] = None, aggregate: bool = False, max_rounds: int = 8,
+                         **options: Any) -> Tuple[str, Dict[str, Any], Dict[str, Any]]:
+    """Renders ``structure`` and measures it, shrinking it to fit the budgets if asked.
+
+    With ``aggregate``, an over-budget page is re-rendered from a copy in
+    which the deepest and largest subtrees are replaced by aggregate boxes
+    (see ``lod.apply_node_budget``), with the node budget scaled by how far
+    over the page is, until it fits, stops shrinking or ``max_rounds`` runs
+    out. Collapsing alone would not help: collapsed content is still in
+    the page. For the same reason, under a byte budget aggregates are drawn
+    without their on-click detail unless ``aggregate_detail`` says
+    otherwise. Returns ``(html, size report, structure rendered)``; the
+    caller checks ``budget_violations`` on the report.
+    """
+    options.setdefault("aggregate_detail", max_bytes is None)
+    current = structure
+    for _ in range(max_rounds + 1):
+        renderer = SVGRenderer(current, measure=True, **options)
+        html_output = renderer.render()
+        report = renderer.size_report(html_output)
+        if not aggregate or not budget_violations(report, max_bytes, max_elements):
+            break
+
+        # Only the map itself shrinks; the page chrome around it is fixed
+        ratio = 1.0
+        if max_bytes is not None and report["total_bytes"] > max_bytes:
+            ratio = min(ratio, (max_bytes - report["page_bytes"]) / max(1, report["map_bytes"]))
+        if max_elements is not None and report["elements"] > max_elements:
+            ratio = min(ratio, max_elements / report["elements"])
+        target = min(int(report["nodes"] * ratio * 0.95), report["nodes"] - 1)
+        if target < 1:
+            break
+        smaller = apply_node_budget(structure, target)
+        if count_nodes(smaller) >= report["nodes"]:
+            break
+        current = smaller
+    return html_output, report, current
+
+
+def format_size_report(report: Dict[str, Any]) -> str:
+    """Formats a size report for the terminal."""
+    lines = [
+        f"Page size: {report['total_bytes']:,} bytes ({report['map_bytes']:,} map, {report['page_bytes']:,} page chrome)",
+        f"Elements: {report['elements']:,} for {report['nodes']:,} nodes; "
+        f"estimated browser memory {report['estimated_memory_bytes'] / 1024 ** 2:,.0f} MB",
+        "Bytes by node type: " + ", ".join(f"{node_type} {size:,}" for node_type, size in report["bytes_by_type"].items()),
+    ]
+    if report["largest_subtrees"]:
+        lines.append("Largest subtrees:")
+        for entry in report["largest_subtrees"]:
+            lines.append(f"  {entry['bytes']:>12,}  {entry['path']} ({entry['type']}, {entry['nodes']:,} nodes)")
+    return "\n".join(lines)
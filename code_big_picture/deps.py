@@ -0,0 +1,137 @@
+from collections import defaultdict
+from typing import Dict, List, Any, Optional, Set, Tuple
+
+
+class DependencyGraph:
+    """Module-level import graph with forward and reverse adjacency indexes.
+
+    Modules are keyed by dotted paths relative to the project root
+    (``core.engine``); a package's ``__init__.py`` is keyed by the package path.
+    """
+
+    def __init__(self):
+        # dotted module path -> dotted path of its enclosing package/directory
+        self.modules: Dict[str, str] = {}
+        self.edges: Dict[str, Set[str]] = defaultdict(set)
+        self.reverse: Dict[str, Set[str]] = defaultdict(set)
+
+    def add_module(self, module: str, container: str) -> None:
+        self.modules[module] = container
+
+    def add_edge(self, source: str, target: str) -> None:
+        if source != target:
+            self.edges[source].add(target)
+            self.reverse[target].add(source)
+
+    def dependencies(self, module: str) -> Set[str]:
+        """Modules imported by ``module``."""
+        return self.edges.get(module, set())
+
+    def dependents(self, module: str) -> Set[str]:
+        """Modules importing ``module``."""
+        return self.reverse.get(module, set())
+
+    def edge_count(self) -> int:
+        return sum(len(targets) for targets in self.edges.values())
+
+    def bundled(self) -> List[Tuple[str, str, int]]:
+        """Collapses module edges onto their enclosing packages.
+
+        Returns ``(source_package, target_package, module_edge_count)`` rows,
+        heaviest first, without self-loops.
+        """
+        weights: Dict[Tuple[str, str], int] = defaultdict(int)
+        for source, targets in self.edges.items():
+            source_pkg = self.modules[source]
+            for target in targets:
+                target_pkg = self.modules[target]
+                if source_pkg != target_pkg:
+                    weights[(source_pkg, target_pkg)] += 1
+        return sorted(((s, t, w) for (s, t), w in weights.items()), key=lambda row: (-row[2], row))
+
+
+def build_dependency_graph(structure: Dict[str, Any]) -> DependencyGraph:
+    """Resolves the ``imports`` recorded by CodeParser into a DependencyGraph.
+
+    Relative imports are resolved against the package layout found by
+    ``CodeParser``. Absolute imports are matched against project modules,
+    also allowing the root package name and plain source directories such as
+    ``src/`` to be left out; anything else is treated as external and dropped.
+    """
+    graph = DependencyGraph()
+    module_imports: List[Tuple[str, bool, List[List[Any]]]] = []
+    # import name -> dotted module path; several spellings can map to one module
+    index: Dict[str, str] = {}
+
+    root_is_package = any(
+        child.get("name") == "__init__.py" and child.get("type") == "module"
+        for child in structure.get("children", [])
+    )
+    root_name = structure.get("name", "")
+
+    def register(parts: List[str], plain_dirs: int, module: str) -> None:
+        # Plain (non-package) leading directories act like sys.path entries
+        for skip in range(plain_dirs + 1):
+            alias = ".".join(parts[skip:])
+            if alias:
+                index.setdefault(alias, module)
+        if root_is_package:
+            index.setdefault(".".join([root_name] + parts), module)
+
+    def walk(node: Dict[str, Any], parts: List[str], plain_dirs: int) -> None:
+        for child in node.get("children", []):
+            child_type = child.get("type")
+            if child_type in ("package", "directory"):
+                child_parts = parts + [child["name"]]
+                leading_plain = plain_dirs + 1 if child_type == "directory" and plain_dirs == len(parts) else plain_dirs
+                walk(child, child_parts, leading_plain)
+            elif child_type == "module" and child["name"].endswith(".py"):
+                stem = child["name"][:-3]
+                is_init = stem == "__init__"
+                module_parts = parts if is_init else parts + [stem]
+                module = ".".join(module_parts)
+                graph.add_module(module, ".".join(parts))
+                register(module_parts, plain_dirs, module)
+                module_imports.append((module, is_init, child.get("imports", [])))
+
+    walk(structure, [], 0)
+
+    def in_project(dotted: str) -> Optional[str]:
+        # Relative names are already rooted at the project
+        return dotted if dotted in graph.modules else None
+
+    for module, is_init, imports in module_imports:
+        package_parts = module.split(".") if module else []
+        if not is_init:
+            package_parts = package_parts[:-1]
+
+        for name, level, names in imports:
+            if level:
+                if level - 1 > len(package_parts):
+                    continue
+                base = package_parts[:len(package_parts) - (level - 1)]
+                name = ".".join(base + ([name] if name else []))
+                lookup = in_project
+            else:
+                lookup = index.get
+
+            targets = [_resolve(lookup, f"{name}.{sub}" if name else sub) for sub in names]
+            targets = [t for t in targets if t is not None]
+            if not targets:
+                target = _resolve(lookup, name)
+                targets = [target] if target is not None else []
+            for target in targets:
+                graph.add_edge(module, target)
+
+    return graph
+
+
+def _resolve(lookup, dotted: str) -> Optional[str]:
+    """Finds the longest known module prefix of ``dotted`` (``a.b.attr`` -> ``a.b``)."""
+    parts = dotted.split(".") if dotted else []
+    while parts:
+        found = lookup(".".join(parts))
+        if found is not None:
+            return found
+        parts.pop()
+    return lookup("")
@@ -0,0 +1,161 @@
+import hashlib
+import json
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from code_big_picture.lod import count_types, summarize_counts
+from code_big_picture.parser import DIR_TYPES, CodeParser
+from code_big_picture.render_cache import NON_CONTENT_KEYS
+
+# Order of the counts in a diff summary
+DIFF_STATUSES = ("added", "removed", "changed", "unchanged")
+
+
+def load_side(path: str) -> Dict[str, Any]:
+    """Loads one side of a diff.
+
+    ``path`` is a project directory or archive (parsed now), a saved
+    structure ``.json`` (a ``--since-git`` sidecar or a bare structure),
+    or an HTML map whose sidecar sits next to it.
+    """
+    source = Path(path)
+    if source.suffix == ".html":
+        from code_big_picture import incremental
+        saved = incremental.load_structure(path)
+        if saved is None:
+            raise ValueError(f"No saved structure next to '{path}'; build the map with --since-git to keep one")
+        return saved["structure"]
+    if source.suffix == ".json":
+        with open(source, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data["structure"] if "type" not in data and "structure" in data else data
+    return CodeParser(path).parse()
+
+
+def _own_fields(node: Dict[str, Any], span: bool = True) -> Dict[str, Any]:
+    """A node's scalar fields with its line range reduced to a length, so moved code compares equal."""
+    fields = {k: v for k, v in node.items() if k not in NON_CONTENT_KEYS and k not in ("lines", "diff")}
+    lines = node.get("lines")
+    if span and lines:
+        fields["span"] = lines[1] - lines[0]
+    return fields
+
+
+def _content_hashes(structure: Dict[str, Any]) -> Dict[int, str]:
+    """Merkle hashes of every subtree keyed by ``id(node)``, position-independent.
+
+    Like ``render_cache.compute_hashes`` but without touching the nodes,
+    with line ranges counted by length only, with function source digests
+    and without the root's name.
+    """
+    order = []
+    stack = [structure]
+    while stack:
+        node = stack.pop()
+        order.append(node)
+        stack.extend(node.get("children", []))
+
+    hashes: Dict[int, str] = {}
+    for node in reversed(order):
+        fields = _own_fields(node)
+        if node is structure:
+            # The roots of two checkouts usually differ in name only
+            fields.pop("name", None)
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(json.dumps(fields, sort_keys=True, separators=(",", ":")).encode("utf-8"))
+        for child in node.get("children", []):
+            digest.update(hashes[id(child)].encode("ascii"))
+        hashes[id(node)] = digest.hexdigest()
+    return hashes
+
+
+def _match_key(node: Dict[str, Any]) -> Tuple[str, str]:
+    # A directory that gains an __init__.py becomes a package: the same place, changed
+    node_type = node.get("type", "unknown")
+    return node.get("name", ""), "dir" if node_type in DIR_TYPES else node_type
+
+
+def _header(node: Dict[str, Any]) -> Dict[str, Any]:
+    copy = {"name": node.get("name", "Unknown"), "type": node.get("type", "unknown")}
+    copy.update((k, v) for k, v in node.items() if k not in NON_CONTENT_KEYS and k != "diff")
+    return copy
+
+
+def diff_structures(old: Dict[str, Any], new: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, int]]:
+    """Builds a structure holding only what differs between two parsed structures.
+
+    Children are matched by name and kind under matched parents, and
+    subtrees are compared by content hash. That is linear in the size of
+    both trees, and a matched subtree with equal hashes is never entered.
+    Added and removed subtrees are kept whole, marked with ``"diff":
+    "added"`` or ``"removed"``. A matched node is marked ``"changed"``
+    when its own fields differ or when nothing below it explains why its
+    hash differs. Containers that only lead to changes stay unmarked.
+    Each container's identical children are pruned into one
+    ``"unchanged"`` aggregate. Line ranges count by length only, so code
+    that merely moved is not a change, while the parser's source digest
+    catches functions edited within the same lines. Returns the diff
+    structure, rooted at ``new``'s root and carrying a ``diff_summary``,
+    and the number of nodes per status; neither input is modified.
+    """
+    old_hashes = _content_hashes(old)
+    new_hashes = _content_hashes(new)
+    stats: Counter = Counter()
+
+    def mark(node: Dict[str, Any], status: str) -> Dict[str, Any]:
+        copy = _header(node)
+        copy["diff"] = status
+        stats[status] += 1
+        if node.get("children"):
+            copy["children"] = [mark(child, status) for child in node["children"]]
+        return copy
+
+    def pair(before: Dict[str, Any], after: Dict[str, Any], is_root: bool) -> Dict[str, Any]:
+        remaining: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        for child in reversed(before.get("children", [])):
+            remaining.setdefault(_match_key(child), []).append(child)
+
+        children = []
+        unchanged: Counter = Counter()
+        for child in after.get("children", []):
+            matches = remaining.get(_match_key(child))
+            if not matches:
+                children.append(mark(child, "added"))
+            elif old_hashes[id(matches[-1])] == new_hashes[id(child)]:
+                matches.pop()
+                unchanged[child.get("type", "unknown")] += 1
+                unchanged.update(count_types(child))
+            else:
+                children.append(pair(matches.pop(), child, False))
+        matched = {id(child) for group in remaining.values() for child in group}
+        children.extend(mark(child, "removed") for child in before.get("children", []) if id(child) in matched)
+
+        node = _header(after)
+        before_fields, after_fields = _own_fields(before, span=False), _own_fields(after, span=False)
+        if is_root:
+            # The roots of two checkouts usually differ in name only
+            before_fields.pop("name", None)
+            after_fields.pop("name", None)
+        if before_fields != after_fields or (not children and old_hashes[id(before)] != new_hashes[id(after)]):
+            node["diff"] = "changed"
+            stats["changed"] += 1
+        if unchanged:
+            total = sum(unchanged.values())
+            stats["unchanged"] += total
+            children.append({
+                "name": f"{total} unchanged",
+                "type": "aggregate",
+                "kind": "unchanged",
+                "summary": summarize_counts(unchanged),
+                "counts": dict(unchanged),
+                "diff": "unchanged",
+            })
+        if children or after.get("children") is not None:
+            node["children"] = children
+        return node
+
+    result = pair(old, new, True)
+    counts = {status: stats[status] for status in DIFF_STATUSES}
+    result["diff_summary"] = ", ".join(f"{counts[status]} {status}" for status in DIFF_STATUSES)
+    return result, counts
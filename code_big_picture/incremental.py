@@ -0,0 +1,141 @@
+import bisect
+import json
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+
+from code_big_picture.parser import SKIPPED_DIR_PREFIXES, CodeParser
+
+
+def structure_path(output_path: str) -> Path:
+    """Returns the sidecar file that stores the structure behind an HTML map."""
+    return Path(str(output_path) + ".json")
+
+
+def save_structure(output_path: str, structure: Dict[str, Any], commit: Optional[str]) -> None:
+    """Stores the parsed structure and the commit it was built from next to the map."""
+    with open(structure_path(output_path), "w", encoding="utf-8") as f:
+        json.dump({"commit": commit, "structure": structure}, f, separators=(",", ":"))
+
+
+def load_structure(output_path: str) -> Optional[Dict[str, Any]]:
+    """Loads a sidecar written by ``save_structure``, or None when there is none."""
+    path = structure_path(output_path)
+    if not path.exists():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _git(root: Path, *args: str) -> str:
+    result = subprocess.run(
+        ["git", *args], cwd=str(root), capture_output=True, text=True, check=False
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"git {' '.join(args)} failed: {result.stderr.strip()}")
+    return result.stdout
+
+
+def git_head(root: str) -> Optional[str]:
+    """Returns the commit checked out at ``root``, or None outside a git work tree."""
+    try:
+        return _git(Path(root), "rev-parse", "HEAD").strip()
+    except (RuntimeError, OSError):
+        return None
+
+
+def git_changed_files(root: str, rev: str) -> Tuple[List[str], List[str]]:
+    """Lists .py files changed and deleted between ``rev`` and the work tree.
+
+    Untracked files count as changed unless git ignores them. Paths are
+    relative to ``root``. Renames are reported as a delete plus an add.
+    """
+    output = _git(Path(root), "diff", "--name-status", "--no-renames", "--relative", rev, "--", "*.py")
+    changed, deleted = [], []
+    for line in output.splitlines():
+        if not line.strip():
+            continue
+        status, path = line.split("\t", 1)
+        if status.startswith("D"):
+            deleted.append(path)
+        else:
+            changed.append(path)
+    untracked = _git(Path(root), "ls-files", "--others", "--exclude-standard", "--", "*.py")
+    changed.extend(path for path in untracked.splitlines() if path.strip())
+    return changed, deleted
+
+
+def _is_skipped(parts: Tuple[str, ...]) -> bool:
+    return any(part.startswith(SKIPPED_DIR_PREFIXES) for part in parts[:-1])
+
+
+def _find_child(node: Dict[str, Any], name: str) -> Tuple[int, Optional[Dict[str, Any]]]:
+    """Locates ``name`` among children kept in the parser's sorted-by-name order."""
+    children = node.setdefault("children", [])
+    names = [child["name"] for child in children]
+    index = bisect.bisect_left(names, name)
+    if index < len(children) and children[index]["name"] == name:
+        return index, children[index]
+    return index, None
+
+
+def patch_structure(structure: Dict[str, Any], parser: CodeParser,
+                    changed: List[str], deleted: List[str]) -> Dict[str, Any]:
+    """Patches a stored structure in place with re-parsed changed files.
+
+    Only the listed files are read. Directories are created or pruned along
+    the way so the result matches what a full ``parser.parse()`` would build.
+    """
+    root = parser.root_path
+
+    for rel_path in deleted:
+        parts = Path(rel_path).parts
+        if _is_skipped(parts):
+            continue
+        chain = [structure]
+        for part in parts[:-1]:
+            _, child = _find_child(chain[-1], part)
+            if child is None:
+                break
+            chain.append(child)
+        else:
+            index, child = _find_child(chain[-1], parts[-1])
+            if child is not None:
+                del chain[-1]["children"][index]
+            # Drop directories left empty, mirroring iter_parse
+            for parent, node in zip(reversed(chain[:-1]), reversed(chain[1:])):
+                if node["children"]:
+                    break
+                index, _ = _find_child(parent, node["name"])
+                del parent["children"][index]
+            _refresh_dir_types(chain[1:], root, parts)
+
+    for rel_path in changed:
+        parts = Path(rel_path).parts
+        file_path = root.joinpath(*parts)
+        if _is_skipped(parts) or not file_path.exists():
+            continue
+        chain = [structure]
+        for part in parts[:-1]:
+            index, child = _find_child(chain[-1], part)
+            if child is None:
+                child = {"name": part, "type": "directory", "children": []}
+                chain[-1]["children"].insert(index, child)
+            chain.append(child)
+        index, existing = _find_child(chain[-1], parts[-1])
+        module_node = parser._parse_file(file_path)
+        if existing is None:
+            chain[-1]["children"].insert(index, module_node)
+        else:
+            chain[-1]["children"][index] = module_node
+        _refresh_dir_types(chain[1:], root, parts)
+
+    return structure
+
+
+def _refresh_dir_types(dir_nodes: List[Dict[str, Any]], root: Path, parts: Tuple[str, ...]) -> None:
+    """Re-derives package/directory types along a path (an __init__.py may have come or gone)."""
+    current = root
+    for node, part in zip(dir_nodes, parts[:-1]):
+        current = current / part
+        node["type"] = "package" if (current / "__init__.py").exists() else "directory"
@@ -0,0 +1,161 @@
+import os
+import signal
+import time
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Seconds a task may run past its soft timeout before its worker is killed
+HARD_TIMEOUT_GRACE = 5.0
+
+
+class TaskTimeout(TimeoutError):
+    """Raised inside a worker when a task exceeds its wall-time limit."""
+
+
+def limit_memory(max_memory: Optional[int]) -> None:
+    """Caps this process's address space at its current size plus ``max_memory`` bytes.
+
+    Used as the pool initializer for isolated parse workers, and through
+    ``memory_limited`` by the out-of-core pipeline. Allocations past the
+    cap raise MemoryError instead of pushing the machine into swap.
+    """
+    if not max_memory or resource is None:
+        return
+    baseline = 0
+    try:
+        with open("/proc/self/statm") as f:
+            baseline = int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        pass
+    soft, hard = resource.getrlimit(resource.RLIMIT_AS)
+    limit = baseline + max_memory
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+@contextmanager
+def memory_limited(max_memory: Optional[int]) -> Iterator[None]:
+    """Applies ``limit_memory`` for the duration of a block, then restores the previous cap."""
+    previous = resource.getrlimit(resource.RLIMIT_AS) if max_memory and resource is not None else None
+    limit_memory(max_memory)
+    try:
+        yield
+    finally:
+        if previous is not None:
+            resource.setrlimit(resource.RLIMIT_AS, previous)
+
+
+def _call_with_timeout(fn: Callable[[Any], Any], item: Any, timeout: Optional[float]) -> Any:
+    """Runs ``fn(item)`` in a worker, interrupting Python-level work after ``timeout`` seconds."""
+    if not timeout or not hasattr(signal, "setitimer"):
+        return fn(item)
+
+    def on_alarm(signum, frame):
+        raise TaskTimeout(f"exceeded {timeout:g}s time limit")
+
+    previous = signal.signal(signal.SIGALRM, on_alarm)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return fn(item)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def _kill_pool(pool: ProcessPoolExecutor) -> None:
+    for process in list((getattr(pool, "_processes", None) or {}).values()):
+        process.terminate()
+    pool.shutdown(wait=True, cancel_futures=True)
+
+
+def run_isolated(fn: Callable[[Any], Any], items: Sequence[Any], workers: int,
+                 on_failure: Callable[[Any, str], Any], timeout: Optional[float] = None,
+                 max_memory: Optional[int] = None) -> List[Any]:
+    """Maps ``fn`` over ``items`` in crash-isolated worker processes.
+
+    Workers run with their address space capped at ``max_memory`` bytes above
+    their baseline, and each call gets ``timeout`` seconds of wall time: a
+    SIGALRM raises ``TaskTimeout`` inside ``fn``, and a worker stuck in C code
+    for ``HARD_TIMEOUT_GRACE`` more seconds is killed. When a worker dies
+    (segfault, OOM kill, hang) the pool is replaced; if it is unclear which
+    in-flight item was responsible, those items are retried one at a time so
+    only the culprit is lost. Items that cannot complete are mapped through
+    ``on_failure(item, reason)``. Results are returned in input order.
+    """
+    results: List[Any] = [None] * len(items)
+    todo = deque(range(len(items)))
+    suspects: List[int] = []
+    hard_timeout = timeout + HARD_TIMEOUT_GRACE if timeout else None
+
+    while todo:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=limit_memory, initargs=(max_memory,))
+        # One task per worker, so a task's submit time is close to its start time
+        inflight: Dict[Any, int] = {}
+        started: Dict[Any, float] = {}
+        try:
+            while todo or inflight:
+                while todo and len(inflight) < workers:
+                    index = todo.popleft()
+                    future = pool.submit(_call_with_timeout, fn, items[index], timeout)
+                    inflight[future] = index
+                    started[future] = time.monotonic()
+
+                wait_for = None
+                if hard_timeout:
+                    oldest = min(started.values())
+                    wait_for = max(0.0, oldest + hard_timeout - time.monotonic())
+                done, _ = wait(inflight, timeout=wait_for, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    index = inflight.pop(future)
+                    started.pop(future)
+                    try:
+                        results[index] = future.result()
+                    except BrokenProcessPool:
+                        inflight[future] = index
+                        raise
+                    except TaskTimeout as e:
+                        results[index] = on_failure(items[index], str(e))
+                    except MemoryError:
+                        results[index] = on_failure(items[index], "exceeded memory limit")
+
+                if hard_timeout and not done:
+                    now = time.monotonic()
+                    hung = [f for f, t in started.items() if now - t >= hard_timeout]
+                    if hung:
+                        for future in hung:
+                            index = inflight.pop(future)
+                            results[index] = on_failure(items[index], f"exceeded {timeout:g}s time limit")
+                        # Killing the pool also takes down innocent in-flight tasks; requeue them
+                        todo.extendleft(reversed(list(inflight.values())))
+                        inflight.clear()
+                        _kill_pool(pool)
+                        pool = None
+                        break
+        except BrokenProcessPool:
+            crashed = sorted(inflight.values())
+            _kill_pool(pool)
+            pool = None
+            if len(crashed) == 1:
+                results[crashed[0]] = on_failure(items[crashed[0]], "worker crashed (out of memory or a segfault)")
+            else:
+                suspects.extend(crashed)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+    if suspects:
+        retried = run_isolated(fn, [items[i] for i in suspects], 1, on_failure, timeout, max_memory)
+        for index, result in zip(suspects, retried):
+            results[index] = result
+
+    return results
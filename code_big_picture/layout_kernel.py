@@ -0,0 +1,133 @@
+from itertools import repeat
+from typing import List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # optional: the renderer's pure-Python loops are used instead
+    np = None
+
+# Sibling lists shorter than this are packed in Python; setting up arrays costs more than it saves
+MIN_VECTOR_CHILDREN = 512
+# Values with at most 8 binary fraction digits whose running sums stay below 2**40 add up
+# exactly in float64, in any order; only then is array arithmetic identical to the Python loops
+EXACT_SCALE = 2.0 ** 8
+EXACT_LIMIT = 2.0 ** 40
+
+Size = Tuple[float, float]
+
+
+def _exact(values: "np.ndarray") -> bool:
+    scaled = values * EXACT_SCALE
+    return bool(np.all(scaled == np.floor(scaled))) and float(np.abs(values).sum()) < EXACT_LIMIT
+
+
+def _int_mask(values: Sequence[float]) -> "np.ndarray":
+    """True where a value is an int rather than a float."""
+    kinds = set(map(type, values))
+    if len(kinds) == 1:
+        return np.full(len(values), kinds == {int})
+    return np.fromiter(map(isinstance, values, repeat(int)), dtype=bool, count=len(values))
+
+
+def _typed(values: "np.ndarray", is_int: "np.ndarray") -> List[float]:
+    """Converts array values back to the int or float each would be in the Python loops."""
+    if not is_int.any():
+        return values.tolist()
+    if is_int.all():
+        return values.astype(np.int64).tolist()
+    return [int(v) if i else v for v, i in zip(values.tolist(), is_int.tolist())]
+
+
+def pack_rows(sizes: Sequence[Size], max_row_width: float,
+              margin: float) -> Optional[Tuple[List[range], List[float], List[float]]]:
+    """Greedy row packing as in ``SVGRenderer._pack_rows``, as array operations.
+
+    Returns ``(rows of child indexes, row heights, row widths)``, equal in
+    value and in int/float type to the Python loop (rows are ranges), or
+    None when NumPy is missing, the list is short, or the sums could round
+    differently.
+
+    With ``w + margin`` prefix sums, the row starting at child ``s`` ends
+    before the first child whose prefix passes ``prefix[s]`` plus the row
+    width; one searchsorted finds that end for every possible start, and
+    the rows are then just the chain of ends from child 0.
+    """
+    n = len(sizes)
+    if np is None or n < MIN_VECTOR_CHILDREN:
+        return None
+    width_values, height_values = zip(*sizes)
+    widths = np.array(width_values, dtype=float)
+    heights = np.array(height_values, dtype=float)
+    if not (_exact(widths + margin) and _exact(heights)):
+        return None
+
+    prefix = np.concatenate(([0.0], np.cumsum(widths + margin)))
+    # A started row already counts its first child without a margin, hence the slack
+    ends = np.searchsorted(prefix, prefix[:-1] + (max_row_width + margin), side="right") - 1
+    ends = np.maximum(ends, np.arange(1, n + 1)).tolist()
+    starts = [0]
+    end = max(1, int(np.searchsorted(prefix, max_row_width, side="right")) - 1)
+    while end < n:
+        starts.append(end)
+        end = ends[end]
+    bounds = starts + [n]
+    rows = list(map(range, starts, bounds[1:]))
+
+    lengths = np.diff(bounds)
+    row_of = np.repeat(np.arange(len(starts)), lengths)
+    # max() keeps the first of equal heights, whose type then carries over
+    hits = np.flatnonzero(heights == np.maximum.reduceat(heights, starts)[row_of])
+    _, first = np.unique(row_of[hits], return_index=True)
+    row_heights = [height_values[i] for i in hits[first].tolist()]
+
+    row_widths = _typed(np.add.reduceat(widths, starts) + (lengths - 1) * margin,
+                        np.logical_and.reduceat(_int_mask(width_values), starts) & (type(margin) is int))
+    return rows, row_heights, row_widths
+
+
+def child_offsets(sizes: Sequence[Size], rows: Sequence[Sequence[int]], row_heights: List[float], left: float,
+                  top: float, margin: float) -> Optional[List[Tuple[float, float]]]:
+    """Each child's ``(x, y)`` within packed rows starting at ``(left, top)``, as array operations.
+
+    Matches the running offsets of ``SVGRenderer.layout_boxes``, types
+    included, or returns None under the same conditions as ``pack_rows``.
+    """
+    n = len(sizes)
+    if np is None or n < MIN_VECTOR_CHILDREN:
+        return None
+    width_values = next(zip(*sizes))
+    widths = np.array(width_values, dtype=float)
+    steps = np.asarray(row_heights, dtype=float) + margin
+    if not (_exact(widths + margin) and _exact(steps)):
+        return None
+
+    starts = [row[0] for row in rows]
+    lengths = [len(row) for row in rows]
+    row_start = np.repeat(starts, lengths)
+    # Each child's x is ``left`` plus the widths and margins before it in its row
+    prefix = np.concatenate(([0.0], np.cumsum(widths + margin)))
+    non_int = np.concatenate(([0], np.cumsum(~_int_mask(width_values))))
+    index = np.arange(n)
+    xs = _typed(left + prefix[index] - prefix[row_start],
+                (non_int[index] == non_int[row_start]) & (type(left) is int) & (type(margin) is int))
+
+    row_prefix = np.concatenate(([0.0], np.cumsum(steps)[:-1]))
+    row_non_int = np.concatenate(([0], np.cumsum(~_int_mask(row_heights))[:-1]))
+    ys = _typed(top + row_prefix, (row_non_int == 0) & (type(top) is int) & (type(margin) is int))
+    return list(zip(xs, np.repeat(np.asarray(ys, dtype=object), lengths).tolist()))
+
+
+def leaf_widths(name_lengths: Sequence[int], subtitle_lengths: Sequence[int], min_width: int,
+                max_width: int) -> Optional[List[float]]:
+    """Label-based leaf widths of ``SVGRenderer._leaf_size`` for many leaves at once.
+
+    Widths clamped to ``min_width`` or ``max_width`` come back as those
+    ints, as ``max``/``min`` return them. None without NumPy or for a
+    short list.
+    """
+    if np is None or len(name_lengths) < MIN_VECTOR_CHILDREN:
+        return None
+    estimated = np.maximum(np.asarray(name_lengths, dtype=float),
+                           np.asarray(subtitle_lengths, dtype=float) * 0.85) * 8.5 + 40
+    clamped = (estimated <= min_width) | (estimated >= max_width)
+    return _typed(np.clip(estimated, min_width, max_width), clamped)
@@ -0,0 +1,115 @@
+from collections import Counter
+from typing import Dict, List, Any
+
+# Order in which aggregate summaries list what they contain
+SUMMARY_ORDER = ["package", "directory", "module", "class", "function", "method", "file", "error"]
+PLURALS = {"class": "classes", "directory": "directories"}
+
+
+def count_nodes(structure: Dict[str, Any]) -> int:
+    """Counts every node in a structure, the root included."""
+    count = 0
+    stack = [structure]
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(node.get("children", []))
+    return count
+
+
+def apply_node_budget(structure: Dict[str, Any], max_nodes: int) -> Dict[str, Any]:
+    """Returns a structure with at most ``max_nodes`` nodes where possible.
+
+    Subtree sizes come from one post-order pass. Container subtrees are then
+    replaced, deepest and largest first, by ``aggregate`` leaves carrying a
+    summary such as "42 classes, 310 methods" until the budget holds. The
+    aggregate keeps the replaced children under ``collapsed`` so they stay
+    available on request: the renderer attaches them to the aggregate's box
+    as inert markup that a click draws over the map, without adding to the
+    page's elements. The input structure is not modified. If even the
+    top-level children collapsed exceed the budget, that is the result.
+    """
+    # Post-order pass: parent links, depths and subtree sizes keyed by id()
+    parents: Dict[int, Dict[str, Any]] = {}
+    depths: Dict[int, int] = {id(structure): 0}
+    sizes: Dict[int, int] = {}
+    order: List[Dict[str, Any]] = []
+    stack = [structure]
+    while stack:
+        node = stack.pop()
+        order.append(node)
+        for child in node.get("children", []):
+            parents[id(child)] = node
+            depths[id(child)] = depths[id(node)] + 1
+            stack.append(child)
+    for node in reversed(order):
+        sizes[id(node)] = 1 + sum(sizes[id(child)] for child in node.get("children", []))
+
+    total = sizes[id(structure)]
+    if total <= max_nodes:
+        return structure
+
+    candidates = [node for node in order if node is not structure and node.get("children")]
+    candidates.sort(key=lambda node: (-depths[id(node)], -sizes[id(node)]))
+
+    collapsed = set()
+    for node in candidates:
+        if total <= max_nodes:
+            break
+        saved = sizes[id(node)] - 1
+        if saved <= 0:
+            continue
+        collapsed.add(id(node))
+        total -= saved
+        ancestor = parents.get(id(node))
+        while ancestor is not None:
+            sizes[id(ancestor)] -= saved
+            ancestor = parents.get(id(ancestor))
+
+    return _rebuild(structure, collapsed)
+
+
+def _rebuild(node: Dict[str, Any], collapsed: set) -> Dict[str, Any]:
+    if id(node) in collapsed:
+        return _aggregate(node)
+    if not node.get("children"):
+        return node
+    copy = dict(node)
+    copy["children"] = [_rebuild(child, collapsed) for child in node["children"]]
+    return copy
+
+
+def count_types(node: Dict[str, Any]) -> Counter:
+    """Counts the descendants of a node by type, the node itself excluded."""
+    counts: Counter = Counter()
+    stack = list(node.get("children", []))
+    while stack:
+        child = stack.pop()
+        counts[child.get("type", "unknown")] += 1
+        stack.extend(child.get("children", []))
+    return counts
+
+
+def _aggregate(node: Dict[str, Any]) -> Dict[str, Any]:
+    """Builds the summary leaf standing in for a collapsed subtree."""
+    counts = count_types(node)
+    return {
+        "name": node.get("name", "Unknown"),
+        "type": "aggregate",
+        "kind": node.get("type", "unknown"),
+        "summary": summarize_counts(counts),
+        "counts": dict(counts),
+        "collapsed": node.get("children", []),
+    }
+
+
+def summarize_counts(counts: Dict[str, int]) -> str:
+    """Formats type counts as e.g. "3 modules, 1 class, 12 methods"."""
+    known = [t for t in SUMMARY_ORDER if counts.get(t)]
+    others = sorted(t for t in counts if t not in SUMMARY_ORDER and counts[t])
+    parts = []
+    for node_type in known + others:
+        n = counts[node_type]
+        label = node_type if n == 1 else PLURALS.get(node_type, node_type + "s")
+        parts.append(f"{n} {label}")
+    return ", ".join(parts)
@@ -0,0 +1,309 @@
+import json
+import os
+import sqlite3
+import tempfile
+import uuid
+from pathlib import Path
+from typing import Any, Dict, IO, Iterable, List, Optional, Tuple
+
+from code_big_picture import layout_kernel
+from code_big_picture.isolation import memory_limited
+from code_big_picture.parser import CodeParser, Event
+from code_big_picture.renderer import SVGRenderer
+
+# Columns without a declared type keep ints and floats exactly as the renderer
+# computed them, so numbers print the same as in an in-memory render
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS nodes (
+    id INTEGER PRIMARY KEY,
+    parent INTEGER,
+    depth INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    name TEXT NOT NULL,
+    data TEXT
+);
+CREATE TABLE IF NOT EXISTS layout (
+    id INTEGER PRIMARY KEY,
+    w,
+    h,
+    rows TEXT
+);
+"""
+
+# Rows written per executemany() call
+BATCH_SIZE = 10000
+# Markup fragments buffered before a write to the output file
+WRITE_BATCH = 4096
+# Stands in for the map when the page skeleton is split around it
+SVG_MARKER = "<!-- code-big-picture-map -->"
+
+Box = Tuple[float, float, float, float, int, Dict[str, Any]]
+
+
+class NodeStore:
+    """Disk-backed node table for laying out trees that do not fit in memory.
+
+    Nodes are numbered in document order as they are written, so a parent
+    always has a smaller id than its children: a pass over descending ids
+    sees every child before its parent (sizes, bottom-up) and a pass over
+    ascending ids sees the page in the order it is written (markup,
+    top-down). Only the containers along the current path are held.
+    ``cache_bytes`` bounds SQLite's page cache.
+    """
+
+    def __init__(self, db_path: str, cache_bytes: Optional[int] = None):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        # A scratch database: rebuilt from the sources whenever it is lost
+        self.conn.execute("PRAGMA journal_mode = OFF")
+        self.conn.execute("PRAGMA synchronous = OFF")
+        self.conn.execute("PRAGMA temp_store = FILE")
+        if cache_bytes:
+            self.conn.execute(f"PRAGMA cache_size = {-max(1, cache_bytes // 1024)}")
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> "NodeStore":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def write_events(self, events: Iterable[Event]) -> int:
+        """Stores an ``iter_parse`` event stream; returns the number of nodes.
+
+        Replaces whatever the store held. Parents are assigned as in
+        ``parser.build_structure``.
+        """
+        stack: List[Tuple[int, int]] = []
+        module: Tuple[int, int] = (0, 0)
+        class_node: Tuple[int, int] = (0, 0)
+        batch: List[Tuple[Any, ...]] = []
+        count = 0
+        with self.conn:
+            self.conn.execute("DELETE FROM layout")
+            self.conn.execute("DELETE FROM nodes")
+            for event, header in events:
+                if event == "exit_dir":
+                    stack.pop()
+                    continue
+                if event in ("class", "function"):
+                    parent: Optional[Tuple[int, int]] = module
+                elif event == "method":
+                    parent = class_node
+                else:
+                    parent = stack[-1] if stack else None
+
+                count += 1
+                depth = parent[1] + 1 if parent else 0
+                data = {key: value for key, value in header.items() if key not in ("name", "type", "children")}
+                batch.append((count, parent[0] if parent else None, depth, header.get("type", "unknown"),
+                              header.get("name", "Unknown"), json.dumps(data) if data else None))
+                if len(batch) >= BATCH_SIZE:
+                    self.conn.executemany("INSERT INTO nodes VALUES (?, ?, ?, ?, ?, ?)", batch)
+                    batch = []
+
+                if event == "enter_dir":
+                    stack.append((count, depth))
+                elif event == "module":
+                    module = (count, depth)
+                elif event == "class":
+                    class_node = (count, depth)
+            self.conn.executemany("INSERT INTO nodes VALUES (?, ?, ?, ?, ?, ?)", batch)
+        return count
+
+    def root(self) -> Dict[str, Any]:
+        """Returns the root node, without children."""
+        row = self.conn.execute("SELECT type, name, data FROM nodes WHERE id = 1").fetchone()
+        if row is None:
+            raise ValueError("The node store is empty")
+        return _node(*row)
+
+    def layout(self, renderer: SVGRenderer) -> Tuple[float, float]:
+        """Sizes every node bottom-up with the renderer's packing; returns the root's size.
+
+        Stores each node's full size and, for containers, its rows as
+        ``[y, row height, [child x, ...]]`` relative to its content group.
+        Only the sizes of children whose parent is not yet laid out are
+        held in memory.
+        """
+        pending: Dict[int, List[Tuple[float, float]]] = {}
+        batch: List[Tuple[Any, ...]] = []
+        size: Tuple[float, float] = (0, 0)
+        with self.conn:
+            self.conn.execute("DELETE FROM layout")
+            cursor = self.conn.execute("SELECT id, parent, depth, type, name, data FROM nodes ORDER BY id DESC")
+            for node_id, parent, depth, node_type, name, data in cursor:
+                sizes = pending.pop(node_id, None)
+                if not sizes:
+                    w, h, _ = renderer._leaf_size(_node(node_type, name, data))
+                    box_h = h
+                    rows_json = None
+                else:
+                    # Children arrived last to first
+                    sizes.reverse()
+                    rows, row_heights, w, h = renderer._pack_rows(sizes, depth)
+                    box_h = renderer.header_height if renderer._starts_collapsed(node_type, depth) else h
+                    layout_rows = []
+                    positions = layout_kernel.child_offsets(sizes, rows, row_heights, renderer.padding,
+                                                            renderer.header_height, renderer.margin)
+                    if positions is not None:
+                        for row, row_h in zip(rows, row_heights):
+                            layout_rows.append([positions[row[0]][1], row_h, [positions[i][0] for i in row]])
+                    else:
+                        y_offset = renderer.header_height
+                        for row, row_h in zip(rows, row_heights):
+                            x_offset = renderer.padding
+                            xs = []
+                            for index in row:
+                                xs.append(x_offset)
+                                x_offset += sizes[index][0] + renderer.margin
+                            layout_rows.append([y_offset, row_h, xs])
+                            y_offset += row_h + renderer.margin
+                    rows_json = json.dumps(layout_rows)
+
+                if parent is not None:
+                    pending.setdefault(parent, []).append((w, box_h))
+                size = (w, box_h)
+                batch.append((node_id, w, h, rows_json))
+                if len(batch) >= BATCH_SIZE:
+                    self.conn.executemany("INSERT INTO layout VALUES (?, ?, ?, ?)", batch)
+                    batch = []
+            self.conn.executemany("INSERT INTO layout VALUES (?, ?, ?, ?)", batch)
+        return size
+
+    def write_svg(self, renderer: SVGRenderer, out: IO[str]) -> List[Box]:
+        """Streams the laid-out map to ``out`` in document order.
+
+        Writes the same markup ``SVGRenderer._generate_box`` builds for the
+        root. Returns the boxes the page's minimap draws, as
+        ``layout_boxes(max_depth=renderer.minimap_depth, as_rendered=True)``
+        would.
+        """
+        minimap_depth = renderer.minimap_depth
+        boxes: List[Box] = []
+        parts: List[str] = []
+        # Open containers: [depth, rows, child slots, next slot, open row, x, y, hidden, wrapped]
+        stack: List[List[Any]] = []
+
+        def close(frame: List[Any]) -> None:
+            if frame[4] is not None:
+                parts.append("</g>")
+            parts.append(renderer.CONTAINER_CLOSE)
+            if frame[8]:
+                parts.append("</g>")
+
+        cursor = self.conn.execute(
+            "SELECT n.id, n.depth, n.type, n.name, n.data, l.w, l.h, l.rows "
+            "FROM nodes AS n JOIN layout AS l ON l.id = n.id ORDER BY n.id")
+        for _, depth, node_type, name, data, w, h, rows_json in cursor:
+            while stack and stack[-1][0] >= depth:
+                close(stack.pop())
+
+            x = y = 0
+            hidden = False
+            wrapped = bool(stack)
+            if stack:
+                parent = stack[-1]
+                row_index, child_x = parent[2][parent[3]]
+                parent[3] += 1
+                row_y, row_h, _ = parent[1][row_index]
+                if parent[4] != row_index:
+                    if parent[4] is not None:
+                        parts.append("</g>")
+                    parts.append(renderer._open_row(row_y, row_h))
+                    parent[4] = row_index
+                parts.append(f'<g transform="translate({child_x}, 0)">')
+                # Content groups sit 5 units below the header
+                x, y, hidden = parent[5] + child_x, parent[6] + 5 + row_y, parent[7]
+
+            node = _node(node_type, name, data)
+            theme = renderer._node_theme(node)
+            node_id = f"node-{uuid.uuid4().hex[:8]}"
+            if rows_json is None:
+                _, _, subtitle = renderer._leaf_size(node)
+                parts.append(renderer._draw_node_rect(name, node_type, theme, w, h, node_id, has_children=False,
+                                                      tooltip=renderer._tooltip(node), subtitle=subtitle))
+                if wrapped:
+                    parts.append("</g>")
+                box_h = h
+            else:
+                collapsed = renderer._starts_collapsed(node_type, depth)
+                parts.append(renderer._open_container(node, theme, node_id, w, h, collapsed))
+                box_h = renderer.header_height if collapsed else h
+                rows = json.loads(rows_json)
+                slots = [(index, child_x) for index, row in enumerate(rows) for child_x in row[2]]
+                stack.append([depth, rows, slots, 0, None, x, y, hidden or collapsed, wrapped])
+
+            if minimap_depth is not None and depth <= minimap_depth and not hidden:
+                boxes.append((x, y, w, box_h, depth, node))
+            if len(parts) >= WRITE_BATCH:
+                out.write("".join(parts))
+                parts = []
+
+        while stack:
+            close(stack.pop())
+        out.write("".join(parts))
+        return boxes
+
+
+def _node(node_type: str, name: str, data: Optional[str]) -> Dict[str, Any]:
+    node = {"name": name, "type": node_type}
+    if data:
+        node.update(json.loads(data))
+    return node
+
+
+def render_out_of_core(root_path: str, output_path: str, db_path: Optional[str] = None,
+                       memory_limit: Optional[int] = None, commit: Optional[str] = None,
+                       collapse_depth: Optional[int] = None, collapse_types: Optional[List[str]] = None,
+                       minimap_depth: Optional[int] = 2, **parser_options: Any) -> Dict[str, Any]:
+    """Parses and renders a project through a disk-backed node store.
+
+    For repositories whose structure does not fit in memory: parsed nodes
+    are spilled to SQLite as the walk streams them, laid out bottom-up
+    with only the open containers' child sizes in memory, and the page is
+    streamed to ``output_path`` rather than built as a string. The markup
+    matches ``SVGRenderer.render()`` for the type color mode with the
+    supported options; heat colors, dependencies, templates, chunking and
+    the render cache need the whole tree and are not available.
+
+    ``db_path`` keeps the node store (a temporary file next to the output
+    otherwise). ``memory_limit`` is a hard cap in bytes on this process's
+    address space beyond its current size, past which allocations raise
+    MemoryError, for the duration of the call; SQLite's page cache is
+    given a quarter of it. Remaining keyword arguments go to CodeParser;
+    a parse ``executor`` reads ahead of the store and so holds more files
+    in memory.
+    """
+    output = Path(output_path)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    temporary = db_path is None
+    if temporary:
+        fd, db_path = tempfile.mkstemp(prefix=f".{output.stem}-", suffix=".db", dir=output.parent)
+        os.close(fd)
+
+    try:
+        cache_bytes = memory_limit // 4 if memory_limit else None
+        with memory_limited(memory_limit), NodeStore(db_path, cache_bytes=cache_bytes) as store:
+            iterator = CodeParser(root_path, **parser_options).iter_parse()
+            try:
+                nodes = store.write_events(iterator)
+            finally:
+                iterator.close()
+
+            renderer = SVGRenderer(store.root(), commit=commit, collapse_depth=collapse_depth,
+                                   collapse_types=collapse_types, minimap_depth=minimap_depth)
+            width, height = store.layout(renderer)
+            with open(output, "w", encoding="utf-8") as out:
+                # The skeleton before the map does not depend on it; the minimap after it does
+                renderer._minimap_boxes = []
+                out.write(renderer._build_html_document(SVG_MARKER).split(SVG_MARKER)[0])
+                renderer._minimap_boxes = store.write_svg(renderer, out)
+                out.write(renderer._build_html_document(SVG_MARKER).split(SVG_MARKER)[1])
+    finally:
+        if temporary:
+            os.unlink(db_path)
+    return {"output": str(output), "nodes": nodes, "width": width, "height": height}
@@ -1,93 +1,548 @@
 import ast
+import hashlib
 import os
 import json
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Executor, FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from code_big_picture.archive import is_archive, iter_members
+from code_big_picture.isolation import run_isolated
+
+# AST nodes that add a decision point to a function's cyclomatic complexity
+BRANCH_NODES = (
+    ast.If, ast.IfExp, ast.For, ast.AsyncFor, ast.While, ast.ExceptHandler,
+    ast.With, ast.AsyncWith, ast.Assert,
+) + ((ast.match_case,) if hasattr(ast, "match_case") else ())
+
+# AST fields that may hold child nodes, per node class; expression contexts (Load/Store) are skipped
+CHILD_FIELDS: Dict[type, Tuple[str, ...]] = {}
+
+# Directories never descended into, matched by name prefix
+SKIPPED_DIR_PREFIXES = ('.', '__pycache__', 'venv', 'node_modules')
+# Non-Python files worth showing as plain file nodes
+EXTRA_FILE_SUFFIXES = ('.md', '.toml', '.json', '.yaml', '.yml', '.txt')
+
+# (resolved path, mtime_ns, size) -> parsed module node
+ParseCache = Dict[Tuple[str, int, int], Dict[str, Any]]
+
+# (event name, node without its children) as yielded by CodeParser.iter_parse
+Event = Tuple[str, Dict[str, Any]]
+# Node types iter_parse brackets with enter_dir/exit_dir events
+DIR_TYPES = ("project", "package", "directory")
+
+
+def iter_events(node: Dict[str, Any]) -> Iterator[Event]:
+    """Flattens a parsed structure into the events ``iter_parse`` yields for it."""
+    header = {key: value for key, value in node.items() if key != "children"}
+    if node.get("type") in DIR_TYPES:
+        yield "enter_dir", header
+        for child in node.get("children", []):
+            yield from iter_events(child)
+        yield "exit_dir", header
+    else:
+        yield node.get("type", "unknown"), header
+        for child in node.get("children", []):
+            yield from iter_events(child)
+
+
+def build_structure(events: Iterable[Event]) -> Dict[str, Any]:
+    """Rebuilds the nested structure from an ``iter_parse`` event stream.
+
+    Classes and functions attach to the last module, methods to the last
+    class; everything else attaches to the innermost open directory.
+    """
+    stack: List[Dict[str, Any]] = []
+    root: Dict[str, Any] = {}
+    module: Dict[str, Any] = {}
+    class_node: Dict[str, Any] = {}
+    for event, header in events:
+        if event == "exit_dir":
+            root = stack.pop()
+            continue
+        if event in ("enter_dir", "module", "class"):
+            # Keep the key order the parser builds nodes with
+            node = {"name": header.get("name"), "type": header.get("type"), "children": []}
+            node.update(header)
+        else:
+            node = dict(header)
+
+        if event in ("class", "function"):
+            module["children"].append(node)
+        elif event == "method":
+            class_node["children"].append(node)
+        elif stack:
+            stack[-1]["children"].append(node)
+
+        if event == "enter_dir":
+            stack.append(node)
+        elif event == "module":
+            module = node
+        elif event == "class":
+            class_node = node
+    return root
+
+
+class _ByteBudget:
+    """Blocks readers while too many prefetched bytes are waiting to be parsed."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.used = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, size: int) -> None:
+        with self._cond:
+            # A single file over the limit is still let through once nothing else is buffered
+            while self.used and self.used + size > self.limit:
+                self._cond.wait()
+            self.used += size
+
+    def release(self, size: int) -> None:
+        with self._cond:
+            self.used -= size
+            self._cond.notify_all()
+
 
 class CodeParser:
     """Parses a Python project into a hierarchical structure using AST."""
     
-    def __init__(self, root_path: str):
+    def __init__(self, root_path: str, executor: Optional[Executor] = None,
+                 cache: Optional[ParseCache] = None, readers: int = 0,
+                 max_buffered_bytes: int = 64 * 1024 * 1024, timeout: Optional[float] = None,
+                 max_memory: Optional[int] = None):
         self.root_path = Path(root_path).resolve()
+        # Optional pool used to parse files in parallel; may be shared by several parsers
+        self.executor = executor
+        # Optional stat-keyed cache of module nodes; may be shared by several parsers
+        self.cache = cache
+        # Reader threads prefetching file bytes ahead of parsing (for slow filesystems)
+        self.readers = readers
+        self.max_buffered_bytes = max_buffered_bytes
+        # Per-file limits; when set, files are parsed in crash-isolated worker processes
+        self.timeout = timeout
+        self.max_memory = max_memory
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Pools and caches stay in the parent process when tasks are pickled
+        state = self.__dict__.copy()
+        state["executor"] = None
+        state["cache"] = None
+        return state
         
     def parse(self) -> Dict[str, Any]:
-        """Main entry point for parsing the directory."""
-        return self._parse_dir(self.root_path)
+        """Main entry point for parsing the directory (or archive)."""
+        if is_archive(self.root_path):
+            return self._parse_archive()
+        return build_structure(self.iter_parse())
+
+    def iter_parse(self) -> Iterator[Event]:
+        """Walks the project yielding ``(event, node)`` pairs in structure order.
+
+        Each project, package and directory is bracketed by ``enter_dir`` and
+        ``exit_dir``; a ``.py`` file gives ``module`` followed by its
+        ``class``, ``method`` and ``function`` events, or a single ``error``;
+        other listed files give ``file``. Nodes come without ``children``.
+        Directories with nothing to show are never announced, matching
+        ``parse()``, which is ``build_structure`` over these events.
+
+        Serially the walk advances one file at a time, so a consumer that
+        does not keep the nodes runs in memory proportional to the tree's
+        depth. With an executor, readers or limits the walk runs ahead to
+        keep workers busy, and archives are read in full first since their
+        members arrive in archive order.
+        """
+        if is_archive(self.root_path):
+            yield from iter_events(self._parse_archive())
+            return
+
+        # Walk events not yet yielded, and the [path, key, node] entries still being parsed
+        walked: Deque[Tuple[str, Any]] = deque()
+        unparsed: Deque[List[Any]] = deque()
+
+        def modules() -> Iterator[List[Any]]:
+            for event, item in self._walk(self.root_path):
+                if event != "py":
+                    walked.append((event, item))
+                    continue
+                key = self._cache_key(item) if self.cache is not None or self.readers else None
+                entry = [item, key, self.cache.get(key) if self.cache is not None and key else None]
+                walked.append((event, entry))
+                if entry[2] is None:
+                    unparsed.append(entry)
+                    yield entry
+
+        results = iter(self._parse_modules(modules()))
+        unannounced: List[Dict[str, Any]] = []
+        done = False
+        while not done:
+            try:
+                module_node = next(results)
+            except StopIteration:
+                done = True
+            else:
+                entry = unparsed.popleft()
+                entry[2] = module_node
+                if self.cache is not None and entry[1] and module_node["type"] != "error":
+                    self.cache[entry[1]] = module_node
+
+            while walked and not (walked[0][0] == "py" and walked[0][1][2] is None):
+                event, item = walked.popleft()
+                if event == "enter_dir" and item["type"] != "project":
+                    unannounced.append(item)
+                elif event == "exit_dir" and unannounced:
+                    # Open unannounced directories are the innermost ones, so this is it
+                    unannounced.pop()
+                elif event in ("enter_dir", "exit_dir"):
+                    yield event, item
+                else:
+                    for header in unannounced:
+                        yield "enter_dir", header
+                    unannounced.clear()
+                    if event == "py":
+                        yield from iter_events(item[2])
+                    else:
+                        yield event, item
+
+    def _parse_modules(self, entries: Iterator[List[Any]]) -> Iterable[Dict[str, Any]]:
+        """Parses ``[path, cache key, _]`` entries, yielding module nodes in entry order."""
+        if self.readers and not (self.timeout or self.max_memory):
+            to_parse = [({}, path, key) for path, key, _ in entries]
+            self._parse_prefetched(to_parse)
+            return (placeholder for placeholder, _, _ in to_parse)
+        return self._map_parse(self._parse_file, (entry[0] for entry in entries))
+
+    def _map_parse(self, fn, items: Iterable[Any]):
+        """Maps a parse function over files or archive members with the configured workers."""
+        if self.timeout or self.max_memory:
+            # Limits need workers of our own: a crash must not break a shared pool
+            workers = getattr(self.executor, "_max_workers", None) or os.cpu_count() or 1
+            return run_isolated(fn, list(items), workers, self._limit_error,
+                                timeout=self.timeout, max_memory=self.max_memory)
+        if self.executor is not None:
+            return self.executor.map(fn, items, chunksize=16)
+        return map(fn, items)
+
+    @staticmethod
+    def _limit_error(item: Any, reason: str) -> Dict[str, Any]:
+        # Items are file paths or (name, bytes) archive members
+        name = item[0] if isinstance(item, tuple) else item.name
+        return {"name": name, "type": "error", "message": reason}
+
+    def _fill(self, entry: Tuple[Dict[str, Any], Path, Optional[Tuple[str, int, int]]],
+              module_node: Dict[str, Any]) -> None:
+        placeholder = entry[0]
+        placeholder.clear()
+        placeholder.update(module_node)
+
+    def _parse_prefetched(self, to_parse: List[Tuple[Dict[str, Any], Path, Optional[Tuple[str, int, int]]]]) -> None:
+        """Overlaps file reads with parsing.
+
+        ``readers`` threads read file bytes into a bounded queue while this
+        thread parses them (or hands them to the executor). Readers stall once
+        ``max_buffered_bytes`` of unparsed source is held, and at most a few
+        parse tasks per worker are in flight, so memory stays bounded while
+        high-latency reads proceed concurrently.
+        """
+        budget = _ByteBudget(self.max_buffered_bytes)
+        ready: queue.Queue = queue.Queue(maxsize=self.readers * 4)
+
+        def read(entry):
+            size = entry[2][2] if entry[2] else 0
+            budget.acquire(size)
+            try:
+                data = entry[1].read_bytes()
+            except Exception as e:
+                data = e
+            ready.put((entry, data, size))
+
+        max_inflight = 2 * (getattr(self.executor, "_max_workers", None) or os.cpu_count() or 1)
+        inflight: Dict[Any, Tuple[Any, int]] = {}
 
-    def _parse_dir(self, current_path: Path) -> Dict[str, Any]:
-        """Recursively parses directories into packages/components."""
-        node = {
+        def finish(futures):
+            for future in futures:
+                entry, size = inflight.pop(future)
+                self._fill(entry, future.result())
+                budget.release(size)
+
+        with ThreadPoolExecutor(max_workers=self.readers) as reader_pool:
+            for entry in to_parse:
+                reader_pool.submit(read, entry)
+
+            remaining = len(to_parse)
+            while remaining:
+                if inflight and ready.empty():
+                    # In-flight parses hold budget the readers may be waiting for
+                    done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                    finish(done)
+                    continue
+                entry, data, size = ready.get()
+                remaining -= 1
+                name = entry[1].name
+                if isinstance(data, Exception):
+                    self._fill(entry, {"name": name, "type": "error", "message": str(data)})
+                    budget.release(size)
+                elif self.executor is None:
+                    self._fill(entry, self._parse_source(name, data))
+                    budget.release(size)
+                else:
+                    inflight[self.executor.submit(self._parse_source, name, data)] = (entry, size)
+                    if len(inflight) >= max_inflight:
+                        done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                        finish(done)
+
+            finish(list(inflight))
+
+    @staticmethod
+    def _cache_key(file_path: Path) -> Optional[Tuple[str, int, int]]:
+        try:
+            st = file_path.stat()
+        except OSError:
+            return None
+        return (str(file_path), st.st_mtime_ns, st.st_size)
+
+    def _walk(self, current_path: Path) -> Iterator[Tuple[str, Any]]:
+        """Yields the raw walk: directory enter/exit headers, ``.py`` paths and file nodes.
+
+        Empty directories are still entered here; ``iter_parse`` drops them.
+        """
+        header = {
             "name": current_path.name,
             "type": "package" if (current_path / "__init__.py").exists() else "directory",
-            "children": []
         }
-        
+
         # Adjusting the project root name
         if current_path == self.root_path:
-            node["type"] = "project"
+            header["type"] = "project"
 
+        yield "enter_dir", header
         for item in sorted(current_path.iterdir()):
             if item.is_dir():
-                if item.name.startswith(('.', '__pycache__', 'venv', 'node_modules')):
+                if item.name.startswith(SKIPPED_DIR_PREFIXES):
                     continue
-                dir_data = self._parse_dir(item)
-                if dir_data["children"]:
-                    node["children"].append(dir_data)
+                yield from self._walk(item)
             elif item.suffix == ".py":
-                node["children"].append(self._parse_file(item))
-            elif item.suffix in ('.md', '.toml', '.json', '.yaml', '.yml', '.txt'):
+                yield "py", item
+            elif item.suffix in EXTRA_FILE_SUFFIXES:
                 # Add important non-python files as simple nodes to fill the big picture
-                node["children"].append({
-                    "name": item.name,
-                    "type": "file"
-                })
-                
-        return node
+                yield "file", {"name": item.name, "type": "file"}
+        yield "exit_dir", header
+
+    def _parse_archive(self) -> Dict[str, Any]:
+        """Builds the project hierarchy from archive member paths, parsing member bytes in memory.
+
+        Mirrors ``_walk``: directories become packages when they hold an
+        ``__init__.py``, skipped directories and unlisted file types are left
+        out, and children are sorted by name. Members are read in one
+        sequential pass, so compressed tarballs are streamed, never extracted.
+        """
+        root = {"name": self.root_path.name, "type": "project", "children": []}
+        dirs: Dict[Tuple[str, ...], Dict[str, Any]] = {(): root}
+        seen = set()
+        pending: List[Tuple[Dict[str, Any], Tuple[str, bytes]]] = []
+
+        for parts, read in iter_members(self.root_path):
+            if parts in seen or any(part.startswith(SKIPPED_DIR_PREFIXES) for part in parts[:-1]):
+                continue
+            name = parts[-1]
+            suffix = os.path.splitext(name)[1]
+            if suffix != ".py" and suffix not in EXTRA_FILE_SUFFIXES:
+                continue
+            seen.add(parts)
+
+            parent = root
+            for depth in range(1, len(parts)):
+                key = parts[:depth]
+                if key not in dirs:
+                    dirs[key] = {"name": parts[depth - 1], "type": "directory", "children": []}
+                    parent["children"].append(dirs[key])
+                parent = dirs[key]
+
+            if suffix == ".py":
+                if name == "__init__.py" and parent is not root:
+                    parent["type"] = "package"
+                placeholder = {"name": name, "type": "module", "children": []}
+                pending.append((placeholder, (name, read())))
+                parent["children"].append(placeholder)
+            else:
+                parent["children"].append({"name": name, "type": "file"})
+
+        members = [member for _, member in pending]
+        for (placeholder, _), module_node in zip(pending, self._map_parse(self._parse_member, members)):
+            placeholder.clear()
+            placeholder.update(module_node)
+
+        for node in dirs.values():
+            node["children"].sort(key=lambda child: child["name"])
+        return root
+
+    def _parse_member(self, member: Tuple[str, bytes]) -> Dict[str, Any]:
+        return self._parse_source(*member)
 
     def _parse_file(self, file_path: Path) -> Dict[str, Any]:
         """Parses a .py file into modules, classes, and methods."""
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                content = f.read()
-            
+            content = file_path.read_bytes()
+        except Exception as e:
+            return {"name": file_path.name, "type": "error", "message": str(e)}
+        return self._parse_source(file_path.name, content)
+
+    def _parse_source(self, name: str, source: bytes) -> Dict[str, Any]:
+        """Parses the bytes of one module; split from reading so I/O can be pipelined."""
+        try:
+            content = source.decode("utf-8")
             tree = ast.parse(content)
             
             module_node = {
-                "name": file_path.name,
+                "name": name,
                 "type": "module",
-                "children": []
+                "children": [],
+                "lines": [1, max(1, len(content.splitlines()))]
             }
             
-            for item in tree.body:
-                if isinstance(item, ast.ClassDef):
-                    module_node["children"].append(self._parse_class(item))
-                elif isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)):
-                    module_node["children"].append({
-                        "name": item.name,
-                        "type": "function"
-                    })
-                    
+            imports = self._collect_imports(self._parse_body(tree, module_node, content.split("\n")))
+            if imports:
+                module_node["imports"] = imports
+
             return module_node
         except Exception as e:
-            return {"name": file_path.name, "type": "error", "message": str(e)}
+            # MemoryError and friends have no message of their own
+            return {"name": name, "type": "error", "message": str(e) or type(e).__name__}
+
+    @staticmethod
+    def _collect_imports(statements: List[ast.stmt]) -> List[List[Any]]:
+        """Returns unique imports as compact ``[module, level, names]`` triples.
+
+        ``import a.b`` gives ``["a.b", 0, []]`` and ``from ..x import y`` gives
+        ``["x", 2, ["y"]]``. Names are kept because ``from pkg import sub`` may
+        refer to a submodule; resolution happens later in ``deps``.
+        """
+        imports = []
+        seen = set()
+        for node in statements:
+            if isinstance(node, ast.Import):
+                entries = [(alias.name, 0, ()) for alias in node.names]
+            elif isinstance(node, ast.ImportFrom):
+                names = tuple(alias.name for alias in node.names if alias.name != "*")
+                entries = [(node.module or "", node.level, names)]
+            else:
+                continue
+            for entry in entries:
+                if entry not in seen:
+                    seen.add(entry)
+                    imports.append([entry[0], entry[1], list(entry[2])])
+        return imports
+
+    def _parse_body(self, tree: ast.Module, module_node: Dict[str, Any], source_lines: List[str]) -> List[ast.stmt]:
+        """Adds a module's classes, functions and methods with their metrics, in one walk of its AST.
+
+        Every AST node is visited once. McCabe complexity (one plus the
+        decision points) is counted into the nearest enclosing function or
+        method shown on the map, so nested functions and classes add to the
+        one they sit in. Returns the module's import statements, at any
+        depth, in source order.
+        """
+        statements = []
+        # (AST node, map node whose children it defines, function counting its decision points)
+        stack: List[Tuple[ast.AST, Optional[Dict[str, Any]], Optional[Dict[str, Any]]]] = [(tree, module_node, None)]
+        while stack:
+            node, container, function = stack.pop()
+            if node.__class__ is ast.Import or node.__class__ is ast.ImportFrom:
+                statements.append(node)
+                continue
+            if function is not None:
+                if isinstance(node, BRANCH_NODES):
+                    function["complexity"] += 1
+                elif isinstance(node, ast.BoolOp):
+                    function["complexity"] += len(node.values) - 1
+                elif isinstance(node, ast.comprehension):
+                    function["complexity"] += 1 + len(node.ifs)
+
+            shown: Dict[int, Dict[str, Any]] = {}
+            if container is not None:
+                for item in node.body:
+                    if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                        child = self._parse_function(item, "method" if container["type"] == "class" else "function",
+                                                     source_lines)
+                    elif isinstance(item, ast.ClassDef) and container["type"] == "module":
+                        child = self._parse_class(item)
+                    else:
+                        continue
+                    container["children"].append(child)
+                    shown[id(item)] = child
+
+            fields = CHILD_FIELDS.get(node.__class__)
+            if fields is None:
+                fields = CHILD_FIELDS[node.__class__] = tuple(f for f in node._fields if f != "ctx")
+            for field in fields:
+                value = getattr(node, field, None)
+                for item in value if value.__class__ is list else (value,):
+                    if not isinstance(item, ast.AST):
+                        continue
+                    child = shown.get(id(item)) if shown else None
+                    if child is None:
+                        stack.append((item, None, function))
+                    elif child["type"] == "class":
+                        stack.append((item, child, None))
+                    else:
+                        stack.append((item, None, child))
+        statements.sort(key=lambda statement: (statement.lineno, statement.col_offset))
+        return statements
 
     def _parse_class(self, class_def: ast.ClassDef) -> Dict[str, Any]:
-        """Extracts methods from a class definition."""
+        """Builds a class node; ``_parse_body`` adds its methods."""
         class_node = {
             "name": class_def.name,
             "type": "class",
-            "children": []
+            "children": [],
+            "lines": [class_def.lineno, class_def.end_lineno]
         }
-        
-        for item in class_def.body:
-            if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)):
-                # Filter out pure constructors if desired, or keep all
-                class_node["children"].append({
-                    "name": item.name,
-                    "type": "method"
-                })
+        decorators = self._decorator_names(class_def)
+        if decorators:
+            class_node["decorators"] = decorators
         return class_node
 
+    def _parse_function(self, func_def: ast.AST, node_type: str, source_lines: List[str]) -> Dict[str, Any]:
+        """Builds a function/method node; ``_parse_body`` counts its complexity up from 1.
+
+        ``digest`` hashes the definition's source, decorators included, so
+        an edit that keeps the line range still tells the function apart.
+        """
+        func_node = {
+            "name": func_def.name,
+            "type": node_type,
+            "lines": [func_def.lineno, func_def.end_lineno],
+            "complexity": 1
+        }
+        decorators = self._decorator_names(func_def)
+        if decorators:
+            func_node["decorators"] = decorators
+            # Lines from the first decorator to ``def``, where the function's code object starts
+            func_node["decorator_lines"] = func_def.lineno - func_def.decorator_list[0].lineno
+        start = func_def.lineno - func_node.get("decorator_lines", 0)
+        source = "\n".join(source_lines[start - 1:func_def.end_lineno])
+        func_node["digest"] = hashlib.blake2b(source.encode("utf-8"), digest_size=8).hexdigest()
+        return func_node
+
+    @staticmethod
+    def _decorator_names(definition: ast.AST) -> List[str]:
+        """Returns dotted decorator names, e.g. ``staticmethod`` or ``app.route``."""
+        names = []
+        for decorator in definition.decorator_list:
+            if isinstance(decorator, ast.Call):
+                decorator = decorator.func
+            parts = []
+            while isinstance(decorator, ast.Attribute):
+                parts.append(decorator.attr)
+                decorator = decorator.value
+            if isinstance(decorator, ast.Name):
+                parts.append(decorator.id)
+            names.append(".".join(reversed(parts)) or "?")
+        return names
+
 if __name__ == "__main__":
     # Test on sample_project
     parser = CodeParser("./sample_project")
@@ -0,0 +1,121 @@
+import bisect
+import pstats
+import tracemalloc
+from typing import Dict, List, Any, Optional, Tuple
+
+# Fields the overlay adds to function/method nodes (self time also lands on modules)
+PROFILE_FIELDS = ("cum_time", "self_time", "calls", "alloc_bytes")
+
+
+class ProfileIndex:
+    """Lookup from profiler (filename, line) pairs to parsed structure nodes.
+
+    Modules are keyed by their path inside the project including the root
+    directory's name (``proj/core/engine.py``). A profiled filename matches
+    the longest such path it ends with; files below the root may also match
+    without the root component, so code run from an install or another
+    checkout still resolves. Per module, functions and methods are kept as
+    line intervals sorted by start, so a line finds its enclosing function
+    by bisection.
+    """
+
+    def __init__(self, structure: Dict[str, Any]):
+        self.modules: Dict[str, Dict[str, Any]] = {}
+        # module key -> (interval starts, [(start, end, node)])
+        self.functions: Dict[str, Tuple[List[int], List[Tuple[int, int, Dict[str, Any]]]]] = {}
+        self._resolved: Dict[str, Optional[str]] = {}
+
+        root_name = structure.get("name", "")
+        stack: List[Tuple[Dict[str, Any], Tuple[str, ...]]] = [(child, ()) for child in structure.get("children", [])]
+        while stack:
+            node, parents = stack.pop()
+            parts = parents + (node.get("name", ""),)
+            if node.get("type") == "module":
+                self._add_module("/".join(parts), node, with_root=root_name)
+            else:
+                stack.extend((child, parts) for child in node.get("children", []))
+
+    def _add_module(self, relative: str, module: Dict[str, Any], with_root: str) -> None:
+        keys = [f"{with_root}/{relative}"]
+        if "/" in relative:
+            # A bare root-level name such as "__init__.py" would match any library's file
+            keys.append(relative)
+        for key in keys:
+            self.modules.setdefault(key, module)
+
+        intervals = []
+        for node in module.get("children", []):
+            for item in [node] + node.get("children", []):
+                if item.get("type") in ("function", "method") and "lines" in item:
+                    start, end = item["lines"]
+                    # Code objects of decorated functions start at the first decorator
+                    intervals.append((start - item.get("decorator_lines", 0), end, item))
+        intervals.sort(key=lambda interval: interval[0])
+        for key in keys:
+            self.functions.setdefault(key, ([start for start, _, _ in intervals], intervals))
+
+    def module_key(self, filename: str) -> Optional[str]:
+        """Returns the index key of the module a profiled filename refers to."""
+        if filename not in self._resolved:
+            parts = filename.replace("\\", "/").split("/")
+            self._resolved[filename] = next(
+                (key for key in ("/".join(parts[i:]) for i in range(len(parts))) if key in self.modules), None
+            )
+        return self._resolved[filename]
+
+    def enclosing(self, filename: str, lineno: int) -> Optional[Dict[str, Any]]:
+        """Returns the function/method containing a line, else its module, else None."""
+        key = self.module_key(filename)
+        if key is None:
+            return None
+        starts, intervals = self.functions[key]
+        position = bisect.bisect_right(starts, lineno) - 1
+        if position >= 0 and lineno <= intervals[position][1]:
+            return intervals[position][2]
+        return self.modules[key]
+
+
+def apply_profile(structure: Dict[str, Any], path: str) -> Tuple[str, int]:
+    """Joins a pstats dump or tracemalloc snapshot onto the structure in place.
+
+    Returns ``(kind, matched)`` where kind is ``"time"`` or ``"alloc"`` and
+    matched counts the profile entries that landed on a node.
+    """
+    index = ProfileIndex(structure)
+    try:
+        stats = pstats.Stats(path)
+    except (ValueError, EOFError, TypeError):
+        snapshot = tracemalloc.Snapshot.load(path)
+        return "alloc", _apply_allocations(index, snapshot)
+    return "time", _apply_stats(index, stats)
+
+
+def _apply_stats(index: ProfileIndex, stats: pstats.Stats) -> int:
+    """Adds cProfile timings: a function's own code object gives its cumulative
+    time and call count, nested code (lambdas, comprehensions, inner functions)
+    and module-level code only add self time to whatever encloses them."""
+    matched = 0
+    for (filename, lineno, funcname), (_, calls, self_time, cum_time, _) in stats.stats.items():
+        node = index.enclosing(filename, lineno)
+        if node is None:
+            continue
+        matched += 1
+        node["self_time"] = node.get("self_time", 0.0) + self_time
+        if node.get("type") in ("function", "method") and funcname.rsplit(".", 1)[-1] == node["name"] \
+                and lineno <= node["lines"][0]:
+            node["cum_time"] = node.get("cum_time", 0.0) + cum_time
+            node["calls"] = node.get("calls", 0) + calls
+    return matched
+
+
+def _apply_allocations(index: ProfileIndex, snapshot: tracemalloc.Snapshot) -> int:
+    """Adds live allocation sizes per line to the enclosing function or module."""
+    matched = 0
+    for stat in snapshot.statistics("lineno"):
+        frame = stat.traceback[0]
+        node = index.enclosing(frame.filename, frame.lineno)
+        if node is None:
+            continue
+        matched += 1
+        node["alloc_bytes"] = node.get("alloc_bytes", 0) + stat.size
+    return matched
@@ -0,0 +1,78 @@
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+
+# Keys that are derived from or hold other nodes, so they never feed a node's own digest
+NON_CONTENT_KEYS = ("children", "hash", "collapsed")
+# Keys that never change how a subtree renders, so edits to them keep cached fragments valid
+UNDRAWN_KEYS = ("digest",)
+
+
+def compute_hashes(structure: Dict[str, Any]) -> str:
+    """Stores a Merkle hash on every node and returns the root's.
+
+    A node's hash covers its type, name and other scalar fields (metrics,
+    imports, summaries) plus its children's hashes in order, so two
+    subtrees share a hash exactly when they would render identically.
+    Existing hashes are recomputed, which keeps patched structures honest.
+    """
+    order = []
+    stack = [structure]
+    while stack:
+        node = stack.pop()
+        order.append(node)
+        stack.extend(node.get("children", []))
+
+    for node in reversed(order):
+        fields = {k: v for k, v in node.items() if k not in NON_CONTENT_KEYS and k not in UNDRAWN_KEYS}
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(json.dumps(fields, sort_keys=True, separators=(",", ":")).encode("utf-8"))
+        for child in node.get("children", []):
+            digest.update(child["hash"].encode("ascii"))
+        node["hash"] = digest.hexdigest()
+
+    return structure["hash"]
+
+
+class RenderCache:
+    """On-disk memo of laid-out subtrees: key -> (fragment, width, height).
+
+    Entries are single JSON files sharded by key prefix and written with an
+    atomic rename, so several processes and runs can share one directory.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+
+    def _entry_path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Tuple[str, float, float]]:
+        try:
+            with open(self._entry_path(key), "r", encoding="utf-8") as f:
+                fragment, width, height = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return fragment, width, height
+
+    def put(self, key: str, value: Tuple[str, float, float]) -> None:
+        path = self._entry_path(key)
+        path.parent.mkdir(exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(list(value), f, separators=(",", ":"))
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
@@ -1,5 +1,21 @@
+import hashlib
+import heapq
+import html
 import json
-from typing import Dict, Any, List, Tuple
+import math
+import re
+import uuid
+from collections import Counter
+from concurrent.futures import Executor, Future
+from typing import Callable, Dict, Any, List, Optional, Sequence, Tuple
+
+from code_big_picture import layout_kernel
+from code_big_picture.deps import build_dependency_graph
+from code_big_picture.lod import count_nodes
+from code_big_picture.render_cache import RenderCache, compute_hashes
+
+# Node ids as they appear in id="...", toggleNode('...') and content-... references
+NODE_ID_PATTERN = re.compile(r"(?<=[\"'-])node-[0-9a-f]{8}(?=[\"'])")
 
 
 class SVGRenderer:
@@ -15,15 +31,106 @@ class SVGRenderer:
         "method": {"bg": "#fff0f6", "stroke": "#c2255c", "text": "#a61e4d", "icon": "terminal"},
         "function": {"bg": "#fff9db", "stroke": "#f08c00", "text": "#e67700", "icon": "terminal"},
         "file": {"bg": "#f1f3f5", "stroke": "#868e96", "text": "#495057", "icon": "file-text"},
-        "error": {"bg": "#fff5f5", "stroke": "#fa5252", "text": "#c92a2a", "icon": "alert-circle"}
+        "error": {"bg": "#fff5f5", "stroke": "#fa5252", "text": "#c92a2a", "icon": "alert-circle"},
+        "aggregate": {"bg": "#f8f0fc", "stroke": "#9c36b5", "text": "#862e9c", "icon": "grid"}
     }
     
+    # Overrides for nodes of a structural diff (see diff.diff_structures), by their "diff" status
+    DIFF_THEME = {
+        "added": {"bg": "#ebfbee", "stroke": "#2f9e44", "text": "#2b8a3e"},
+        "removed": {"bg": "#ffe3e3", "stroke": "#e03131", "text": "#c92a2a"},
+        "changed": {"bg": "#fff4e6", "stroke": "#e8590c", "text": "#d9480f"},
+        "unchanged": {"bg": "#f8f9fa", "stroke": "#ced4da", "text": "#868e96"},
+    }
+
+    # Heatmap modes: metric name -> how container nodes aggregate their children
+    HEAT_MODES = {
+        "loc": "sum",
+        "complexity": "max",
+        "methods": "sum",
+        "time": "sum",
+        "cumtime": "max",
+        "alloc": "sum",
+    }
+    # Heatmap modes read from a joined profile (see profiling.apply_profile); these also size leaves
+    PROFILE_METRICS = {"time": "self_time", "cumtime": "cum_time", "alloc": "alloc_bytes"}
+
+    # Shared asset files referenced by pages rendered with ``asset_prefix``
+    STYLESHEET_FILE = "code_big_picture.css"
+    RUNTIME_FILE = "code_big_picture.js"
+
     # Constants
     VERSION = "3.0"
     HEADER_HEIGHT = 35
+    # Closes the markup opened by _open_container
+    CONTAINER_CLOSE = """
+            </g>
+        </g>
+        """
+    # Layout progress is reported as each subtree at this depth (or a shallower leaf) completes
+    PROGRESS_DEPTH = 2
+    # Rough browser memory per SVG element (DOM node, computed style, layout box) and per
+    # byte of page source (kept as text plus parser buffers), for size_report estimates
+    CLIENT_BYTES_PER_ELEMENT = 1200
+    CLIENT_BYTES_PER_SOURCE_BYTE = 3
     
-    def __init__(self, structure: Dict[str, Any]):
+    def __init__(self, structure: Dict[str, Any], commit: Optional[str] = None,
+                 color_by: str = "type", dependencies: bool = False,
+                 executor: Optional[Executor] = None, parallel_depth: int = 2,
+                 cache: Optional[RenderCache] = None, dedupe: bool = False,
+                 chunk_depth: Optional[int] = None, collapse_depth: Optional[int] = None,
+                 collapse_types: Optional[List[str]] = None, asset_prefix: Optional[str] = None,
+                 overview_href: Optional[str] = None, metric_max: Optional[Dict[str, float]] = None,
+                 minimap_depth: Optional[int] = 2, aggregate_detail: bool = True,
+                 progress: Optional[Callable[[int, int], None]] = None, measure: bool = False):
+        if color_by != "type" and color_by not in self.HEAT_MODES:
+            raise ValueError(f"Unknown color mode '{color_by}'")
         self.structure = structure
+        self.commit = commit
+        self.color_by = color_by
+        # Draw the package-level import graph as an on-demand overlay
+        self.dependencies = dependencies
+        self._dependency_edges: List[Tuple[str, str, int]] = []
+        # Optional pool laying out independent subtrees at ``parallel_depth`` concurrently
+        self.executor = executor
+        self.parallel_depth = parallel_depth
+        self._precomputed: Dict[int, Future] = {}
+        # Optional memo of laid-out subtrees keyed by Merkle hash, reused across runs
+        self.cache = cache
+        self._settings_key = ""
+        # Emit repeated identical subtrees once as <symbol> templates
+        self.dedupe = dedupe
+        self._template_shapes: set = set()
+        self._templates: Dict[str, Tuple[str, float, float]] = {}
+        self._drawn: Dict[int, str] = {}
+        self._static = 0
+        # Stream content of nodes at this depth after the page skeleton (progressive paint)
+        self.chunk_depth = chunk_depth
+        self._chunks: List[Tuple[str, str]] = []
+        # Nodes at/below collapse_depth, or of a listed type, start collapsed with precomputed geometry
+        self.collapse_depth = collapse_depth
+        self.collapse_types = set(collapse_types or [])
+        # Link the stylesheet and runtime from this prefix instead of inlining them (sharded output)
+        self.asset_prefix = asset_prefix
+        # Header link back to the overview page, for shard pages
+        self.overview_href = overview_href
+        # Heat scale shared by several pages; computed from the structure when None
+        self.metric_max = metric_max
+        # Levels drawn on the minimap canvas; None leaves the minimap out
+        self.minimap_depth = minimap_depth
+        # Embed each aggregate's collapsed subtree, drawn over the map when its box is clicked
+        self.aggregate_detail = aggregate_detail
+        # Minimap boxes supplied by a streaming writer instead of layout_boxes()
+        self._minimap_boxes: Optional[List[Tuple[float, float, float, float, int, Dict[str, Any]]]] = None
+        # Called as progress(nodes laid out, total nodes) during render(); may raise to abort it
+        self.progress = progress
+        self._progress_done = 0
+        self._progress_total = 0
+        # Emitted size of each laid-out subtree keyed by id(node), for size_report()
+        self.measure = measure
+        self._sizes: Dict[int, int] = {}
+        self._metric_cache: Dict[int, float] = {}
+        self._metric_max: Dict[str, float] = {}
         self.padding = 15
         self.margin = 10
         self.header_height = self.HEADER_HEIGHT
@@ -33,8 +140,199 @@ class SVGRenderer:
 
     def render(self) -> str:
         """Main entry point - assembles the complete HTML document."""
-        svg_content, width, height = self._generate_box(self.structure)
+        if self.color_by != "type":
+            self._metric_max = self.metric_max or self._collect_metric_max(self.structure)
+        if self.dependencies:
+            self._dependency_edges = build_dependency_graph(self.structure).bundled()
+        if self.cache is not None or self.dedupe:
+            self._settings_key = self._layout_settings_key()
+        if self.cache is not None:
+            compute_hashes(self.structure)
+        if self.dedupe:
+            self._drawn = {}
+            self._template_shapes = self._collect_template_shapes(self.structure)
+        if self.executor is not None:
+            self._submit_subtrees()
+        self._templates = {}
+        self._chunks = []
+        self._sizes = {}
+        if self.progress is not None:
+            self._progress_total = count_nodes(self.structure)
+            self._progress_done = 0
+        try:
+            svg_content, width, height = self._generate_box(self.structure)
+        finally:
+            self._precomputed = {}
+        if self.progress is not None:
+            self.progress(self._progress_total, self._progress_total)
         return self._build_html_document(svg_content)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Workers only need layout settings; the subtree travels as the call argument
+        state = self.__dict__.copy()
+        state.update(structure=None, executor=None, progress=None, measure=False, _precomputed={},
+                     _metric_cache={}, _drawn={}, _dependency_edges=[], _templates={}, _chunks=[], _sizes={})
+        return state
+
+    def _layout_settings_key(self) -> str:
+        """Digest of every setting that changes a subtree's fragment, mixed into cache keys."""
+        settings = {
+            "version": self.VERSION,
+            "color_by": self.color_by,
+            "metric_max": self._metric_max,
+            "dependencies": self.dependencies,
+            "dedupe": self.dedupe,
+            "aggregate_detail": self.aggregate_detail,
+            "collapse_types": sorted(self.collapse_types),
+            "geometry": [self.padding, self.margin, self.header_height,
+                         self.min_leaf_width, self.max_leaf_width, self.min_leaf_height],
+        }
+        return hashlib.blake2b(json.dumps(settings, sort_keys=True).encode("utf-8"), digest_size=8).hexdigest()
+
+    def _is_cacheable(self, node: Dict[str, Any], depth: int) -> bool:
+        """Whether a subtree's fragment depends only on its hash and the layout settings."""
+        if self.cache is None or depth == 0 or self._static:
+            return False
+        if not node.get("children") or "hash" not in node:
+            return False
+        # Nodes down to the chunk depth have their content split out per document
+        return self.chunk_depth is None or depth > self.chunk_depth
+
+    def _cache_key(self, node: Dict[str, Any], depth: int) -> str:
+        key = f"{node['hash']}-{self._settings_key}"
+        if self.collapse_depth is not None:
+            # Everything at or below the collapse depth renders the same way
+            key += f"-c{min(depth, self.collapse_depth)}"
+        return key
+
+    def _starts_collapsed(self, node_type: str, depth: int) -> bool:
+        if self._static:
+            # Template content has no toggles, so it always stays expanded
+            return False
+        if self.collapse_depth is not None and depth >= self.collapse_depth:
+            return True
+        return node_type in self.collapse_types
+
+    @staticmethod
+    def _fresh_ids(fragment: str) -> str:
+        """Re-issues node ids in a reused fragment so repeats never collide in one document."""
+        mapping: Dict[str, str] = {}
+
+        def replace(match):
+            old = match.group(0)
+            if old not in mapping:
+                mapping[old] = f"node-{uuid.uuid4().hex[:8]}"
+            return mapping[old]
+
+        return NODE_ID_PATTERN.sub(replace, fragment)
+
+    def _submit_subtrees(self) -> None:
+        """Hands every container subtree at ``parallel_depth`` to the executor.
+
+        Siblings are independent until their parent packs them into rows, so
+        each worker returns a finished (fragment, w, h) that ``_generate_box``
+        stitches in when the serial walk reaches that node. Every task runs
+        on its own copy of the layout settings, taken here: thread workers
+        never share this renderer's mutable state or see its pending futures.
+        """
+        level = [self.structure]
+        for _ in range(self.parallel_depth):
+            level = [child for node in level for child in node.get("children", [])]
+        for node in level:
+            if node.get("children"):
+                worker = self._settings_copy()
+                self._precomputed[id(node)] = self.executor.submit(worker._layout_subtree, node, self.parallel_depth)
+
+    def _settings_copy(self) -> "SVGRenderer":
+        """A renderer holding this one's settings with fresh per-render state, as workers receive it."""
+        worker = object.__new__(type(self))
+        worker.__dict__.update(self.__getstate__())
+        return worker
+
+    def _layout_subtree(self, node: Dict[str, Any], depth: int) -> Tuple[str, float, float, Dict[str, Tuple[str, float, float]], List[Tuple[str, str]]]:
+        """Worker entry point: a subtree's (fragment, w, h) plus the templates and chunks it produced."""
+        svg, w, h = self._generate_box(node, depth)
+        return svg, w, h, self._templates, self._chunks
+
+    def _shape_of(self, node: Dict[str, Any]) -> str:
+        """Hash of a node's type and how its children draw, ignoring its own name and fields.
+
+        Two containers with the same shape render identically apart from
+        their header label, so their content can share one template.
+        """
+        digest = hashlib.blake2b(node.get("type", "").encode("utf-8"), digest_size=8)
+        for child in node.get("children", []):
+            digest.update(self._drawn_digest(child).encode("ascii"))
+        return digest.hexdigest()
+
+    def _drawn_digest(self, node: Dict[str, Any]) -> str:
+        """Hash of everything that shows in a node's drawing, its subtree included.
+
+        Only the label, summary, link, diff status and the active metric
+        count, so line ranges, decorators and metrics of other color modes
+        do not keep identical code in different places from sharing a
+        template. Aggregates carrying their detail are never shared: a
+        template would drop it.
+        """
+        key = id(node)
+        if key not in self._drawn:
+            fields = [node.get("type", ""), node.get("name", ""), node.get("link"), node.get("diff")]
+            if node.get("type") == "aggregate":
+                fields.append(node.get("summary"))
+                if node.get("collapsed") and self.aggregate_detail:
+                    fields.append(key)
+            if self.color_by != "type":
+                fields.append(self._metric(node))
+            digest = hashlib.blake2b(json.dumps(fields).encode("utf-8"), digest_size=8)
+            for child in node.get("children", []):
+                digest.update(self._drawn_digest(child).encode("ascii"))
+            self._drawn[key] = digest.hexdigest()
+        return self._drawn[key]
+
+    def _collect_template_shapes(self, root: Dict[str, Any]) -> set:
+        """Returns the shapes of containers (below the root) that occur more than once."""
+        seen: set = set()
+        repeated: set = set()
+        stack = list(root.get("children", []))
+        while stack:
+            node = stack.pop()
+            if not node.get("children"):
+                continue
+            shape = self._shape_of(node)
+            if shape in seen:
+                repeated.add(shape)
+            seen.add(shape)
+            stack.extend(node["children"])
+        return repeated
+
+    def _use_template(self, shape: str, children: List[Dict[str, Any]], depth: int) -> Tuple[str, float, float]:
+        """Returns a <use> of the shape's template, laying the template out on first use."""
+        template_id = f"tpl-{shape}"
+        if shape not in self._templates:
+            self._static += 1
+            try:
+                content, w, h = self._layout_rows(children, depth)
+            finally:
+                self._static -= 1
+            self._templates[shape] = (f'<symbol id="{template_id}" overflow="visible">{content}</symbol>', w, h)
+            if self.cache is not None:
+                self.cache.put(f"{template_id}-{self._settings_key}", self._templates[shape])
+        _, w, h = self._templates[shape]
+        return f'<use href="#{template_id}" width="{w}" height="{h}" />', w, h
+
+    def _restore_templates(self, fragment: str) -> bool:
+        """Loads templates referenced by a cached fragment; False if any is unavailable."""
+        pending = [fragment]
+        while pending:
+            for shape in re.findall(r'href="#tpl-([0-9a-f]+)"', pending.pop()):
+                if shape in self._templates:
+                    continue
+                cached = self.cache.get(f"tpl-{shape}-{self._settings_key}")
+                if cached is None:
+                    return False
+                self._templates[shape] = cached
+                pending.append(cached[0])
+        return True
     
     def _build_html_document(self, svg_content: str) -> str:
         """Assembles the complete HTML document from components."""
@@ -43,11 +341,11 @@ class SVGRenderer:
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Code Big Picture V{self.VERSION}</title>
+    <title>Code Big Picture V{self.VERSION}</title>{self._build_meta()}
     <link rel="preconnect" href="https://fonts.googleapis.com">
     <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
     <link href="https://fonts.googleapis.com/css2?family=Inter:wght@400;600;800&family=JetBrains+Mono:wght@400&display=swap" rel="stylesheet">
-    <style>{self._build_css()}</style>
+    {self._build_stylesheet()}
 </head>
 <body>
     {self._build_svg_symbols()}
@@ -55,10 +353,33 @@ class SVGRenderer:
     {self._build_viewport(svg_content)}
     {self._build_legend()}
     {self._build_controls()}
+    {self._build_minimap()}
+    {self._build_layout_worker()}
     {self._build_scripts()}
+    {self._build_dependency_script()}
+    {self._build_chunks()}
 </body>
 </html>"""
 
+    def build_assets(self) -> Dict[str, str]:
+        """Returns the shared stylesheet and runtime as ``{file name: content}``.
+
+        Pages rendered with ``asset_prefix`` reference these files instead of
+        inlining them, so a set of pages downloads and caches them once.
+        """
+        return {self.STYLESHEET_FILE: self._build_css(), self.RUNTIME_FILE: self._runtime_js()}
+
+    def _build_stylesheet(self) -> str:
+        if self.asset_prefix is not None:
+            return f'<link rel="stylesheet" href="{html.escape(self.asset_prefix + self.STYLESHEET_FILE, quote=True)}">'
+        return f"<style>{self._build_css()}</style>"
+
+    def _build_meta(self) -> str:
+        """Returns extra <meta> tags recording how the map was built."""
+        if not self.commit:
+            return ""
+        return f'\n    <meta name="code-big-picture-commit" content="{self.commit}">'
+
     def _build_css(self) -> str:
         """Returns all CSS styles for the visualization."""
         return """
@@ -181,6 +502,12 @@ class SVGRenderer:
         
         .node { transition: opacity 0.3s ease; }
         .node.dimmed { opacity: 0.15; filter: grayscale(100%); }
+        .shard-link { cursor: pointer; }
+        .shard-link:hover .box-rect { stroke-width: 2.5; }
+        .aggregate-link { cursor: zoom-in; }
+        .aggregate-link:hover .box-rect { stroke-width: 2.5; }
+        .aggregate-detail { cursor: zoom-out; filter: drop-shadow(0 4px 12px rgba(0, 0, 0, 0.25)); }
+        a.header-btn { text-decoration: none; }
         .node.highlighted > .box-rect {
             stroke: var(--accent) !important;
             stroke-width: 3;
@@ -218,6 +545,36 @@ class SVGRenderer:
             font-size: 20px;
         }
 
+        .minimap {
+            position: fixed;
+            top: 85px;
+            right: 30px;
+            width: 220px;
+            height: 160px;
+            overflow: hidden;
+            background: rgba(255, 255, 255, 0.8);
+            backdrop-filter: blur(10px);
+            border-radius: 12px;
+            border: 1px solid rgba(0,0,0,0.05);
+            box-shadow: 0 4px 20px rgba(0,0,0,0.06);
+            cursor: crosshair;
+            touch-action: none;
+        }
+
+        .minimap canvas {
+            width: 100%;
+            height: 100%;
+            display: block;
+        }
+
+        .minimap-view {
+            position: absolute;
+            border: 2px solid #1971c2;
+            background: rgba(25, 113, 194, 0.08);
+            border-radius: 2px;
+            pointer-events: none;
+        }
+
         .legend {
             position: fixed;
             bottom: 30px;
@@ -257,6 +614,18 @@ class SVGRenderer:
             height: 14px;
             opacity: 0.7;
         }
+
+        #dep-overlay { pointer-events: none; }
+        #dep-overlay path {
+            fill: none;
+            stroke: rgba(214, 51, 108, 0.55);
+            stroke-linecap: round;
+        }
+
+        .heat-swatch {
+            border-radius: 3px;
+            background: linear-gradient(90deg, hsl(120, 70%, 45%), hsl(0, 70%, 45%));
+        }
         """
 
     def _build_svg_symbols(self) -> str:
@@ -293,6 +662,7 @@ class SVGRenderer:
         <!-- Logic icons -->
         <symbol id="terminal" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><polyline points="4 17 10 11 4 5"></polyline><line x1="12" y1="19" x2="20" y2="19"></line></symbol>
         <symbol id="file-text" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M14 2H6a2 2 0 0 0-2 2v16a2 2 0 0 0 2 2h12a2 2 0 0 0 2-2V8z"></path><polyline points="14 2 14 8 20 8"></polyline><line x1="16" y1="13" x2="8" y2="13"></line><line x1="16" y1="17" x2="8" y2="17"></line><line x1="10" y1="9" x2="8" y2="9"></line></symbol>
+        <symbol id="grid" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><rect x="3" y="3" width="7" height="7"></rect><rect x="14" y="3" width="7" height="7"></rect><rect x="14" y="14" width="7" height="7"></rect><rect x="3" y="14" width="7" height="7"></rect></symbol>
         <symbol id="alert-circle" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><circle cx="12" cy="12" r="10"></circle><line x1="12" y1="8" x2="12" y2="12"></line><line x1="12" y1="16" x2="12.01" y2="16"></line></symbol>
     </svg>
         """
@@ -303,7 +673,7 @@ class SVGRenderer:
     <header>
         <div class="brand">
             <h1>Code Big Picture</h1>
-            <div class="badge">V{self.VERSION}</div>
+            <div class="badge">V{self.VERSION}</div>{self._build_overview_link()}
         </div>
         
         <div class="header-controls">
@@ -321,7 +691,7 @@ class SVGRenderer:
                     <line x1="8" y1="12" x2="16" y2="12"></line>
                 </svg>
                 باز کردن همه
-            </button>
+            </button>{self._build_dependency_button()}
         </div>
         
         <div class="search-container">
@@ -334,11 +704,68 @@ class SVGRenderer:
     </header>
         """
 
+    def _build_overview_link(self) -> str:
+        """Returns the header link from a shard page back to the overview, if any."""
+        if not self.overview_href:
+            return ""
+        return f"""
+            <a class="header-btn" href="{html.escape(self.overview_href, quote=True)}" title="Back to the overview">&larr; Overview</a>"""
+
+    def _build_template_defs(self) -> str:
+        """Returns the <defs> block holding shared subtree templates, if any."""
+        if not self._templates:
+            return ""
+        return f"""
+            <defs>{''.join(markup for markup, _, _ in self._templates.values())}</defs>"""
+
+    def _build_chunks(self) -> str:
+        """Returns deferred subtree content, each chunk attached as soon as it is parsed.
+
+        Everything above ``chunk_depth`` (header, top-level boxes with their
+        final sizes, runtime) precedes this, so the overview paints before the
+        bulk of the document has downloaded.
+        """
+        if not self._chunks:
+            return ""
+        parts = ["""
+    <script>
+        window.attachChunk = function(nodeId) {
+            const tpl = document.getElementById('chunk-' + nodeId);
+            const target = document.getElementById('content-' + nodeId);
+            const holder = tpl.content.firstElementChild;
+            while (holder.firstChild) {
+                target.appendChild(holder.firstChild);
+            }
+            target.removeAttribute('data-chunk');
+            tpl.remove();
+        };
+        fitToScreen();
+    </script>"""]
+        for node_id, content in self._chunks:
+            parts.append(
+                f'\n    <template id="chunk-{node_id}"><svg xmlns="http://www.w3.org/2000/svg">{content}</svg></template>'
+                f'<script>attachChunk(\'{node_id}\')</script>'
+            )
+        return "".join(parts)
+
+    def _build_dependency_button(self) -> str:
+        """Returns the header button toggling the import overlay, if enabled."""
+        if not self.dependencies:
+            return ""
+        return """
+            <button class="header-btn" onclick="toggleDependencies()" title="Show package imports">
+                <svg width="14" height="14" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
+                    <circle cx="5" cy="6" r="3"></circle><circle cx="19" cy="18" r="3"></circle>
+                    <path d="M8 6h4a4 4 0 0 1 4 4v5"></path>
+                </svg>
+                Dependencies
+            </button>"""
+
     def _build_viewport(self, svg_content: str) -> str:
         """Returns the main viewport containing the SVG visualization."""
         return f"""
     <div id="viewport">
-        <svg id="main-svg" width="100%" height="100%">
+        <svg id="main-svg" width="100%" height="100%">{self._build_template_defs()}
             <g id="scene">
                 {svg_content}
             </g>
@@ -348,6 +775,16 @@ class SVGRenderer:
 
     def _build_legend(self) -> str:
         """Returns the map legend panel."""
+        extra_items = ""
+        if self.color_by != "type":
+            extra_items = f"""
+        <div class="legend-item"><span class="legend-icon heat-swatch"></span> Color: {self.color_by} (green low, red high)</div>"""
+        if "diff_summary" in self.structure:
+            extra_items += f"""
+        <div class="legend-item">Diff: {html.escape(self.structure['diff_summary'])}</div>"""
+            for status, theme in self.DIFF_THEME.items():
+                extra_items += f"""
+        <div class="legend-item"><span class="legend-icon" style="background: {theme['bg']}; border: 1px solid {theme['stroke']}; border-radius: 3px;"></span> {status.capitalize()}</div>"""
         return """
     <div class="legend" id="map-legend">
         <div class="legend-title">Map Guide / راهنما</div>
@@ -358,6 +795,7 @@ class SVGRenderer:
         <div class="legend-item"><svg class="legend-icon"><use href="#box" /></svg> Class</div>
         <div class="legend-item"><svg class="legend-icon"><use href="#terminal" /></svg> Function / Method</div>
         <div class="legend-item"><svg class="legend-icon"><use href="#file-text" /></svg> Other File</div>
+        <div class="legend-item"><svg class="legend-icon"><use href="#grid" /></svg> Aggregated Subtree</div>""" + extra_items + """
     </div>
         """
 
@@ -371,11 +809,154 @@ class SVGRenderer:
     </div>
         """
 
+    def _build_minimap(self) -> str:
+        """Returns the minimap panel and the geometry it is drawn from.
+
+        Boxes down to ``minimap_depth`` are emitted as one flat
+        ``[x, y, w, h, depth, color, ...]`` array in their initial collapse
+        state, with colors indexing a ``[fill, stroke]`` palette. The runtime
+        paints them once on a canvas and only moves the viewport frame as the
+        map pans and zooms, so finding one's place never needs the whole
+        scene repainted at a tiny scale.
+        """
+        if self.minimap_depth is None:
+            return ""
+        boxes = self._minimap_boxes
+        if boxes is None:
+            boxes = self.layout_boxes(max_depth=self.minimap_depth, as_rendered=True)
+        if not boxes:
+            return ""
+        palette: Dict[Tuple[str, str], int] = {}
+        flat: List[int] = []
+        for x, y, w, h, depth, node in boxes:
+            theme = self._node_theme(node)
+            color = palette.setdefault((theme["bg"], theme["stroke"]), len(palette))
+            flat.extend((round(x), round(y), round(w), round(h), depth, color))
+        data = {
+            "depth": self.minimap_depth,
+            "width": round(boxes[0][2]),
+            "height": round(boxes[0][3]),
+            "colors": [list(key) for key in palette],
+            "boxes": flat,
+        }
+        data_json = json.dumps(data, separators=(",", ":")).replace("</", "<\\/")
+        return f"""
+    <div class="minimap" id="minimap" title="Minimap: click or drag to move the view">
+        <canvas id="minimap-canvas"></canvas>
+        <div class="minimap-view" id="minimap-view"></div>
+    </div>
+    <script type="application/json" id="minimap-data">{data_json}</script>
+        """
+
+    def _build_layout_worker(self) -> str:
+        """Returns the source of the Web Worker that runs search and relayout off the UI thread.
+
+        The page snapshots node names, parent links and row geometry once the
+        document (chunks included) has loaded and hands them to the worker;
+        from then on the UI thread only posts toggles and queries and applies
+        the small diffs of classes, heights and row offsets that come back.
+        It is a non-executing script block so the single-file page can start
+        it from a Blob URL.
+        """
+        return """
+    <script type="text/js-worker" id="layout-worker-src">
+        const HEADER_H = 35;
+        const ROW_GAP = 8;
+        let names = [], parents = [], collapsed = [], fullH = [], rows = [], heights = [], flags = [];
+
+        // Mirrors calculateActualNodeHeight/repositionRows; returns whether the height changed
+        function layoutNode(i, rectDiff, rowDiff) {
+            let h = HEADER_H;
+            if (!collapsed[i] && fullH[i] >= 0) {
+                h = fullH[i];
+            } else if (!collapsed[i]) {
+                const nodeRows = rows[i];
+                for (let r = 0; r < nodeRows.length; r++) {
+                    const row = nodeRows[r];
+                    let rowH = row[0];
+                    for (const child of row[1]) rowH = Math.max(rowH, heights[child]);
+                    if (row[2] !== h || row[3] !== rowH) {
+                        row[2] = h;
+                        row[3] = rowH;
+                        rowDiff.push([i, r, h, rowH]);
+                    }
+                    h += rowH + ROW_GAP;
+                }
+            }
+            if (heights[i] === h) return false;
+            heights[i] = h;
+            rectDiff.push([i, h]);
+            return true;
+        }
+
+        function search(term) {
+            const n = names.length;
+            const next = new Uint8Array(n);
+            if (term) {
+                // Bit 1: dimmed, bit 2: highlighted
+                next.fill(1);
+                for (let i = 0; i < n; i++) {
+                    if (!names[i].includes(term)) continue;
+                    next[i] = 2;
+                    // An undimmed node's ancestors are already undimmed
+                    for (let p = parents[i]; p >= 0 && (next[p] & 1); p = parents[p]) next[p] &= ~1;
+                }
+            }
+            const changes = [];
+            for (let i = 0; i < n; i++) {
+                if (next[i] !== flags[i]) {
+                    flags[i] = next[i];
+                    changes.push([i, next[i]]);
+                }
+            }
+            return changes;
+        }
+
+        self.onmessage = (e) => {
+            const msg = e.data;
+            if (msg.op === 'init') {
+                ({ names, parents, collapsed, fullH, rows, heights, flags } = msg.model);
+                names = names.map(name => name.toLowerCase());
+                return;
+            }
+            if (msg.op === 'search') {
+                self.postMessage({ type: 'search', changes: search(msg.term) });
+                return;
+            }
+            const rectDiff = [];
+            const rowDiff = [];
+            if (msg.op === 'toggle') {
+                collapsed[msg.node] = msg.collapsed;
+                layoutNode(msg.node, rectDiff, rowDiff);
+                // Ancestors only change while a height below them does
+                for (let p = parents[msg.node]; p >= 0 && layoutNode(p, rectDiff, rowDiff); p = parents[p]);
+            } else if (msg.op === 'setAll') {
+                for (let i = 0; i < collapsed.length; i++) {
+                    if (rows[i].length || fullH[i] >= 0) collapsed[i] = msg.collapsed;
+                }
+                // Document order puts parents first, so reverse order lays children out first
+                for (let i = collapsed.length - 1; i >= 0; i--) layoutNode(i, rectDiff, rowDiff);
+            }
+            self.postMessage({ type: 'layout', rects: rectDiff, rows: rowDiff });
+        };
+    </script>"""
+
     def _build_scripts(self) -> str:
         """Returns all JavaScript for interactivity."""
+        panzoom = """
+    <script src="https://unpkg.com/@panzoom/panzoom@4.5.1/dist/panzoom.min.js"></script>"""
+        if self.asset_prefix is not None:
+            src = html.escape(self.asset_prefix + self.RUNTIME_FILE, quote=True)
+            return panzoom + f"""
+    <script src="{src}"></script>
+        """
+        return panzoom + """
+    <script>""" + self._runtime_js() + """</script>
+        """
+
+    def _runtime_js(self) -> str:
+        """Returns the page runtime: pan/zoom, toggles, search and the layout worker client."""
         return """
-    <script src="https://unpkg.com/@panzoom/panzoom@4.5.1/dist/panzoom.min.js"></script>
-    <script>
         const elem = document.getElementById('scene');
         const svg = document.getElementById('main-svg');
         const searchInput = document.getElementById('search-input');
@@ -396,7 +977,7 @@ class SVGRenderer:
         function resetView() {
             fitToScreen();
             searchInput.value = '';
-            performSearch('');
+            runSearch('');
         }
         
         function fitToScreen() {
@@ -415,28 +996,138 @@ class SVGRenderer:
             panzoom.zoom(scale, { animate: true });
         }
 
-        // Expand All Nodes
-        window.expandAll = function() {
-            const allNodes = document.querySelectorAll('.node');
-            allNodes.forEach(node => {
+        // Search and relayout run in a Web Worker once the document has loaded;
+        // until then (or without Worker support) the main-thread versions below are used
+        const layout = { worker: null, nodes: [], contents: [], rects: [], rows: [], index: {}, searching: false, pendingQuery: null };
+
+        function snapshotLayout() {
+            const nodes = Array.from(elem.querySelectorAll('.node[id]'));
+            const index = {};
+            nodes.forEach((node, i) => { index[node.id] = i; });
+            const model = { names: [], parents: [], collapsed: [], fullH: [], rows: [], heights: [], flags: [] };
+            const contents = [], rects = [], rowEls = [];
+            nodes.forEach(node => {
+                const rect = node.querySelector('.box-rect');
+                const textEl = node.querySelector('text');
                 const content = document.getElementById('content-' + node.id);
-                if (content && content.style.display === 'none') {
-                    window.toggleNode(node.id);
+                const parentNode = node.parentElement.closest('.node[id]');
+                model.names.push(textEl ? textEl.textContent : '');
+                model.parents.push(parentNode && parentNode.id in index ? index[parentNode.id] : -1);
+                model.collapsed.push(!!content && content.style.display === 'none');
+                model.fullH.push(content && content.dataset.template ? parseFloat(rect.getAttribute('data-full-h')) : -1);
+                model.heights.push(parseFloat(rect.getAttribute('height')));
+                model.flags.push((node.classList.contains('dimmed') ? 1 : 0) | (node.classList.contains('highlighted') ? 2 : 0));
+
+                const els = content ? Array.from(content.querySelectorAll(':scope > .row')) : [];
+                model.rows.push(els.map(row => {
+                    // [tallest leaf, child node indexes, y, row height]
+                    let leafH = 0;
+                    const children = [];
+                    for (const item of row.children) {
+                        const child = item.firstElementChild;
+                        if (child && child.classList.contains('node')) {
+                            children.push(index[child.id]);
+                        } else {
+                            const rect = item.querySelector('.box-rect');
+                            if (rect) leafH = Math.max(leafH, parseFloat(rect.getAttribute('height')));
+                        }
+                    }
+                    return [leafH, children, parseFloat(row.getAttribute('data-y')), parseFloat(row.getAttribute('data-row-h'))];
+                }));
+                contents.push(content);
+                rects.push(rect);
+                rowEls.push(els);
+            });
+            Object.assign(layout, { nodes, contents, rects, rows: rowEls, index });
+            return model;
+        }
+
+        function onLayoutMessage(e) {
+            const msg = e.data;
+            if (msg.type === 'layout') {
+                for (const [i, h] of msg.rects) {
+                    layout.rects[i].setAttribute('height', h);
+                }
+                for (const [i, r, y, rowH] of msg.rows) {
+                    const row = layout.rows[i][r];
+                    row.setAttribute('data-y', y);
+                    row.setAttribute('data-row-h', rowH);
+                    row.setAttribute('transform', 'translate(0, ' + y + ')');
+                }
+                document.dispatchEvent(new Event('layoutchange'));
+            } else if (msg.type === 'search') {
+                for (const [i, flags] of msg.changes) {
+                    layout.nodes[i].classList.toggle('dimmed', (flags & 1) !== 0);
+                    layout.nodes[i].classList.toggle('highlighted', (flags & 2) !== 0);
+                }
+                layout.searching = false;
+                if (layout.pendingQuery !== null) {
+                    const query = layout.pendingQuery;
+                    layout.pendingQuery = null;
+                    runSearch(query);
                 }
+            }
+        }
+
+        function startLayoutWorker() {
+            if (!window.Worker || !window.Blob) return;
+            try {
+                const source = document.getElementById('layout-worker-src').textContent;
+                const worker = new Worker(URL.createObjectURL(new Blob([source], { type: 'text/javascript' })));
+                worker.onmessage = onLayoutMessage;
+                worker.onerror = () => { layout.worker = null; };
+                worker.postMessage({ op: 'init', model: snapshotLayout() });
+                layout.worker = worker;
+            } catch (err) {
+                layout.worker = null;
+            }
+        }
+
+        // At most one query is in flight; keystrokes meanwhile collapse into the latest one
+        function runSearch(query) {
+            if (!layout.worker) {
+                performSearch(query);
+                return;
+            }
+            if (layout.searching) {
+                layout.pendingQuery = query;
+                return;
+            }
+            layout.searching = true;
+            layout.worker.postMessage({ op: 'search', term: query.toLowerCase().trim() });
+        }
+
+        function setAllCollapsed(collapse) {
+            if (!layout.worker) {
+                const allNodes = Array.from(document.querySelectorAll('.node'));
+                (collapse ? allNodes.reverse() : allNodes).forEach(node => {
+                    const content = document.getElementById('content-' + node.id);
+                    if (content && (content.style.display === 'none') !== collapse) {
+                        window.toggleNode(node.id);
+                    }
+                });
+                return;
+            }
+            // Flip visibility here, then let the worker relayout everything in one pass
+            layout.nodes.forEach((node, i) => {
+                const content = layout.contents[i];
+                if (!content || (content.style.display === 'none') === collapse) return;
+                content.style.display = collapse ? 'none' : 'block';
+                node.querySelector('.toggle-btn text').textContent = collapse ? '+' : '-';
+                node.classList.toggle('collapsed', collapse);
             });
+            layout.worker.postMessage({ op: 'setAll', collapsed: collapse });
+        }
+
+        // Expand All Nodes
+        window.expandAll = function() {
+            setAllCollapsed(false);
             setTimeout(() => { fitToScreen(); }, 400);
         }
 
         // Collapse All Nodes
         window.collapseAll = function() {
-            const allNodes = document.querySelectorAll('.node');
-            const nodesArray = Array.from(allNodes).reverse();
-            nodesArray.forEach(node => {
-                const content = document.getElementById('content-' + node.id);
-                if (content && content.style.display !== 'none') {
-                    window.toggleNode(node.id);
-                }
-            });
+            setAllCollapsed(true);
             setTimeout(() => { fitToScreen(); }, 400);
         }
 
@@ -472,7 +1163,7 @@ class SVGRenderer:
                          parent.classList.remove('dimmed');
                      }
                      parent = parent.parentElement;
-                     if (parent.id === 'scene') break;
+                     if (!parent || parent.id === 'scene') break;
                 }
             });
         }
@@ -495,6 +1186,10 @@ class SVGRenderer:
             if (!content || content.style.display === 'none') {
                 return 35;
             }
+            if (content.dataset.template) {
+                // Shared template content is laid out in Python; its height is fixed
+                return parseFloat(nodeG.querySelector('.box-rect').getAttribute('data-full-h'));
+            }
             const headerH = 35;
             const margin = 8;
             let contentHeight = 0;
@@ -571,82 +1266,658 @@ class SVGRenderer:
                 nodeG.classList.add('collapsed');
             }
             
-            recalculateFromNode(nodeG);
+            if (layout.worker && nodeId in layout.index) {
+                layout.worker.postMessage({ op: 'toggle', node: layout.index[nodeId], collapsed: !isExpanding });
+            } else {
+                recalculateFromNode(nodeG);
+                document.dispatchEvent(new Event('layoutchange'));
+            }
         };
 
+        // Aggregate boxes carry their collapsed subtree as markup; a click draws it over the map
+        window.toggleAggregate = function(box) {
+            if (box.detailLayer) {
+                box.detailLayer.remove();
+                box.detailLayer = null;
+                return;
+            }
+            const holder = document.createElement('template');
+            holder.innerHTML = '<svg xmlns="http://www.w3.org/2000/svg">' + box.getAttribute('data-detail') + '</svg>';
+            const layer = document.createElementNS('http://www.w3.org/2000/svg', 'g');
+            layer.setAttribute('class', 'aggregate-detail');
+            const m = elem.getCTM().inverse().multiply(box.getCTM());
+            layer.setAttribute('transform', 'matrix(' + [m.a, m.b, m.c, m.d, m.e, m.f].join(',') + ')');
+            layer.append(...holder.content.firstElementChild.childNodes);
+            layer.addEventListener('click', () => window.toggleAggregate(box));
+            layer.detailBox = box;
+            elem.appendChild(layer);
+            box.detailLayer = layer;
+        };
+
+        // Relayouts move the boxes, so open subtrees are closed rather than left behind
+        document.addEventListener('layoutchange', () => {
+            elem.querySelectorAll(':scope > .aggregate-detail').forEach(layer => window.toggleAggregate(layer.detailBox));
+        });
+
         searchInput.addEventListener('input', (e) => {
-            performSearch(e.target.value);
+            runSearch(e.target.value);
         });
 
+        document.addEventListener('DOMContentLoaded', startLayoutWorker);
+
+        // Minimap: top levels painted once from the emitted geometry; afterwards
+        // only the viewport frame moves, and relayouts re-read the top levels
+        const minimap = { panel: document.getElementById('minimap'), data: null, k: 1, ox: 0, oy: 0, frame: 0, dragging: false };
+
+        function drawMinimap(data) {
+            const canvas = document.getElementById('minimap-canvas');
+            const ratio = window.devicePixelRatio || 1;
+            const cssW = canvas.clientWidth;
+            const cssH = canvas.clientHeight;
+            canvas.width = cssW * ratio;
+            canvas.height = cssH * ratio;
+            const ctx = canvas.getContext('2d');
+            ctx.setTransform(ratio, 0, 0, ratio, 0, 0);
+            ctx.clearRect(0, 0, cssW, cssH);
+            const k = Math.min((cssW - 10) / data.width, (cssH - 10) / data.height);
+            Object.assign(minimap, { data, k, ox: (cssW - data.width * k) / 2, oy: (cssH - data.height * k) / 2 });
+            const boxes = data.boxes;
+            ctx.lineWidth = 0.5;
+            for (let i = 0; i < boxes.length; i += 6) {
+                const x = minimap.ox + boxes[i] * k;
+                const y = minimap.oy + boxes[i + 1] * k;
+                const w = boxes[i + 2] * k;
+                const h = boxes[i + 3] * k;
+                const color = data.colors[boxes[i + 5]];
+                ctx.fillStyle = color[0];
+                ctx.fillRect(x, y, w, h);
+                if (w > 3 && h > 3) {
+                    ctx.strokeStyle = color[1];
+                    ctx.strokeRect(x, y, w, h);
+                }
+            }
+        }
+
+        // Same layout as the emitted array, read from the current DOM after toggles
+        function minimapFromDom() {
+            const root = elem.querySelector(':scope > .node');
+            if (!root || !minimap.data) return null;
+            const data = { depth: minimap.data.depth, colors: [], boxes: [] };
+            const palette = {};
+            const stack = [[root, 0, 0, 0]];
+            while (stack.length) {
+                const [el, x, y, depth] = stack.pop();
+                const rect = el.querySelector('.box-rect');
+                if (!rect) continue;
+                const fill = rect.getAttribute('fill');
+                const stroke = rect.getAttribute('stroke');
+                const key = fill + '|' + stroke;
+                if (!(key in palette)) {
+                    palette[key] = data.colors.length;
+                    data.colors.push([fill, stroke]);
+                }
+                const w = parseFloat(rect.getAttribute('width'));
+                const h = parseFloat(rect.getAttribute('height'));
+                data.boxes.push(x, y, w, h, depth, palette[key]);
+                if (depth === 0) {
+                    data.width = w;
+                    data.height = h;
+                }
+                const content = el.id ? document.getElementById('content-' + el.id) : null;
+                if (depth >= data.depth || !content || content.style.display === 'none') continue;
+                for (const row of content.querySelectorAll(':scope > .row')) {
+                    const rowY = parseFloat(row.getAttribute('data-y'));
+                    for (const item of row.children) {
+                        const match = /translate\\(([^,]+),/.exec(item.getAttribute('transform') || '');
+                        const child = item.querySelector(':scope > .node') || item;
+                        stack.push([child, x + (match ? parseFloat(match[1]) : 0), y + 5 + rowY, depth + 1]);
+                    }
+                }
+            }
+            return data;
+        }
+
+        function updateMinimapView() {
+            minimap.frame = 0;
+            const m = elem.getCTM();
+            if (!m || !minimap.data) return;
+            const inv = m.inverse();
+            const x0 = inv.e;
+            const y0 = inv.f;
+            const x1 = inv.a * svg.clientWidth + inv.c * svg.clientHeight + inv.e;
+            const y1 = inv.b * svg.clientWidth + inv.d * svg.clientHeight + inv.f;
+            const view = document.getElementById('minimap-view');
+            view.style.left = (minimap.ox + x0 * minimap.k) + 'px';
+            view.style.top = (minimap.oy + y0 * minimap.k) + 'px';
+            view.style.width = Math.max(2, (x1 - x0) * minimap.k) + 'px';
+            view.style.height = Math.max(2, (y1 - y0) * minimap.k) + 'px';
+        }
+
+        function scheduleMinimapView() {
+            if (!minimap.frame) minimap.frame = requestAnimationFrame(updateMinimapView);
+        }
+
+        // Pans so the scene point under the pointer lands in the middle of the view
+        function centerFromMinimap(e) {
+            const bounds = minimap.panel.getBoundingClientRect();
+            const sx = (e.clientX - bounds.left - minimap.ox) / minimap.k;
+            const sy = (e.clientY - bounds.top - minimap.oy) / minimap.k;
+            const m = elem.getCTM();
+            const px = m.a * sx + m.c * sy + m.e;
+            const py = m.b * sx + m.d * sy + m.f;
+            const scale = panzoom.getScale();
+            panzoom.pan((svg.clientWidth / 2 - px) / scale, (svg.clientHeight / 2 - py) / scale, { relative: true });
+        }
+
+        if (minimap.panel) {
+            drawMinimap(JSON.parse(document.getElementById('minimap-data').textContent));
+            elem.addEventListener('panzoomchange', scheduleMinimapView);
+            window.addEventListener('resize', () => { drawMinimap(minimap.data); scheduleMinimapView(); });
+            document.addEventListener('layoutchange', () => {
+                const data = minimapFromDom();
+                if (data) drawMinimap(data);
+                scheduleMinimapView();
+            });
+            minimap.panel.addEventListener('pointerdown', (e) => {
+                minimap.dragging = true;
+                minimap.panel.setPointerCapture(e.pointerId);
+                centerFromMinimap(e);
+            });
+            minimap.panel.addEventListener('pointermove', (e) => {
+                if (minimap.dragging) centerFromMinimap(e);
+            });
+            minimap.panel.addEventListener('pointerup', () => { minimap.dragging = false; });
+            scheduleMinimapView();
+        }
+
         window.addEventListener('load', () => {
              setTimeout(() => {
                 fitToScreen();
              }, 100);
         });
+    """
+
+    def _build_dependency_script(self) -> str:
+        """Returns the package-level edge list and the script that draws it on demand.
+
+        Edges are bundled per package in Python, so the page only ever draws
+        one curve per package pair however many module imports there are.
+        """
+        if not self.dependencies:
+            return ""
+        edges_json = json.dumps(self._dependency_edges, separators=(",", ":")).replace("</", "<\\/")
+        return """
+    <script type="application/json" id="dep-edges">""" + edges_json + """</script>
+    <script>
+        const depEdges = JSON.parse(document.getElementById('dep-edges').textContent);
+        let depLayer = null;
+        let depRedrawTimer = null;
+
+        // Dotted package path -> node group, derived from the data-name chain
+        function packageIndex() {
+            const index = {};
+            document.querySelectorAll('.node[data-name]').forEach(node => {
+                const parts = [];
+                for (let el = node; el && el !== elem; el = el.parentElement) {
+                    if (el.classList.contains('node') && el.dataset.name !== undefined) {
+                        parts.unshift(el.dataset.name);
+                    }
+                }
+                parts.shift();
+                index[parts.join('.')] = node;
+            });
+            return index;
+        }
+
+        // Nodes inside collapsed content are attached to their visible ancestor
+        function visibleNode(node) {
+            let hidden = node.parentElement && node.parentElement.closest('.node-content[style*="none"]');
+            while (hidden) {
+                node = hidden.parentElement;
+                hidden = node.parentElement && node.parentElement.closest('.node-content[style*="none"]');
+            }
+            return node;
+        }
+
+        function boxCenter(node) {
+            const rect = node.querySelector('.box-rect');
+            const m = elem.getCTM().inverse().multiply(rect.getCTM());
+            const w = parseFloat(rect.getAttribute('width'));
+            const h = parseFloat(rect.getAttribute('height'));
+            return { x: m.e + m.a * w / 2, y: m.f + m.d * h / 2 };
+        }
+
+        function drawDependencies() {
+            const index = packageIndex();
+            const maxW = depEdges.reduce((m, e) => Math.max(m, e[2]), 1);
+            const paths = [];
+            for (const [src, dst, weight] of depEdges) {
+                if (!index[src] || !index[dst]) continue;
+                const from = visibleNode(index[src]);
+                const to = visibleNode(index[dst]);
+                if (from === to) continue;
+                const a = boxCenter(from);
+                const b = boxCenter(to);
+                const mx = (a.x + b.x) / 2;
+                const my = Math.min(a.y, b.y) - Math.abs(b.x - a.x) * 0.2;
+                const width = 1 + 5 * Math.log1p(weight) / Math.log1p(maxW);
+                paths.push('<path d="M' + a.x + ',' + a.y + ' Q' + mx + ',' + my + ' ' + b.x + ',' + b.y +
+                    '" stroke-width="' + width + '"><title>' + (src || '(root)') + ' → ' + (dst || '(root)') +
+                    ': ' + weight + '</title></path>');
+            }
+            depLayer.innerHTML = paths.join('');
+        }
+
+        window.toggleDependencies = function() {
+            if (depLayer) {
+                depLayer.remove();
+                depLayer = null;
+                return;
+            }
+            depLayer = document.createElementNS('http://www.w3.org/2000/svg', 'g');
+            depLayer.setAttribute('id', 'dep-overlay');
+            elem.appendChild(depLayer);
+            drawDependencies();
+        };
+
+        // Re-route after collapse/expand relayouts settle
+        document.addEventListener('layoutchange', () => {
+            if (!depLayer) return;
+            clearTimeout(depRedrawTimer);
+            depRedrawTimer = setTimeout(() => { if (depLayer) drawDependencies(); }, 350);
+        });
     </script>
         """
 
     def _generate_box(self, node: Dict[str, Any], depth: int = 0) -> Tuple[str, float, float]:
         """Generates SVG for a single node with smart tiling layout."""
-        import uuid
+        if self._precomputed and not self._static and id(node) in self._precomputed:
+            svg, w, h, templates, chunks = self._precomputed.pop(id(node)).result()
+            self._templates.update(templates)
+            self._chunks.extend(chunks)
+            self._record_size(node, len(svg) + sum(len(content) for _, content in chunks))
+            return svg, w, h
+
+        cache_key = None
+        if self._is_cacheable(node, depth):
+            cache_key = self._cache_key(node, depth)
+            cached = self.cache.get(cache_key)
+            if cached is not None and self._restore_templates(cached[0]):
+                fragment, w, h = cached
+                self._record_size(node, len(fragment))
+                return self._fresh_ids(fragment), w, h
+
         node_id = f"node-{uuid.uuid4().hex[:8]}"
         
         node_type = node.get("type", "unknown")
         name = node.get("name", "Unknown")
         children = node.get("children", [])
         
-        theme = self.THEME.get(node_type, self.THEME["method"])
+        theme = self._node_theme(node)
         
         if not children:
-            estimated_w = (len(name) * 8.5) + 40
-            w = max(self.min_leaf_width, min(self.max_leaf_width, estimated_w))
-            h = self.min_leaf_height
-            svg = self._draw_node_rect(name, node_type, theme, w, h, node_id, has_children=False)
+            w, h, subtitle = self._leaf_size(node)
+            svg = self._draw_node_rect(name, node_type, theme, w, h, node_id, has_children=False,
+                                       tooltip=self._tooltip(node), subtitle=subtitle)
+            if node.get("link"):
+                # Stand-in for a subtree rendered on its own page
+                svg = f'<a class="shard-link" href="{html.escape(node["link"], quote=True)}">{svg}</a>'
+            elif node.get("collapsed") and self.aggregate_detail and not self._static:
+                svg = self._link_aggregate(node, theme, depth, svg)
+            self._record_size(node, len(svg))
             return svg, w, h
 
-        MAX_ROW_WIDTH = 1200 if depth == 0 else 800
-        rows: List[List[Tuple[str, float, float]]] = [[]]
-        current_row_w = 0
-        
-        for child in children:
-            c_svg, c_w, c_h = self._generate_box(child, depth + 1)
-            if current_row_w + c_w + self.margin > MAX_ROW_WIDTH and rows[-1]:
-                rows.append([(c_svg, c_w, c_h)])
-                current_row_w = c_w
-            else:
-                rows[-1].append((c_svg, c_w, c_h))
-                current_row_w += c_w + self.margin
+        shape = self._shape_of(node) if self._template_shapes and depth > 0 else None
+        content_attr = ""
+        if shape in self._template_shapes:
+            content_svg, total_width, total_height = self._use_template(shape, children, depth)
+            content_attr = ' data-template="1"'
+        else:
+            content_svg, total_width, total_height = self._layout_rows(children, depth)
 
-        row_heights = [max(c[2] for c in row) for row in rows]
-        row_widths = [sum(c[1] for c in row) + (len(row)-1)*self.margin for row in rows]
-        
-        total_width = max(row_widths) + (2 * self.padding)
-        total_height = sum(row_heights) + (len(rows)-1)*self.margin + self.header_height + self.padding
+        if self._static:
+            # Template content: no ids or toggles, every instance shares it
+            return f"""
+        <g class="node">
+            {self._draw_node_rect(name, node_type, theme, total_width, total_height, node_id, has_children=False, tooltip=self._tooltip(node))}
+            <g class="node-content" transform="translate(0, 5)">{content_svg}</g>
+        </g>
+        """, total_width, total_height
+
+        name_attr = ""
+        if self.dependencies and node_type in ("project", "package", "directory"):
+            name_attr = f' data-name="{html.escape(name, quote=True)}"'
+
+        chunked_size = 0
+        if depth == self.chunk_depth:
+            # Sizes are final already; the content itself arrives after the skeleton
+            self._chunks.append((node_id, content_svg))
+            chunked_size = len(content_svg)
+            content_svg = ""
+            content_attr += ' data-chunk="pending"'
+
+        # Collapsed nodes report header-only height so ancestors are packed collapsed too
+        collapsed = self._starts_collapsed(node_type, depth)
+        box_height = self.header_height if collapsed else total_height
+        opening = self._open_container(node, theme, node_id, total_width, total_height, collapsed,
+                                       name_attr, content_attr)
+        svg = opening + content_svg + self.CONTAINER_CLOSE
+        if cache_key is not None:
+            self.cache.put(cache_key, (svg, total_width, box_height))
+        self._record_size(node, len(svg) + chunked_size)
+        return svg, total_width, box_height
+
+    def _link_aggregate(self, node: Dict[str, Any], theme: dict, depth: int, svg: str) -> str:
+        """Attaches an aggregate's collapsed subtree to its box, drawn over the map on click.
+
+        The subtree is laid out now, expanded and without toggles, and kept
+        as inert markup in an attribute: the browser builds no elements for
+        it until the box is clicked, and the markup travels with the
+        fragment through the render cache and parallel workers.
+        """
+        self._static += 1
+        try:
+            content_svg, w, h = self._layout_rows(node["collapsed"], depth)
+            rect = self._draw_node_rect(node.get("name", "Unknown"), node.get("kind", "unknown"), theme, w, h,
+                                        "", has_children=False, tooltip=node.get("summary"))
+        finally:
+            self._static -= 1
+        detail = f'<g class="node">{rect}<g class="node-content" transform="translate(0, 5)">{content_svg}</g></g>'
+        return (f'<g class="aggregate-link" onclick="toggleAggregate(this)" '
+                f'data-detail="{html.escape(detail, quote=True)}">{svg}</g>')
+
+    def _open_container(self, node: Dict[str, Any], theme: dict, node_id: str, w: float, full_h: float,
+                        collapsed: bool, name_attr: str = "", content_attr: str = "") -> str:
+        """Returns a container's markup up to its content; ``CONTAINER_CLOSE`` ends it.
+
+        Split so the out-of-core writer can stream the content in between.
+        """
+        node_class = "node collapsed" if collapsed else "node"
+        if collapsed:
+            content_attr += ' style="display: none"'
+        box_height = self.header_height if collapsed else full_h
+        rect = self._draw_node_rect(node.get("name", "Unknown"), node.get("type", "unknown"), theme, w, box_height,
+                                    node_id, has_children=True, tooltip=self._tooltip(node), full_h=full_h,
+                                    collapsed=collapsed)
+        return f"""
+        <g class="{node_class}" id="{node_id}"{name_attr}>
+            {rect}
+            <g id="content-{node_id}" class="node-content" transform="translate(0, 5)"{content_attr}>
+                """
+
+    @staticmethod
+    def _open_row(y: float, row_h: float) -> str:
+        return f'<g class="row" transform="translate(0, {y})" data-y="{y}" data-row-h="{row_h}">'
+
+    def _record_size(self, node: Dict[str, Any], size: int) -> None:
+        if self.measure and not self._static:
+            self._sizes[id(node)] = size
+
+    def size_report(self, html_output: str, top: int = 10) -> Dict[str, Any]:
+        """Summarizes what the page returned by ``render()`` costs a browser.
+
+        Requires ``measure=True``. Gives the page's bytes, its element count
+        (outside scripts, chunked content included), an estimate of client
+        memory, the characters emitted per node type and the ``top`` largest
+        subtrees below the root. Subtrees reused from the cache or laid out
+        in workers are counted whole under their root's type.
+        """
+        if not self.measure:
+            raise ValueError("size_report() needs a renderer created with measure=True")
+        total_bytes = len(html_output.encode("utf-8"))
+        markup = re.sub(r"<script\b[^>]*>.*?</script>", "", html_output, flags=re.S)
+        elements = len(re.findall(r"<[a-zA-Z]", markup))
+
+        by_type: Counter = Counter()
+        subtrees: List[Tuple[int, str, Dict[str, Any]]] = []
+        stack: List[Tuple[Dict[str, Any], str, int]] = [(self.structure, "", 0)]
+        while stack:
+            node, path, depth = stack.pop()
+            size = self._sizes.get(id(node))
+            if size is None:
+                continue
+            children = node.get("children", [])
+            child_sizes = [self._sizes.get(id(child)) for child in children]
+            own = size
+            if children and None not in child_sizes:
+                own -= sum(child_sizes)
+                for child in children:
+                    child_path = f"{path}/{child.get('name', '')}" if path else child.get("name", "")
+                    stack.append((child, child_path, depth + 1))
+            by_type[node.get("type", "unknown")] += own
+            if children and depth > 0:
+                subtrees.append((size, path, node))
+
+        map_bytes = self._sizes.get(id(self.structure), 0)
+        return {
+            "total_bytes": total_bytes,
+            "map_bytes": map_bytes,
+            "page_bytes": max(0, total_bytes - map_bytes),
+            "elements": elements,
+            "nodes": count_nodes(self.structure),
+            "estimated_memory_bytes": (elements * self.CLIENT_BYTES_PER_ELEMENT
+                                       + total_bytes * self.CLIENT_BYTES_PER_SOURCE_BYTE),
+            "bytes_by_type": dict(by_type.most_common()),
+            "largest_subtrees": [
+                {"path": path, "type": node.get("type", "unknown"), "bytes": size, "nodes": count_nodes(node)}
+                for size, path, node in heapq.nlargest(top, subtrees, key=lambda item: item[0])
+            ],
+        }
+
+    def _layout_rows(self, children: List[Dict[str, Any]], depth: int) -> Tuple[str, float, float]:
+        """Packs children into rows; returns the rows' SVG and the parent's size."""
+        boxes = []
+        for child in children:
+            boxes.append(self._generate_box(child, depth + 1))
+            if self.progress is not None and not self._static and (
+                    depth + 1 == self.PROGRESS_DEPTH or (depth + 1 < self.PROGRESS_DEPTH and not child.get("children"))):
+                self._progress_done += count_nodes(child)
+                self.progress(self._progress_done, self._progress_total)
+        rows, row_heights, total_width, total_height = self._pack_rows([(w, h) for _, w, h in boxes], depth)
         
         content_svg = []
         y_offset = self.header_height
         for i, row in enumerate(rows):
             x_offset = self.padding
             row_items = []
-            for c_svg, c_w, c_h in row:
+            for index in row:
+                c_svg, c_w, _ = boxes[index]
                 row_items.append(f'<g transform="translate({x_offset}, 0)">{c_svg}</g>')
                 x_offset += c_w + self.margin
             
-            content_svg.append(f'<g class="row" transform="translate(0, {y_offset})" data-y="{y_offset}" data-row-h="{row_heights[i]}">{"".join(row_items)}</g>')
+            content_svg.append(f'{self._open_row(y_offset, row_heights[i])}{"".join(row_items)}</g>')
             y_offset += row_heights[i] + self.margin
 
-        svg = f"""
-        <g class="node" id="{node_id}">
-            {self._draw_node_rect(name, node_type, theme, total_width, total_height, node_id, has_children=True)}
-            <g id="content-{node_id}" class="node-content" transform="translate(0, 5)">
-                {''.join(content_svg)}
-            </g>
-        </g>
+        return ''.join(content_svg), total_width, total_height
+
+    def _pack_rows(self, sizes: List[Tuple[float, float]], depth: int) -> Tuple[List[Sequence[int]], List[float], float, float]:
+        """Greedily fills rows up to the row width; returns (rows of child indexes, row heights, w, h)."""
+        MAX_ROW_WIDTH = 1200 if depth == 0 else 800
+        # Wide sibling lists are packed as array operations when NumPy is available
+        packed = layout_kernel.pack_rows(sizes, MAX_ROW_WIDTH, self.margin)
+        if packed is not None:
+            rows, row_heights, row_widths = packed
+        else:
+            rows = [[]]
+            current_row_w = 0
+
+            for index, (c_w, _) in enumerate(sizes):
+                if current_row_w + c_w + self.margin > MAX_ROW_WIDTH and rows[-1]:
+                    rows.append([index])
+                    current_row_w = c_w
+                else:
+                    rows[-1].append(index)
+                    current_row_w += c_w + self.margin
+
+            row_heights = [max(sizes[i][1] for i in row) for row in rows]
+            row_widths = [sum(sizes[i][0] for i in row) + (len(row)-1)*self.margin for row in rows]
+        
+        total_width = max(row_widths) + (2 * self.padding)
+        total_height = sum(row_heights) + (len(rows)-1)*self.margin + self.header_height + self.padding
+        return rows, row_heights, total_width, total_height
+
+    def _leaf_size(self, node: Dict[str, Any]) -> Tuple[float, float, Optional[str]]:
+        """Returns a leaf's (w, h, subtitle); the width follows the label length."""
+        name = node.get("name", "Unknown")
+        # Aggregates stand in for a collapsed subtree and show its summary below the name
+        subtitle = node.get("summary") if node.get("type") == "aggregate" else None
+        estimated_w = (max(len(name), len(subtitle or "") * 0.85) * 8.5) + 40
+        if self.color_by in self.PROFILE_METRICS:
+            # Hot functions get wider boxes, up to the maximum leaf width
+            span = self.max_leaf_width - self.min_leaf_width
+            estimated_w = max(estimated_w, self.min_leaf_width + span * self._heat_ratio(node))
+        w = max(self.min_leaf_width, min(self.max_leaf_width, estimated_w))
+        h = self.min_leaf_height + (16 if subtitle else 0)
+        return w, h, subtitle
+
+    def layout_boxes(self, max_depth: Optional[int] = None,
+                     as_rendered: bool = False) -> List[Tuple[float, float, float, float, int, Dict[str, Any]]]:
+        """Returns the absolute ``(x, y, w, h, depth, node)`` of every node, fully expanded.
+
+        Uses the same sizing and row packing as the SVG output, without
+        building any markup, so exports can place millions of boxes cheaply.
+        Boxes come in document order (parents before their children).
+        ``max_depth`` leaves out deeper boxes. With ``as_rendered``, nodes
+        that start collapsed keep only their header, as on the page.
         """
-        return svg, total_width, total_height
+        if self.color_by != "type" and not self._metric_max:
+            self._metric_max = self.metric_max or self._collect_metric_max(self.structure)
+
+        # Bottom-up: sizes, plus each container's child offsets relative to its corner
+        sizes: Dict[int, Tuple[float, float]] = {}
+        offsets: Dict[int, List[Tuple[float, float]]] = {}
+        order = []
+        stack = [(self.structure, 0)]
+        while stack:
+            node, depth = stack.pop()
+            order.append((node, depth))
+            stack.extend((child, depth + 1) for child in node.get("children", []))
+        if self.color_by not in self.PROFILE_METRICS:
+            # Label-based leaf widths for the whole tree in one pass, when NumPy is available
+            leaves = [node for node, _ in order if not node.get("children")]
+            subtitles = [node.get("summary") if node.get("type") == "aggregate" else None for node in leaves]
+            widths = layout_kernel.leaf_widths([len(node.get("name", "Unknown")) for node in leaves],
+                                               [len(subtitle or "") for subtitle in subtitles],
+                                               self.min_leaf_width, self.max_leaf_width)
+            if widths is not None:
+                for node, w, subtitle in zip(leaves, widths, subtitles):
+                    sizes[id(node)] = (w, self.min_leaf_height + (16 if subtitle else 0))
+        for node, depth in reversed(order):
+            children = node.get("children", [])
+            if not children:
+                if id(node) not in sizes:
+                    w, h, _ = self._leaf_size(node)
+                    sizes[id(node)] = (w, h)
+                continue
+            child_sizes = [sizes[id(child)] for child in children]
+            rows, row_heights, w, h = self._pack_rows(child_sizes, depth)
+            if as_rendered and self._starts_collapsed(node.get("type", "unknown"), depth):
+                sizes[id(node)] = (w, self.header_height)
+                continue
+            # Content groups sit 5 units below the header, as in _generate_box
+            positions = layout_kernel.child_offsets(child_sizes, rows, row_heights, self.padding,
+                                                    self.header_height + 5, self.margin)
+            if positions is None:
+                positions = [(0.0, 0.0)] * len(children)
+                y_offset = self.header_height + 5
+                for row, row_h in zip(rows, row_heights):
+                    x_offset = self.padding
+                    for index in row:
+                        positions[index] = (x_offset, y_offset)
+                        x_offset += child_sizes[index][0] + self.margin
+                    y_offset += row_h + self.margin
+            sizes[id(node)] = (w, h)
+            offsets[id(node)] = positions
 
-    def _draw_node_rect(self, name: str, node_type: str, theme: dict, w: float, h: float, node_id: str, has_children: bool) -> str:
-        """Draws the rectangle, icon, and text for a node."""
+        boxes = []
+        stack = [(self.structure, 0.0, 0.0, 0)]
+        while stack:
+            node, x, y, depth = stack.pop()
+            w, h = sizes[id(node)]
+            boxes.append((x, y, w, h, depth, node))
+            if max_depth is not None and depth >= max_depth:
+                continue
+            children = node.get("children", [])
+            for child, (dx, dy) in reversed(list(zip(children, offsets.get(id(node), [])))):
+                stack.append((child, x + dx, y + dy, depth + 1))
+        return boxes
+
+    def _node_theme(self, node: Dict[str, Any]) -> dict:
+        """Returns the node's type theme, recolored by the active heatmap metric."""
+        node_type = node.get("type", "unknown")
+        theme = self.THEME.get(node_type, self.THEME["method"])
+        if node.get("diff") in self.DIFF_THEME:
+            return dict(self.DIFF_THEME[node["diff"]], icon=theme["icon"])
+        if self.color_by == "type":
+            return theme
+
+        hue = round(120 * (1 - self._heat_ratio(node)))
+        return {
+            "bg": f"hsl({hue}, 85%, 92%)",
+            "stroke": f"hsl({hue}, 70%, 40%)",
+            "text": f"hsl({hue}, 80%, 25%)",
+            "icon": theme["icon"],
+        }
+
+    def _heat_ratio(self, node: Dict[str, Any]) -> float:
+        """Where a node's metric sits between zero and the largest of its type, in [0, 1]."""
+        top = self._metric_max.get(node.get("type", "unknown"), 0)
+        # Log scale so a few huge files do not wash everything else out
+        return math.log1p(self._metric(node)) / math.log1p(top) if top > 0 else 0.0
+
+    def _metric(self, node: Dict[str, Any]) -> float:
+        """Returns the active metric for a node, aggregated over its subtree."""
+        key = id(node)
+        if key in self._metric_cache:
+            return self._metric_cache[key]
+
+        node_type = node.get("type")
+        if self.color_by == "loc" and "lines" in node:
+            start, end = node["lines"]
+            value = end - start + 1
+        elif self.color_by == "complexity" and "complexity" in node:
+            value = node["complexity"]
+        else:
+            child_values = [self._metric(child) for child in node.get("children", [])]
+            if self.color_by == "methods" and node_type in ("method", "function"):
+                value = 1
+            elif self.HEAT_MODES[self.color_by] == "max":
+                value = max(child_values + [node.get(self.PROFILE_METRICS.get(self.color_by), 0)])
+            else:
+                # Profile fields can sit on containers too (e.g. module-level code)
+                value = node.get(self.PROFILE_METRICS.get(self.color_by), 0) + sum(child_values)
+
+        self._metric_cache[key] = value
+        return value
+
+    def _collect_metric_max(self, root: Dict[str, Any]) -> Dict[str, float]:
+        """Finds the largest metric per node type, used to normalize heat colors."""
+        maxima: Dict[str, float] = {}
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            node_type = node.get("type", "unknown")
+            maxima[node_type] = max(maxima.get(node_type, 0), self._metric(node))
+            stack.extend(node.get("children", []))
+            # Subtrees behind aggregates are drawn on request, on the same scale
+            stack.extend(node.get("collapsed", []))
+        return maxima
+
+    def _tooltip(self, node: Dict[str, Any]) -> Optional[str]:
+        """Returns the hover text for a node, including the heatmap metric if one is active."""
+        if node.get("diff") in self.DIFF_THEME:
+            return f"{node.get('name', 'Unknown')} ({node['diff']})"
+        if self.color_by == "type":
+            return None
+        return f"{node.get('name', 'Unknown')} ({self.color_by}: {self._metric(node):g})"
+
+    def _draw_node_rect(self, name: str, node_type: str, theme: dict, w: float, h: float, node_id: str, has_children: bool,
+                        tooltip: Optional[str] = None, subtitle: Optional[str] = None,
+                        full_h: Optional[float] = None, collapsed: bool = False) -> str:
+        """Draws the rectangle, icon, and text for a node.
+
+        ``full_h`` is the expanded height when the box starts collapsed to ``h``.
+        """
         display_name = name
         max_chars = int((w - 45) / 8)
         if len(name) > max_chars and max_chars > 3:
@@ -657,22 +1928,33 @@ class SVGRenderer:
             toggle_btn = f"""
             <g class="toggle-btn" onclick="toggleNode('{node_id}')" style="cursor: pointer; opacity: 0.6;">
                 <circle cx="{w - 15}" cy="15" r="7" fill="white" stroke="{theme['stroke']}" stroke-width="1"/>
-                <text x="{w - 15}" y="19" text-anchor="middle" font-size="10" font-weight="bold" fill="{theme['stroke']}" style="pointer-events: none;">-</text>
+                <text x="{w - 15}" y="19" text-anchor="middle" font-size="10" font-weight="bold" fill="{theme['stroke']}" style="pointer-events: none;">{'+' if collapsed else '-'}</text>
             </g>
             """
             
         icon = f'<use href="#{theme["icon"]}" x="8" y="8" width="16" height="16" stroke="{theme["stroke"]}" />'
         
         return f"""
-        <rect class="box-rect" width="{w}" height="{h}" stroke="{theme['stroke']}" fill="{theme['bg']}" rx="6" ry="6" data-full-h="{h}" />
+        <rect class="box-rect" width="{w}" height="{h}" stroke="{theme['stroke']}" fill="{theme['bg']}" rx="6" ry="6" data-full-h="{full_h or h}" />
         {icon}
         <text x="30" y="20" fill="{theme['text']}" style="font-weight: 700; font-size: 13px;">
             {display_name}
-            <title>{name}</title>
+            <title>{tooltip or name}</title>
         </text>
+        {self._draw_subtitle(subtitle, theme, w)}
         {toggle_btn}
         """
 
+    def _draw_subtitle(self, subtitle: Optional[str], theme: dict, w: float) -> str:
+        """Draws the small second line used by aggregate boxes."""
+        if not subtitle:
+            return ""
+        display = subtitle
+        max_chars = int((w - 20) / 6.5)
+        if len(subtitle) > max_chars and max_chars > 3:
+            display = subtitle[:max_chars-3] + "..."
+        return f"""<text class="node-subtitle" x="10" y="40" fill="{theme['text']}" style="font-size: 11px; opacity: 0.8;">{display}<title>{subtitle}</title></text>"""
+
 
 if __name__ == "__main__":
     test_data = {
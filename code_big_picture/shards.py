@@ -0,0 +1,96 @@
+import re
+from concurrent.futures import Executor
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+
+from code_big_picture.lod import count_types, summarize_counts
+from code_big_picture.renderer import SVGRenderer
+
+
+def split_structure(structure: Dict[str, Any], split_depth: int,
+                    shard_dir: str) -> Tuple[Dict[str, Any], List[Tuple[Dict[str, Any], str]]]:
+    """Cuts a structure into an overview and the subtrees at ``split_depth``.
+
+    Each container at ``split_depth`` is replaced in the overview by an
+    ``aggregate`` leaf summarizing it and linking to ``shard_dir/<path>.html``,
+    named after its dotted path from the root. Returns the overview and
+    ``(subtree, file name)`` pairs; the input structure is not modified.
+    """
+    shards: List[Tuple[Dict[str, Any], str]] = []
+    used = set()
+
+    def cut(node: Dict[str, Any], depth: int, path: List[str]) -> Dict[str, Any]:
+        children = node.get("children")
+        if not children:
+            return node
+        if depth == split_depth:
+            slug = re.sub(r"[^A-Za-z0-9_.-]", "_", ".".join(path)) or "root"
+            file_name = f"{slug}.html"
+            suffix = 1
+            while file_name.lower() in used:
+                suffix += 1
+                file_name = f"{slug}-{suffix}.html"
+            used.add(file_name.lower())
+            shards.append((node, file_name))
+            counts = count_types(node)
+            return {
+                "name": node.get("name", "Unknown"),
+                "type": "aggregate",
+                "kind": node.get("type", "unknown"),
+                "summary": summarize_counts(counts),
+                "counts": dict(counts),
+                "link": f"{shard_dir}/{file_name}",
+            }
+        copy = dict(node)
+        copy["children"] = [cut(child, depth + 1, path + [child.get("name", "")]) for child in children]
+        return copy
+
+    return cut(structure, 0, []), shards
+
+
+def _render_page(structure: Dict[str, Any], output_path: str, options: Dict[str, Any]) -> str:
+    """Renders one page of a sharded map and writes it out; runs inside a pool worker."""
+    html_output = SVGRenderer(structure, **options).render()
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write(html_output)
+    return output_path
+
+
+def render_sharded(structure: Dict[str, Any], output_path: str, split_depth: int,
+                   executor: Optional[Executor] = None, **options: Any) -> Dict[str, Any]:
+    """Writes an overview page plus one page per subtree at ``split_depth``.
+
+    Shards go to ``<output stem>_shards/`` next to the overview. Every page
+    links the stylesheet and runtime written once beside the overview, and
+    heat colors share one scale computed over the whole structure. With an
+    ``executor`` the pages are rendered in parallel. ``options`` are passed
+    to every SVGRenderer. Returns the paths written.
+    """
+    output = Path(output_path)
+    shard_dir_name = f"{output.stem}_shards"
+    overview, shards = split_structure(structure, split_depth, shard_dir_name)
+
+    base = SVGRenderer(structure, **options)
+    if base.color_by != "type" and "metric_max" not in options:
+        options = dict(options, metric_max=base._collect_metric_max(structure))
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    assets = []
+    for file_name, content in base.build_assets().items():
+        asset_path = output.parent / file_name
+        with open(asset_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        assets.append(str(asset_path))
+
+    pages = [(overview, str(output), dict(options, asset_prefix=""))]
+    shard_options = dict(options, asset_prefix="../", overview_href=f"../{output.name}")
+    for subtree, file_name in shards:
+        pages.append((subtree, str(output.parent / shard_dir_name / file_name), shard_options))
+
+    if executor is not None:
+        written = [f.result() for f in [executor.submit(_render_page, *page) for page in pages]]
+    else:
+        written = [_render_page(*page) for page in pages]
+
+    return {"overview": written[0], "shards": written[1:], "assets": assets}
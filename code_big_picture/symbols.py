@@ -0,0 +1,268 @@
+import json
+import sqlite3
+from typing import Dict, Iterator, List, Any, Optional, Tuple
+
+# Node keys stored in their own columns (or not at all); the rest go to ``extra`` as JSON
+COLUMN_KEYS = ("name", "type", "children", "lines", "imports", "hash", "collapsed")
+CONTAINER_TYPES = ("project", "package", "directory")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS roots (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    name TEXT NOT NULL,
+    commit_id TEXT
+);
+CREATE TABLE IF NOT EXISTS nodes (
+    id INTEGER PRIMARY KEY,
+    root_id INTEGER NOT NULL,
+    parent_id INTEGER,
+    file TEXT NOT NULL,
+    path TEXT NOT NULL,
+    type TEXT NOT NULL,
+    name TEXT NOT NULL,
+    line_start INTEGER,
+    line_end INTEGER,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS nodes_file ON nodes(root_id, file);
+CREATE INDEX IF NOT EXISTS nodes_path ON nodes(root_id, path);
+CREATE INDEX IF NOT EXISTS nodes_parent ON nodes(parent_id);
+CREATE INDEX IF NOT EXISTS nodes_type ON nodes(type);
+"""
+
+# Trigram FTS5 serves substring and GLOB/LIKE matches on names and paths from an index
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS nodes_fts USING fts5(
+    name, path, content='nodes', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS nodes_fts_insert AFTER INSERT ON nodes BEGIN
+    INSERT INTO nodes_fts(rowid, name, path) VALUES (new.id, new.name, new.path);
+END;
+CREATE TRIGGER IF NOT EXISTS nodes_fts_delete AFTER DELETE ON nodes BEGIN
+    INSERT INTO nodes_fts(nodes_fts, rowid, name, path) VALUES ('delete', old.id, old.name, old.path);
+END;
+CREATE TRIGGER IF NOT EXISTS nodes_fts_update AFTER UPDATE ON nodes BEGIN
+    INSERT INTO nodes_fts(nodes_fts, rowid, name, path) VALUES ('delete', old.id, old.name, old.path);
+    INSERT INTO nodes_fts(rowid, name, path) VALUES (new.id, new.name, new.path);
+END;
+"""
+
+# (id, root_id, parent_id, file, path, type, name, line_start, line_end, extra)
+Row = Tuple[int, int, Optional[int], str, str, str, str, Optional[int], Optional[int], Optional[str]]
+
+
+class SymbolStore:
+    """SQLite database of parsed nodes from any number of project roots.
+
+    Every node is one row with its root, parent, containing file, path
+    inside the root (``src/core.py::Core.run``), type, name and line range.
+    Names and paths are indexed with a trigram FTS5 table when the SQLite
+    build has it, so glob searches such as ``*Cache`` stay fast across
+    hundreds of roots; without FTS5 the same queries scan the table.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        try:
+            self.conn.executescript(FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError:
+            self.fts = False
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> "SymbolStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # Writing
+
+    def index_structure(self, root_path: str, structure: Dict[str, Any], commit: Optional[str] = None) -> int:
+        """Replaces everything stored for ``root_path`` with ``structure`` in one transaction.
+
+        Returns the number of nodes written.
+        """
+        with self.conn:
+            root_id = self._root_id(root_path, structure.get("name", ""), commit)
+            self.conn.execute("DELETE FROM nodes WHERE root_id = ?", (root_id,))
+            rows = list(self._rows(structure, root_id, None, "", self._next_id()))
+            self.conn.executemany("INSERT INTO nodes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def update_files(self, root_path: str, structure: Dict[str, Any], changed: List[str],
+                     deleted: List[str], commit: Optional[str] = None) -> int:
+        """Re-stores only the given files of an already indexed root.
+
+        ``changed`` and ``deleted`` are root-relative posix paths, as from
+        ``incremental.git_changed_files``; ``structure`` is the patched tree.
+        Missing parent directories are created and emptied ones removed.
+        Falls back to a full ``index_structure`` for roots not stored yet.
+        Returns the number of nodes written.
+        """
+        row = self.conn.execute("SELECT id FROM roots WHERE path = ?", (root_path,)).fetchone()
+        if row is None:
+            return self.index_structure(root_path, structure, commit)
+
+        written = 0
+        with self.conn:
+            root_id = self._root_id(root_path, structure.get("name", ""), commit)
+            for rel in list(changed) + list(deleted):
+                self.conn.execute("DELETE FROM nodes WHERE root_id = ? AND file = ?", (root_id, rel))
+
+            for rel in changed:
+                parts = rel.split("/")
+                node, parent_id, path = structure, self._node_id(root_id, ""), ""
+                for part in parts[:-1]:
+                    node = _child(node, part)
+                    if node is None:
+                        break
+                    path = f"{path}/{part}" if path else part
+                    parent_id = self._ensure_dir(root_id, parent_id, path, node)
+                module = _child(node, parts[-1]) if node is not None else None
+                if module is None:
+                    continue
+                rows = list(self._rows(module, root_id, parent_id, rel, self._next_id()))
+                self.conn.executemany("INSERT INTO nodes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                written += len(rows)
+
+            # Directories left without children go too, innermost first
+            while self.conn.execute(
+                "DELETE FROM nodes WHERE root_id = ? AND type IN ('package', 'directory') "
+                "AND NOT EXISTS (SELECT 1 FROM nodes AS c WHERE c.parent_id = nodes.id)",
+                (root_id,),
+            ).rowcount:
+                pass
+        return written
+
+    def _root_id(self, root_path: str, name: str, commit: Optional[str]) -> int:
+        self.conn.execute(
+            "INSERT INTO roots (path, name, commit_id) VALUES (?, ?, ?) "
+            "ON CONFLICT(path) DO UPDATE SET name = excluded.name, commit_id = excluded.commit_id",
+            (root_path, name, commit),
+        )
+        return self.conn.execute("SELECT id FROM roots WHERE path = ?", (root_path,)).fetchone()[0]
+
+    def _next_id(self) -> int:
+        return self.conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM nodes").fetchone()[0]
+
+    def _node_id(self, root_id: int, path: str) -> Optional[int]:
+        row = self.conn.execute("SELECT id FROM nodes WHERE root_id = ? AND path = ?", (root_id, path)).fetchone()
+        return row[0] if row else None
+
+    def _ensure_dir(self, root_id: int, parent_id: Optional[int], path: str, node: Dict[str, Any]) -> int:
+        existing = self._node_id(root_id, path)
+        if existing is not None:
+            # A new __init__.py can turn a directory into a package
+            self.conn.execute("UPDATE nodes SET type = ? WHERE id = ?", (node.get("type", "directory"), existing))
+            return existing
+        node_id = self._next_id()
+        self.conn.execute(
+            "INSERT INTO nodes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (node_id, root_id, parent_id, path, path, node.get("type", "directory"), node.get("name", ""),
+             None, None, None),
+        )
+        return node_id
+
+    @staticmethod
+    def _rows(node: Dict[str, Any], root_id: int, parent_id: Optional[int], path: str, next_id: int) -> Iterator[Row]:
+        """Yields rows for a subtree in pre-order with ids counted up from ``next_id``.
+
+        Containers and files use their root-relative path as both file and
+        path; code inside a module is addressed ``module.py::Class.method``.
+        """
+        stack: List[Tuple[Dict[str, Any], Optional[int], str, str]] = [(node, parent_id, path, "")]
+        while stack:
+            current, parent, current_path, qualname = stack.pop()
+            node_id = next_id
+            next_id += 1
+            node_type = current.get("type", "unknown")
+            full_path = f"{current_path}::{qualname}" if qualname else current_path
+            lines = current.get("lines") or (None, None)
+            extra = {k: v for k, v in current.items() if k not in COLUMN_KEYS}
+            yield (node_id, root_id, parent, current_path, full_path, node_type, current.get("name", ""),
+                   lines[0], lines[1], json.dumps(extra) if extra else None)
+
+            for child in reversed(current.get("children", [])):
+                name = child.get("name", "")
+                if node_type in CONTAINER_TYPES:
+                    stack.append((child, node_id, f"{current_path}/{name}" if current_path else name, ""))
+                else:
+                    stack.append((child, node_id, current_path, f"{qualname}.{name}" if qualname else name))
+
+    # Reading
+
+    def search(self, pattern: str, node_type: Optional[str] = None, root: Optional[str] = None,
+               limit: int = 100) -> List[Dict[str, Any]]:
+        """Finds nodes whose name matches a case-sensitive glob (``*Cache``, ``parse_*``).
+
+        A pattern without wildcards matches names containing it. ``root``
+        restricts results to roots whose path contains that text.
+        """
+        if not any(c in pattern for c in "*?["):
+            pattern = f"*{pattern}*"
+        if self.fts:
+            sql = ("SELECT n.id, r.path, n.path, n.type, n.name, n.line_start, n.line_end FROM nodes_fts "
+                   "JOIN nodes AS n ON n.id = nodes_fts.rowid JOIN roots AS r ON r.id = n.root_id "
+                   "WHERE nodes_fts.name GLOB ?")
+        else:
+            sql = ("SELECT n.id, r.path, n.path, n.type, n.name, n.line_start, n.line_end FROM nodes AS n "
+                   "JOIN roots AS r ON r.id = n.root_id WHERE n.name GLOB ?")
+        params: List[Any] = [pattern]
+        if node_type:
+            sql += " AND n.type = ?"
+            params.append(node_type)
+        if root:
+            sql += " AND instr(r.path, ?) > 0"
+            params.append(root)
+        sql += " ORDER BY r.path, n.path LIMIT ?"
+        params.append(limit)
+        return [
+            {"id": row[0], "root": row[1], "path": row[2], "type": row[3], "name": row[4],
+             "lines": [row[5], row[6]] if row[5] is not None else None}
+            for row in self.conn.execute(sql, params)
+        ]
+
+    def subtree(self, node_id: int) -> Dict[str, Any]:
+        """Rebuilds the stored node ``node_id`` and its descendants as a structure dict."""
+        rows = self.conn.execute(
+            "WITH RECURSIVE sub(id) AS (SELECT ? UNION ALL SELECT n.id FROM nodes AS n JOIN sub ON n.parent_id = sub.id) "
+            "SELECT n.id, n.parent_id, n.type, n.name, n.line_start, n.line_end, n.extra "
+            "FROM nodes AS n JOIN sub ON n.id = sub.id ORDER BY n.id",
+            (node_id,),
+        ).fetchall()
+        nodes: Dict[int, Dict[str, Any]] = {}
+        for row_id, parent_id, node_type, name, start, end, extra in rows:
+            node: Dict[str, Any] = {"name": name, "type": node_type}
+            if start is not None:
+                node["lines"] = [start, end]
+            if extra:
+                node.update(json.loads(extra))
+            nodes[row_id] = node
+            if row_id != node_id and parent_id in nodes:
+                nodes[parent_id].setdefault("children", []).append(node)
+        return nodes[node_id]
+
+    def results_structure(self, results: List[Dict[str, Any]], title: str) -> Dict[str, Any]:
+        """Groups search hits by root into a renderable structure holding each hit's subtree."""
+        roots: Dict[str, Dict[str, Any]] = {}
+        for result in results:
+            group = roots.setdefault(result["root"], {"name": result["root"], "type": "directory", "children": []})
+            hit = self.subtree(result["id"])
+            hit["name"] = result["path"] or hit["name"]
+            group["children"].append(hit)
+        return {"name": title, "type": "project", "children": list(roots.values())}
+
+
+def _child(node: Dict[str, Any], name: str) -> Optional[Dict[str, Any]]:
+    for child in node.get("children", []):
+        if child.get("name") == name:
+            return child
+    return None
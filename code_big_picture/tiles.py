@@ -0,0 +1,239 @@
+import html
+import json
+import math
+from pathlib import Path
+from typing import Dict, List, Any, Tuple
+
+from code_big_picture.renderer import SVGRenderer
+
+# (x, y, w, h, depth, node) as returned by SVGRenderer.layout_boxes
+Box = Tuple[float, float, float, float, int, Dict[str, Any]]
+
+# Label metrics in screen pixels; labels keep this size at every zoom level
+LABEL_FONT_PX = 12
+LABEL_CHAR_PX = 7
+LABEL_MIN_BOX_PX = (40, 18)
+
+
+def export_tiles(renderer: SVGRenderer, output_dir: str, tile_size: int = 256,
+                 min_pixels: float = 2.0) -> Dict[str, Any]:
+    """Cuts the fully expanded layout into a quadtree of SVG tiles plus a viewer page.
+
+    Level ``z`` covers the square world with ``2**z`` by ``2**z`` tiles of
+    ``tile_size`` pixels; the deepest level draws the map at roughly its
+    native size. A tile holds only the boxes that intersect it and are at
+    least ``min_pixels`` big at that level, with labels only where they fit.
+    Tiles entirely inside one box with no label crossing them are left out,
+    as are all their descendants: the viewer shows the nearest ancestor tile
+    instead, which looks the same. Writes ``tiles/{z}/{x}_{y}.svg``,
+    ``tiles.json`` and ``index.html`` and returns the metadata.
+    """
+    boxes = renderer.layout_boxes()
+    root_w, root_h = boxes[0][2], boxes[0][3]
+    world = max(root_w, root_h)
+    max_level = max(0, math.ceil(math.log2(world / tile_size)))
+
+    out = Path(output_dir)
+    (out / "tiles").mkdir(parents=True, exist_ok=True)
+    themes: Dict[int, dict] = {}
+    counts = [0] * (max_level + 1)
+
+    # Each level only looks at the boxes that reached its parent tile
+    stack: List[Tuple[int, int, int, List[Box]]] = [(0, 0, 0, boxes)]
+    while stack:
+        level, tx, ty, items = stack.pop()
+        side = world / (2 ** level)
+        x0, y0 = tx * side, ty * side
+        items = [b for b in items if b[0] < x0 + side and b[0] + b[2] > x0 and b[1] < y0 + side and b[1] + b[3] > y0]
+        if not items:
+            continue
+        scale = tile_size / side
+        if level > 0 and _is_solid(items, x0, y0, side, scale):
+            continue
+
+        tile_dir = out / "tiles" / str(level)
+        tile_dir.mkdir(exist_ok=True)
+        with open(tile_dir / f"{tx}_{ty}.svg", "w", encoding="utf-8") as f:
+            f.write(_tile_svg(renderer, themes, items, x0, y0, side, scale, tile_size, min_pixels))
+        counts[level] += 1
+
+        if level < max_level:
+            for dy in (0, 1):
+                for dx in (0, 1):
+                    stack.append((level + 1, tx * 2 + dx, ty * 2 + dy, items))
+
+    meta = {
+        "tile_size": tile_size,
+        "levels": max_level + 1,
+        "world": world,
+        "width": root_w,
+        "height": root_h,
+        "boxes": len(boxes),
+        "tiles": counts,
+    }
+    with open(out / "tiles.json", "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    with open(out / "index.html", "w", encoding="utf-8") as f:
+        f.write(_viewer_html(meta, boxes[0][5].get("name", "Project")))
+    return meta
+
+
+def _label_extent(box: Box, scale: float) -> Tuple[float, float]:
+    """World-space width and height of a box's label at the given scale."""
+    return (4 + LABEL_CHAR_PX * len(box[5].get("name", ""))) / scale, 20 / scale
+
+
+def _is_solid(items: List[Box], x0: float, y0: float, side: float, scale: float) -> bool:
+    """Whether the tile, and so every tile below it, is one flat fill.
+
+    True when every box touching it covers it whole and no label reaches in;
+    labels only shrink towards their box corner at deeper levels.
+    """
+    for box in items:
+        x, y, w, h = box[0], box[1], box[2], box[3]
+        if x > x0 or y > y0 or x + w < x0 + side or y + h < y0 + side:
+            return False
+        label_w, label_h = _label_extent(box, scale)
+        if x + label_w > x0 and y + label_h > y0:
+            return False
+    return True
+
+
+def _tile_svg(renderer: SVGRenderer, themes: Dict[int, dict], items: List[Box], x0: float, y0: float,
+              side: float, scale: float, tile_size: int, min_pixels: float) -> str:
+    stroke = 1 / scale
+    font = LABEL_FONT_PX / scale
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{tile_size}" height="{tile_size}" '
+        f'viewBox="{x0:g} {y0:g} {side:g} {side:g}" font-family="Inter, sans-serif">'
+    ]
+    for box in items:
+        x, y, w, h, _, node = box
+        if w * scale < min_pixels or h * scale < min_pixels:
+            continue
+        key = id(node)
+        if key not in themes:
+            themes[key] = renderer._node_theme(node)
+        theme = themes[key]
+        parts.append(
+            f'<rect x="{x:g}" y="{y:g}" width="{w:g}" height="{h:g}" rx="{min(6, w / 4):g}" '
+            f'fill="{theme["bg"]}" stroke="{theme["stroke"]}" stroke-width="{stroke:g}"/>'
+        )
+        label_w, label_h = _label_extent(box, scale)
+        if (w * scale >= LABEL_MIN_BOX_PX[0] and h * scale >= LABEL_MIN_BOX_PX[1]
+                and x + label_w > x0 and y + label_h > y0):
+            name = node.get("name", "")
+            max_chars = int((w * scale - 12) / LABEL_CHAR_PX)
+            if len(name) > max_chars:
+                name = name[:max(1, max_chars - 1)] + "…"
+            parts.append(
+                f'<text x="{x + 6 / scale:g}" y="{y + 15 / scale:g}" font-size="{font:g}" '
+                f'font-weight="700" fill="{theme["text"]}">{html.escape(name)}</text>'
+            )
+    parts.append("</svg>")
+    return "".join(parts)
+
+
+def _viewer_html(meta: Dict[str, Any], title: str) -> str:
+    """A page that pans/zooms over the pyramid, loading only the tiles in view."""
+    return """<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>""" + html.escape(title) + """ - Code Big Picture tiles</title>
+    <style>
+        html, body { margin: 0; height: 100%; overflow: hidden; background: #f8f9fa; }
+        #viewport { position: absolute; inset: 0; }
+        #world { position: absolute; left: 0; top: 0; }
+        .level { position: absolute; left: 0; top: 0; }
+        .level img { position: absolute; image-rendering: auto; }
+    </style>
+</head>
+<body>
+    <div id="viewport"><div id="world"></div></div>
+    <script type="application/json" id="tile-meta">""" + json.dumps(meta) + """</script>
+    <script src="https://unpkg.com/@panzoom/panzoom@4.5.1/dist/panzoom.min.js"></script>
+    <script>
+        const meta = JSON.parse(document.getElementById('tile-meta').textContent);
+        const viewport = document.getElementById('viewport');
+        const world = document.getElementById('world');
+        world.style.width = meta.world + 'px';
+        world.style.height = meta.world + 'px';
+
+        // One layer per level, deeper levels on top; missing tiles fall back to their parent
+        const layers = [];
+        for (let z = 0; z < meta.levels; z++) {
+            const layer = document.createElement('div');
+            layer.className = 'level';
+            layer.style.zIndex = z;
+            world.appendChild(layer);
+            layers.push(layer);
+        }
+        const tiles = new Map();
+
+        function requestTile(z, x, y) {
+            const key = z + '/' + x + '_' + y;
+            if (tiles.has(key)) return tiles.get(key);
+            const side = meta.world / Math.pow(2, z);
+            const img = document.createElement('img');
+            img.style.left = x * side + 'px';
+            img.style.top = y * side + 'px';
+            img.style.width = side + 'px';
+            img.style.height = side + 'px';
+            img.onerror = () => {
+                img.remove();
+                if (z > 0) requestTile(z - 1, x >> 1, y >> 1).dataset.keep = '1';
+            };
+            img.src = 'tiles/' + key + '.svg';
+            layers[z].appendChild(img);
+            tiles.set(key, img);
+            return img;
+        }
+
+        const panzoom = Panzoom(world, { maxScale: 64, minScale: 0.0001, origin: '0 0', contain: false });
+        viewport.addEventListener('wheel', panzoom.zoomWithWheel);
+
+        function update() {
+            const scale = panzoom.getScale();
+            const pan = panzoom.getPan();
+            const level = Math.max(0, Math.min(meta.levels - 1,
+                Math.ceil(Math.log2(scale * meta.world / meta.tile_size))));
+            const side = meta.world / Math.pow(2, level);
+            const count = Math.pow(2, level);
+            const x0 = Math.max(0, Math.floor(-pan.x / side));
+            const y0 = Math.max(0, Math.floor(-pan.y / side));
+            const x1 = Math.min(count - 1, Math.floor((-pan.x + viewport.clientWidth / scale) / side));
+            const y1 = Math.min(count - 1, Math.floor((-pan.y + viewport.clientHeight / scale) / side));
+
+            const wanted = new Set(['0/0_0']);
+            for (let y = y0; y <= y1; y++) {
+                for (let x = x0; x <= x1; x++) {
+                    wanted.add(level + '/' + x + '_' + y);
+                    requestTile(level, x, y);
+                }
+            }
+            // Drop tiles out of view or from other levels, keeping fallbacks for wanted ones
+            for (const [key, img] of tiles) {
+                if (wanted.has(key)) continue;
+                if (img.dataset.keep && img.isConnected && key.split('/')[0] < level) continue;
+                img.remove();
+                tiles.delete(key);
+            }
+        }
+
+        let pending = false;
+        world.addEventListener('panzoomchange', () => {
+            if (pending) return;
+            pending = true;
+            requestAnimationFrame(() => { pending = false; update(); });
+        });
+
+        requestTile(0, 0, 0);
+        const fit = Math.min(viewport.clientWidth / meta.width, viewport.clientHeight / meta.height) * 0.95;
+        panzoom.zoom(fit);
+        setTimeout(() => { panzoom.pan(0, 0); update(); });
+    </script>
+</body>
+</html>
+"""
@@ -1,36 +1,307 @@
 import argparse
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from code_big_picture.parser import CodeParser
 from code_big_picture.renderer import SVGRenderer
+from code_big_picture.render_cache import RenderCache
+from code_big_picture.budget import parse_size
+
+
+def batch_main(argv):
+    parser = argparse.ArgumentParser(prog="main.py batch", description="Render maps for every root listed in a TOML manifest in one process.")
+    parser.add_argument("manifest", help="Path to the manifest.toml listing [[target]] path/output pairs")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="Worker processes shared by all roots (default: manifest value or CPU count)")
+
+    args = parser.parse_args(argv)
+
+    from code_big_picture.batch import load_manifest, run_batch
+
+    try:
+        manifest = load_manifest(args.manifest)
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    results = run_batch(manifest["targets"], workers=args.workers or manifest["workers"],
+                        cache_dir=manifest["cache_dir"])
+    failed = 0
+    for result in results:
+        if result["error"]:
+            failed += 1
+            print(f"FAILED {result['path']}: {result['error']}")
+        else:
+            print(f"{result['path']}: parse {result['parse_seconds']:.2f}s, render {result['render_seconds']:.2f}s -> {result['output']}")
+
+    print(f"Done! {len(results) - failed}/{len(results)} maps in {time.perf_counter() - start:.2f}s")
+    if failed:
+        sys.exit(1)
+
+
+def query_main(argv):
+    parser = argparse.ArgumentParser(prog="main.py query", description="Search the symbol database written with --symbols-db.")
+    parser.add_argument("db", help="Path to the SQLite symbol database")
+    parser.add_argument("pattern", help="Case-sensitive glob on node names, e.g. '*Cache'; plain text matches substrings")
+    parser.add_argument("--type", default=None, help="Only return nodes of this type (class, function, method, module, ...)")
+    parser.add_argument("--root", default=None, help="Only search roots whose path contains this text")
+    parser.add_argument("--limit", type=int, default=100, help="Maximum number of results (default: 100)")
+    parser.add_argument("-o", "--output", default=None, help="Also render the matching subtrees to this HTML file")
+
+    args = parser.parse_args(argv)
+    if not Path(args.db).exists():
+        print(f"Error: Symbol database '{args.db}' does not exist.")
+        sys.exit(1)
+
+    from code_big_picture.symbols import SymbolStore
+
+    with SymbolStore(args.db) as store:
+        start = time.perf_counter()
+        results = store.search(args.pattern, node_type=args.type, root=args.root, limit=args.limit)
+        elapsed = (time.perf_counter() - start) * 1000
+        for result in results:
+            line = f":{result['lines'][0]}" if result["lines"] else ""
+            print(f"{result['root']}/{result['path']}{line}  {result['type']}  {result['name']}")
+        print(f"{len(results)} result(s) in {elapsed:.1f} ms")
+
+        if args.output and results:
+            structure = store.results_structure(results, f"query: {args.pattern}")
+            with open(args.output, "w", encoding="utf-8") as f:
+                f.write(SVGRenderer(structure).render())
+            print(f"Rendered matching subtrees to: {Path(args.output).absolute()}")
+
+
+def diff_main(argv):
+    parser = argparse.ArgumentParser(prog="main.py diff", description="Render only what changed between two versions of a project.")
+    parser.add_argument("old", help="Old version: a project directory or archive, a saved structure .json, or a map built with --since-git")
+    parser.add_argument("new", help="New version, in any of the same forms")
+    parser.add_argument("-o", "--output", default="code_diff.html", help="Path to the output HTML file (default: code_diff.html)")
+    parser.add_argument("--collapse-depth", type=int, default=None, metavar="N", help="Start nodes at depth N and deeper collapsed")
+
+    args = parser.parse_args(argv)
+    for path in (args.old, args.new):
+        if not Path(path).exists():
+            print(f"Error: Path '{path}' does not exist.")
+            sys.exit(1)
+
+    from code_big_picture.diff import diff_structures, load_side
+
+    start = time.perf_counter()
+    try:
+        old, new = load_side(args.old), load_side(args.new)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    structure, counts = diff_structures(old, new)
+    print(f"Diff: {structure['diff_summary']} nodes in {time.perf_counter() - start:.1f}s")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        f.write(SVGRenderer(structure, collapse_depth=args.collapse_depth).render())
+    print(f"Done! Created diff map at: {Path(args.output).absolute()}")
+
+
+def out_of_core_main(args):
+    """Runs the parse-layout-write pipeline through a disk-backed node store."""
+    from code_big_picture.outofcore import render_out_of_core
+    unsupported = [flag for flag, value in (
+        ("--color-by", args.color_by not in (None, "type")), ("--profile-data", args.profile_data),
+        ("--deps", args.deps), ("--max-nodes", args.max_nodes), ("--cache-dir", args.cache_dir),
+        ("--dedupe", args.dedupe), ("--chunk-depth", args.chunk_depth is not None),
+        ("--size-report", args.size_report), ("--max-bytes", args.max_bytes is not None),
+        ("--max-elements", args.max_elements is not None), ("--tiles", args.tiles),
+        ("--split-depth", args.split_depth is not None), ("--symbols-db", args.symbols_db),
+        ("--since-git", args.since_git is not None),
+    ) if value]
+    if unsupported:
+        print(f"Error: --out-of-core cannot be combined with {', '.join(unsupported)}.")
+        sys.exit(1)
+
+    executor = ProcessPoolExecutor(max_workers=args.workers) if args.workers > 1 else None
+    try:
+        result = render_out_of_core(
+            str(args.path), args.output, db_path=args.out_of_core or None,
+            memory_limit=args.memory_limit * 1024 * 1024 if args.memory_limit else None,
+            collapse_depth=args.collapse_depth, collapse_types=args.collapse_type,
+            minimap_depth=args.minimap_depth if args.minimap_depth >= 0 else None,
+            executor=executor, readers=args.readers, timeout=args.parse_timeout,
+            max_memory=args.parse_memory * 1024 * 1024 if args.parse_memory else None)
+    except MemoryError:
+        print(f"Error: exceeded the {args.memory_limit} MB memory limit. Partial output may remain at {args.output}.")
+        sys.exit(1)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    print(f"Done! Streamed {result['nodes']} nodes to: {Path(result['output']).absolute()}")
+
 
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        return batch_main(sys.argv[2:])
+    if len(sys.argv) > 1 and sys.argv[1] == "query":
+        return query_main(sys.argv[2:])
+    if len(sys.argv) > 1 and sys.argv[1] == "diff":
+        return diff_main(sys.argv[2:])
+
     parser = argparse.ArgumentParser(description="Code Big Picture - Visualize your Python codebase as nested boxes.")
-    parser.add_argument("path", help="Path to the Python project directory")
+    parser.add_argument("path", help="Path to the Python project directory, or a .zip/.whl/.tar.gz archive of it")
     parser.add_argument("-o", "--output", default="code_map.html", help="Path to the output HTML file (default: code_map.html)")
-    
+    parser.add_argument("-j", "--workers", type=int, default=0, help="Parse files and lay out subtrees on N worker processes (default: run serially)")
+    parser.add_argument("--readers", type=int, default=0, metavar="N", help="Prefetch file bytes on N I/O threads while parsing (helps on NFS/FUSE checkouts)")
+    parser.add_argument("--parse-timeout", type=float, default=None, metavar="SECONDS", help="Give up on any single file that takes longer than this to parse (parses in isolated workers)")
+    parser.add_argument("--parse-memory", type=int, default=None, metavar="MB", help="Cap each parse worker's memory; files that exceed it become error nodes (parses in isolated workers)")
+    parser.add_argument("--color-by", choices=["type"] + sorted(SVGRenderer.HEAT_MODES), default=None, help="Color boxes by node type or as a heatmap of a code metric (default: type, or cumtime/alloc with --profile-data)")
+    parser.add_argument("--profile-data", action="append", default=[], metavar="FILE", help="Join a cProfile .pstats dump or tracemalloc snapshot onto functions and methods (repeatable)")
+    parser.add_argument("--deps", action="store_true", help="Add a package-level import dependency overlay to the map")
+    parser.add_argument("--max-nodes", type=int, default=None, metavar="N", help="Aggregate the deepest/largest subtrees into summary boxes (click one to see its contents) until at most N nodes are drawn")
+    parser.add_argument("--cache-dir", default=None, help="Reuse laid-out subtrees from earlier runs via an on-disk cache keyed by subtree hash")
+    parser.add_argument("--dedupe", action="store_true", help="Emit structurally identical subtrees once as <symbol> templates referenced by <use>")
+    parser.add_argument("--chunk-depth", type=int, default=None, metavar="N", help="Stream the content of nodes at depth N after the page skeleton so the overview paints first")
+    parser.add_argument("--collapse-depth", type=int, default=None, metavar="N", help="Start nodes at depth N and deeper collapsed, with the collapsed layout computed up front")
+    parser.add_argument("--collapse-type", action="append", default=[], choices=sorted(t for t in SVGRenderer.THEME if t != "project"), help="Start every node of this type collapsed (repeatable)")
+    parser.add_argument("--minimap-depth", type=int, default=2, metavar="N", help="Draw nodes down to depth N on the minimap overview panel (default: 2); -1 leaves the minimap out")
+    parser.add_argument("--size-report", action="store_true", help="Print the page's size, element count, estimated browser memory and largest subtrees")
+    parser.add_argument("--max-bytes", type=parse_size, default=None, metavar="SIZE", help="Fail (or shrink, see --over-budget) when the page exceeds SIZE bytes; accepts K/M/G suffixes")
+    parser.add_argument("--max-elements", type=int, default=None, metavar="N", help="Fail (or shrink, see --over-budget) when the page has more than N elements")
+    parser.add_argument("--over-budget", choices=["fail", "aggregate"], default="fail", help="What to do when a size budget is exceeded: fail the run, or aggregate the largest subtrees until the page fits (default: fail)")
+    parser.add_argument("--tiles", default=None, metavar="DIR", help="Export a deep-zoom pyramid of SVG tiles plus a viewer page into DIR instead of a single HTML file")
+    parser.add_argument("--split-depth", type=int, default=None, metavar="N", help="Write an overview page plus one page per subtree at depth N (N >= 1), sharing one stylesheet and runtime")
+    parser.add_argument("--symbols-db", default=None, metavar="PATH", help="Store parsed nodes in a SQLite symbol database (searchable with 'main.py query'); updated per file with --since-git")
+    parser.add_argument("--since-git", nargs="?", const="", default=None, metavar="REV", help="Re-parse only .py files changed since REV (default: the commit recorded by the previous run) and patch the stored structure")
+    parser.add_argument("--out-of-core", nargs="?", const="", default=None, metavar="DB", help="Spill parsed nodes to a SQLite store (DB, or a temporary file) and stream the page to disk, for repositories larger than RAM")
+    parser.add_argument("--memory-limit", type=int, default=None, metavar="MB", help="With --out-of-core, a hard cap on the process's extra memory: a file too big to parse under it becomes an error node, anything else stops the run instead of swapping")
+
     args = parser.parse_args()
-    
+
     project_path = Path(args.path)
     if not project_path.exists():
         print(f"Error: Path '{args.path}' does not exist.")
         sys.exit(1)
-        
+
     print(f"Parsing project at: {project_path.absolute()}")
-    
+
+    if args.out_of_core is not None:
+        return out_of_core_main(args)
+    if args.memory_limit is not None:
+        print("Error: --memory-limit requires --out-of-core.")
+        sys.exit(1)
+
     # 1. Parse codebase
-    code_parser = CodeParser(str(project_path))
-    structure = code_parser.parse()
-    
+    commit = None
+    structure = None
+    changes = None
+    if args.since_git is not None:
+        from code_big_picture import incremental
+        commit = incremental.git_head(str(project_path))
+        previous = incremental.load_structure(args.output)
+        rev = args.since_git or (previous or {}).get("commit")
+        if commit and previous and rev:
+            try:
+                changed, deleted = incremental.git_changed_files(str(project_path), rev)
+            except RuntimeError as e:
+                print(f"Warning: {e}; falling back to a full parse.")
+            else:
+                print(f"Incremental update since {rev[:12]}: {len(changed)} changed, {len(deleted)} deleted")
+                changes = (changed, deleted)
+                structure = incremental.patch_structure(
+                    previous["structure"], CodeParser(str(project_path)), changed, deleted
+                )
+
+    executor = ProcessPoolExecutor(max_workers=args.workers) if args.workers > 1 else None
+    if structure is None:
+        structure = CodeParser(str(project_path), executor=executor, readers=args.readers,
+                               timeout=args.parse_timeout,
+                               max_memory=args.parse_memory * 1024 * 1024 if args.parse_memory else None).parse()
+
+    if args.since_git is not None:
+        incremental.save_structure(args.output, structure, commit)
+
+    if args.symbols_db:
+        from code_big_picture.symbols import SymbolStore
+        with SymbolStore(args.symbols_db) as store:
+            root = str(project_path.resolve())
+            if changes is not None:
+                written = store.update_files(root, structure, *changes, commit=commit)
+            else:
+                written = store.index_structure(root, structure, commit)
+        print(f"Symbol database: {written} nodes written to {args.symbols_db}")
+
+    color_by = args.color_by or "type"
+    if args.profile_data:
+        from code_big_picture.profiling import apply_profile
+        for profile_path in args.profile_data:
+            try:
+                kind, matched = apply_profile(structure, profile_path)
+            except Exception as e:
+                print(f"Error: could not read profile data '{profile_path}': {e}")
+                sys.exit(1)
+            print(f"Profile {profile_path}: {matched} {kind} entries matched project code")
+            if args.color_by is None:
+                color_by = "cumtime" if kind == "time" else "alloc"
+
+    if args.max_nodes:
+        from code_big_picture.lod import apply_node_budget, count_nodes
+        total = count_nodes(structure)
+        structure = apply_node_budget(structure, args.max_nodes)
+        print(f"Node budget: {count_nodes(structure)} of {total} nodes drawn")
+
+    if args.tiles:
+        from code_big_picture.tiles import export_tiles
+        print("Cutting tile pyramid...")
+        meta = export_tiles(SVGRenderer(structure, color_by=color_by), args.tiles)
+        if executor is not None:
+            executor.shutdown()
+        print(f"Done! {sum(meta['tiles'])} tiles over {meta['levels']} levels for {meta['boxes']} boxes at: "
+              f"{(Path(args.tiles) / 'index.html').absolute()}")
+        return
+
     # 2. Render to HTML
     print("Generating visualization...")
-    renderer = SVGRenderer(structure)
-    html_output = renderer.render()
-    
+    cache = RenderCache(args.cache_dir) if args.cache_dir else None
+    minimap_depth = args.minimap_depth if args.minimap_depth >= 0 else None
+    if args.split_depth is not None:
+        if args.split_depth < 1:
+            print("Error: --split-depth must be at least 1.")
+            sys.exit(1)
+        from code_big_picture.shards import render_sharded
+        written = render_sharded(structure, args.output, args.split_depth, executor=executor,
+                                 commit=commit, color_by=color_by, dependencies=args.deps, cache=cache,
+                                 dedupe=args.dedupe, chunk_depth=args.chunk_depth,
+                                 collapse_depth=args.collapse_depth, collapse_types=args.collapse_type,
+                                 minimap_depth=minimap_depth)
+        if executor is not None:
+            executor.shutdown()
+        print(f"Done! Created overview at: {Path(written['overview']).absolute()} with {len(written['shards'])} shard pages")
+        return
+
+    render_options = dict(commit=commit, color_by=color_by, dependencies=args.deps,
+                          executor=executor, cache=cache, dedupe=args.dedupe,
+                          chunk_depth=args.chunk_depth, collapse_depth=args.collapse_depth,
+                          collapse_types=args.collapse_type, minimap_depth=minimap_depth)
+    if args.size_report or args.max_bytes is not None or args.max_elements is not None:
+        from code_big_picture.budget import budget_violations, format_size_report, render_within_budget
+        from code_big_picture.lod import count_nodes
+        total = count_nodes(structure)
+        html_output, report, _ = render_within_budget(structure, args.max_bytes, args.max_elements,
+                                                      aggregate=args.over_budget == "aggregate", **render_options)
+        if executor is not None:
+            executor.shutdown()
+        if report["nodes"] < total:
+            print(f"Size budget: aggregated down to {report['nodes']} of {total} nodes")
+        print(format_size_report(report))
+        violations = budget_violations(report, args.max_bytes, args.max_elements)
+        if violations:
+            print(f"Error: over budget: {'; '.join(violations)}. No output written.")
+            sys.exit(1)
+    else:
+        html_output = SVGRenderer(structure, **render_options).render()
+        if executor is not None:
+            executor.shutdown()
+
     # 3. Save to file
     with open(args.output, "w", encoding="utf-8") as f:
         f.write(html_output)
-        
+
     print(f"Done! Created visualization at: {Path(args.output).absolute()}")
 
 if __name__ == "__main__":
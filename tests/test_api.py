@@ -0,0 +1,167 @@
+"""Unit tests for the build/abuild library API."""
+import asyncio
+import io
+import threading
+import pytest
+from pathlib import Path
+
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import code_big_picture
+from code_big_picture import BuildCancelled, abuild, build
+
+
+class TestBuild:
+    """Tests for code_big_picture.build"""
+    
+    def test_returns_html_bytes(self, sample_project):
+        """Without an output the page should come back as UTF-8 bytes."""
+        result = build(str(sample_project))
+        
+        assert result.startswith(b"<!DOCTYPE html>")
+        assert b"helpers.py" in result
+    
+    def test_writes_to_path_and_writer(self, sample_project, temp_dir):
+        """A path or binary writer should receive the same page."""
+        expected_length = len(build(str(sample_project), minimap_depth=None))
+        target = temp_dir / "out" / "map.html"
+        buffer = io.BytesIO()
+        
+        assert build(str(sample_project), target, minimap_depth=None) is None
+        assert build(str(sample_project), buffer, minimap_depth=None) is None
+        assert len(target.read_bytes()) == len(buffer.getvalue()) == expected_length
+    
+    def test_reports_parse_and_layout_progress(self, sample_project):
+        """Files parsed should count up with no total; layout should end at the node total."""
+        events = []
+        build(str(sample_project), progress=lambda *event: events.append(event))
+        
+        parse = [event for event in events if event[0] == "parse"]
+        layout = [event for event in events if event[0] == "layout"]
+        assert parse == [("parse", n, None) for n in range(1, 5)]
+        assert layout[-1] == ("layout", 11, 11)
+        assert [done for _, done, _ in layout] == sorted(done for _, done, _ in layout)
+    
+    def test_cancel_during_parse(self, sample_project):
+        """Setting the cancel event should stop the build at the next file."""
+        cancel = threading.Event()
+        seen = []
+        
+        def progress(stage, done, total):
+            seen.append(stage)
+            cancel.set()
+        
+        with pytest.raises(BuildCancelled):
+            build(str(sample_project), progress=progress, cancel=cancel)
+        assert seen == ["parse"]
+    
+    def test_cancel_during_layout(self, sample_project):
+        """Cancellation should also be honoured between layout steps."""
+        cancel = threading.Event()
+        
+        def progress(stage, done, total):
+            if stage == "layout":
+                cancel.set()
+        
+        with pytest.raises(BuildCancelled):
+            build(str(sample_project), progress=progress, cancel=cancel)
+    
+    @pytest.mark.parametrize("pool", ["thread", "process"])
+    def test_executor_matches_serial_build(self, sample_project, pool):
+        """Thread and process pools should both finish with the serial page."""
+        import re
+        from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+        
+        def strip_ids(page):
+            return re.sub(rb"node-[0-9a-f]{8}", b"node-x", page)
+        
+        serial = build(str(sample_project))
+        executor_type = ThreadPoolExecutor if pool == "thread" else ProcessPoolExecutor
+        with executor_type(max_workers=4) as executor:
+            parallel = build(str(sample_project), executor=executor, parallel_depth=1)
+        assert strip_ids(parallel) == strip_ids(serial)
+    
+    def test_missing_path_raises(self, temp_dir):
+        """A missing project path should raise instead of printing."""
+        with pytest.raises(FileNotFoundError):
+            build(str(temp_dir / "missing"))
+    
+    def test_package_exports(self):
+        """The API should be importable from the package root."""
+        assert code_big_picture.build is build
+        assert code_big_picture.abuild is abuild
+
+
+class TestAsyncBuild:
+    """Tests for code_big_picture.abuild"""
+    
+    def test_concurrent_builds_match_sync_build(self, sample_project):
+        """Several maps should build concurrently with the same result as build()."""
+        expected = build(str(sample_project), minimap_depth=None)
+        
+        async def run():
+            return await asyncio.gather(*[abuild(str(sample_project), minimap_depth=None) for _ in range(3)])
+        
+        assert [len(result) for result in asyncio.run(run())] == [len(expected)] * 3
+    
+    def test_progress_runs_on_the_loop_thread(self, sample_project):
+        """Callbacks should be delivered on the event loop's thread."""
+        threads = set()
+        
+        async def run():
+            await abuild(str(sample_project), progress=lambda *event: threads.add(threading.get_ident()))
+            await asyncio.sleep(0)
+        
+        asyncio.run(run())
+        assert threads == {threading.get_ident()}
+    
+    def test_streams_to_a_drainable_writer(self, sample_project):
+        """Writers with an awaitable drain() should be fed and drained."""
+        class Writer:
+            def __init__(self):
+                self.data = b""
+                self.drains = 0
+            
+            def write(self, chunk):
+                self.data += chunk
+            
+            async def drain(self):
+                self.drains += 1
+        
+        writer = Writer()
+        assert asyncio.run(abuild(str(sample_project), writer)) is None
+        assert writer.data.startswith(b"<!DOCTYPE html>")
+        assert writer.drains == 1
+    
+    def test_cancelling_the_task_stops_the_build(self, sample_project, monkeypatch):
+        """Cancelling the awaiting task should raise CancelledError and stop the worker thread."""
+        from code_big_picture import api
+        from code_big_picture.parser import CodeParser
+        
+        started = threading.Event()
+        release = threading.Event()
+        rendered = []
+        original_parse_file = CodeParser._parse_file
+        original_render = api._render
+        
+        def slow_parse_file(parser, path):
+            started.set()
+            release.wait(5)
+            return original_parse_file(parser, path)
+        
+        monkeypatch.setattr(CodeParser, "_parse_file", slow_parse_file)
+        monkeypatch.setattr(api, "_render", lambda *args: rendered.append(args) or original_render(*args))
+        
+        async def run():
+            task = asyncio.ensure_future(abuild(str(sample_project)))
+            while not started.is_set():
+                await asyncio.sleep(0.001)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            release.set()
+        
+        # asyncio.run waits for the default executor's threads before returning
+        asyncio.run(run())
+        assert rendered == []
@@ -0,0 +1,63 @@
+"""Unit tests for the batch runner."""
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from code_big_picture.batch import load_manifest, run_batch
+
+
+class TestLoadManifest:
+    """Tests for load_manifest"""
+    
+    def test_load_manifest_resolves_relative_paths(self, temp_dir):
+        """Target paths should be resolved against the manifest directory."""
+        manifest = temp_dir / "manifest.toml"
+        manifest.write_text('workers = 3\n[[target]]\npath = "svc"\noutput = "out/svc.html"\n', encoding="utf-8")
+        
+        result = load_manifest(str(manifest))
+        
+        assert result["workers"] == 3
+        assert result["cache_dir"] is None
+        assert result["targets"] == [{
+            "path": str((temp_dir / "svc").resolve()),
+            "output": str((temp_dir / "out" / "svc.html").resolve()),
+        }]
+    
+    def test_load_manifest_rejects_incomplete_targets(self, temp_dir):
+        """Targets without an output should be rejected."""
+        manifest = temp_dir / "manifest.toml"
+        manifest.write_text('[[target]]\npath = "svc"\n', encoding="utf-8")
+        
+        with pytest.raises(ValueError):
+            load_manifest(str(manifest))
+
+
+class TestRunBatch:
+    """Tests for run_batch"""
+    
+    def test_run_batch_writes_every_output(self, sample_project, temp_dir):
+        """Each target should be rendered to its own output with timings."""
+        targets = [
+            {"path": str(sample_project / "src"), "output": str(temp_dir / "maps" / "src.html")},
+            {"path": str(sample_project / "utils"), "output": str(temp_dir / "maps" / "utils.html")},
+        ]
+        
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results = run_batch(targets, executor=executor)
+        
+        assert [r["error"] for r in results] == [None, None]
+        assert "Core" in Path(targets[0]["output"]).read_text(encoding="utf-8")
+        assert results[1]["parse_seconds"] >= 0
+        assert results[1]["render_seconds"] >= 0
+    
+    def test_run_batch_reports_missing_roots(self, temp_dir):
+        """Missing roots should be reported without stopping the batch."""
+        targets = [{"path": str(temp_dir / "missing"), "output": str(temp_dir / "x.html")}]
+        
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            results = run_batch(targets, executor=executor)
+        
+        assert "does not exist" in results[0]["error"]
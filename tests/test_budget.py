@@ -0,0 +1,83 @@
+"""Unit tests for page size budgets."""
+import pytest
+from pathlib import Path
+
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from code_big_picture.budget import budget_violations, format_size_report, parse_size, render_within_budget
+
+
+@pytest.fixture
+def wide_structure():
+    """A project with enough modules that aggregation has room to work."""
+    return {
+        "name": "Wide", "type": "project", "children": [
+            {"name": f"pkg{p}", "type": "package", "children": [
+                {"name": f"mod{m}.py", "type": "module", "children": [
+                    {"name": f"func{f}", "type": "function"} for f in range(6)
+                ]} for m in range(5)
+            ]} for p in range(4)
+        ]
+    }
+
+
+class TestParseSize:
+    """Tests for parse_size"""
+    
+    def test_plain_and_suffixed_sizes(self):
+        assert parse_size("5000") == 5000
+        assert parse_size("800K") == 800 * 1024
+        assert parse_size("1.5m") == int(1.5 * 1024 ** 2)
+        assert parse_size("2GB") == 2 * 1024 ** 3
+    
+    def test_invalid_size_raises(self):
+        with pytest.raises(ValueError):
+            parse_size("lots")
+
+
+class TestRenderWithinBudget:
+    """Tests for budget checks and automatic aggregation"""
+    
+    def test_fitting_page_is_unchanged(self, wide_structure):
+        """A page within budget should be rendered once from the original structure."""
+        html_output, report, rendered = render_within_budget(wide_structure, max_bytes=10 ** 9)
+        
+        assert rendered is wide_structure
+        assert budget_violations(report, max_bytes=10 ** 9) == []
+        assert report["total_bytes"] == len(html_output.encode("utf-8"))
+    
+    def test_violations_without_aggregation(self, wide_structure):
+        """Without aggregation an oversized page is reported, not changed."""
+        _, report, rendered = render_within_budget(wide_structure, max_elements=100)
+        
+        assert rendered is wide_structure
+        assert budget_violations(report, max_elements=100) == [
+            f"page has {report['elements']:,} elements, budget 100"
+        ]
+    
+    def test_aggregation_shrinks_page_to_fit(self, wide_structure):
+        """Aggregating the largest subtrees should bring the page under budget."""
+        _, full, _ = render_within_budget(wide_structure)
+        budget = full["page_bytes"] + full["map_bytes"] // 3
+        
+        _, report, rendered = render_within_budget(wide_structure, max_bytes=budget, aggregate=True)
+        
+        assert budget_violations(report, max_bytes=budget) == []
+        assert report["nodes"] < full["nodes"]
+        assert "'type': 'aggregate'" in str(rendered)
+        assert "aggregate" not in str(wide_structure)
+    
+    def test_impossible_budget_stops(self, wide_structure):
+        """A budget smaller than the page chrome should give up and stay in violation."""
+        _, report, _ = render_within_budget(wide_structure, max_bytes=1000, aggregate=True)
+        
+        assert budget_violations(report, max_bytes=1000)
+    
+    def test_report_formatting(self, wide_structure):
+        _, report, _ = render_within_budget(wide_structure)
+        text = format_size_report(report)
+        
+        assert f"{report['total_bytes']:,} bytes" in text
+        assert "Largest subtrees:" in text
+        assert "pkg0" in text
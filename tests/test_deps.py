@@ -0,0 +1,67 @@
+"""Unit tests for the import dependency graph."""
+import pytest
+from pathlib import Path
+
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from code_big_picture.parser import CodeParser
+from code_big_picture.deps import build_dependency_graph
+
+
+@pytest.fixture
+def layered_project(temp_dir):
+    """Creates a package with relative, absolute and external imports."""
+    app = temp_dir / "app"
+    (app / "core").mkdir(parents=True)
+    (app / "api").mkdir()
+    (app / "__init__.py").write_text("", encoding="utf-8")
+    (app / "core" / "__init__.py").write_text("from .models import Model", encoding="utf-8")
+    (app / "core" / "models.py").write_text("import os\nclass Model: pass", encoding="utf-8")
+    (app / "api" / "__init__.py").write_text("", encoding="utf-8")
+    (app / "api" / "views.py").write_text(
+        "from ..core import models\nfrom app.core.models import Model\nimport requests", encoding="utf-8"
+    )
+    (temp_dir / "src").mkdir()
+    (temp_dir / "src" / "tool.py").write_text("import app.api.views", encoding="utf-8")
+    return temp_dir
+
+
+class TestBuildDependencyGraph:
+    """Tests for build_dependency_graph"""
+    
+    def test_resolves_relative_imports(self, layered_project):
+        """Relative imports should resolve against the package layout."""
+        graph = build_dependency_graph(CodeParser(str(layered_project)).parse())
+        
+        assert graph.dependencies("app.core") == {"app.core.models"}
+        assert graph.dependencies("app.api.views") == {"app.core.models"}
+    
+    def test_resolves_absolute_imports_and_drops_external(self, layered_project):
+        """Absolute project imports should resolve; third-party ones should be dropped."""
+        graph = build_dependency_graph(CodeParser(str(layered_project)).parse())
+        
+        assert graph.dependencies("src.tool") == {"app.api.views"}
+        assert graph.dependencies("app.core.models") == set()
+    
+    def test_reverse_index_lists_dependents(self, layered_project):
+        """The reverse index should list importers of a module."""
+        graph = build_dependency_graph(CodeParser(str(layered_project)).parse())
+        
+        assert graph.dependents("app.core.models") == {"app.core", "app.api.views"}
+    
+    def test_resolves_imports_within_root_package(self):
+        """A root that is itself a package should resolve its own relative imports."""
+        root = Path(__file__).parent.parent / "sample_project"
+        graph = build_dependency_graph(CodeParser(str(root)).parse())
+        
+        assert graph.dependencies("main") == {"core.engine"}
+    
+    def test_bundled_edges_aggregate_per_package(self, layered_project):
+        """Bundled edges should count module edges between distinct packages."""
+        graph = build_dependency_graph(CodeParser(str(layered_project)).parse())
+        
+        assert graph.bundled() == [
+            ("app.api", "app.core", 1),
+            ("src", "app.api", 1),
+        ]
@@ -0,0 +1,161 @@
+"""Unit tests for structural diffs."""
+import copy
+import json
+import shutil
+import pytest
+from pathlib import Path
+
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from code_big_picture import incremental
+from code_big_picture.diff import diff_structures, load_side
+from code_big_picture.parser import CodeParser
+from code_big_picture.renderer import SVGRenderer
+
+
+@pytest.fixture
+def old_structure():
+    return {
+        "name": "old", "type": "project", "children": [
+            {"name": "pkg", "type": "package", "children": [
+                {"name": "a.py", "type": "module", "lines": [1, 20], "children": [
+                    {"name": "Keep", "type": "class", "lines": [1, 6], "children": [
+                        {"name": "run", "type": "method", "lines": [2, 3], "complexity": 1},
+                        {"name": "stop", "type": "method", "lines": [5, 6], "complexity": 1},
+                    ]},
+                    {"name": "edit", "type": "function", "lines": [8, 9], "complexity": 1},
+                    {"name": "drop", "type": "function", "lines": [11, 12], "complexity": 1},
+                ]},
+                {"name": "b.py", "type": "module", "lines": [1, 3], "children": [
+                    {"name": "same", "type": "function", "lines": [1, 3], "complexity": 1},
+                ]},
+            ]},
+        ]
+    }
+
+
+def find(node, name):
+    if node.get("name") == name:
+        return node
+    for child in node.get("children", []):
+        found = find(child, name)
+        if found is not None:
+            return found
+    return None
+
+
+class TestDiffStructures:
+    """Tests for diff_structures"""
+
+    def test_identical_trees_prune_to_placeholder(self, old_structure):
+        diff, counts = diff_structures(old_structure, copy.deepcopy(old_structure))
+        assert counts == {"added": 0, "removed": 0, "changed": 0, "unchanged": 9}
+        assert [child["diff"] for child in diff["children"]] == ["unchanged"]
+        assert "diff" not in diff
+
+    def test_added_removed_and_changed(self, old_structure):
+        new = copy.deepcopy(old_structure)
+        module = new["children"][0]["children"][0]
+        module["children"][1]["complexity"] = 4
+        module["children"][1]["lines"] = [8, 14]
+        del module["children"][2]
+        module["children"].append({"name": "fresh", "type": "function", "lines": [16, 17], "complexity": 1})
+
+        diff, counts = diff_structures(old_structure, new)
+        assert find(diff, "edit")["diff"] == "changed"
+        assert find(diff, "drop")["diff"] == "removed"
+        assert find(diff, "fresh")["diff"] == "added"
+        assert counts["added"] == 1 and counts["removed"] == 1 and counts["changed"] == 1
+        # Only the path to the changes is kept; the rest is summarized
+        assert find(diff, "Keep") is None and find(diff, "b.py") is None
+        assert "diff" not in find(diff, "a.py")
+
+    def test_moved_code_is_unchanged(self, old_structure):
+        new = copy.deepcopy(old_structure)
+        for node in new["children"][0]["children"][0]["children"]:
+            node["lines"] = [node["lines"][0] + 5, node["lines"][1] + 5]
+        _, counts = diff_structures(old_structure, new)
+        assert counts["changed"] == 0
+
+    def test_directory_becoming_package_is_changed(self):
+        old = {"name": "p", "type": "project", "children": [{"name": "d", "type": "directory", "children": []}]}
+        new = {"name": "p", "type": "project", "children": [{"name": "d", "type": "package", "children": []}]}
+        diff, counts = diff_structures(old, new)
+        assert diff["children"][0]["diff"] == "changed"
+        assert counts["added"] == 0 and counts["removed"] == 0
+
+    def test_duplicate_names_matched_in_order(self):
+        old = {"name": "m", "type": "module", "children": [
+            {"name": "f", "type": "function", "complexity": 1},
+            {"name": "f", "type": "function", "complexity": 2},
+        ]}
+        new = copy.deepcopy(old)
+        new["children"][1]["complexity"] = 3
+        diff, counts = diff_structures(old, new)
+        assert counts == {"added": 0, "removed": 0, "changed": 1, "unchanged": 1}
+        assert diff["children"][0]["complexity"] == 3
+
+    def test_inputs_not_modified(self, old_structure):
+        new = copy.deepcopy(old_structure)
+        new["children"][0]["children"].pop()
+        before = (copy.deepcopy(old_structure), copy.deepcopy(new))
+        diff_structures(old_structure, new)
+        assert (old_structure, new) == before
+
+
+class TestDiffParsedCheckouts:
+    """Tests for diffs of parsed project directories"""
+
+    def test_identical_checkouts_under_different_names(self, sample_project, tmp_path):
+        shutil.copytree(sample_project, tmp_path / "e1")
+        shutil.copytree(sample_project, tmp_path / "e3")
+        diff, counts = diff_structures(CodeParser(str(tmp_path / "e1")).parse(),
+                                       CodeParser(str(tmp_path / "e3")).parse())
+        assert counts["added"] == counts["removed"] == counts["changed"] == 0
+        assert "diff" not in diff
+        assert diff["name"] == "e3"
+
+    def test_body_only_edit_is_changed(self, temp_dir):
+        for side, expression in (("old", "x + 1"), ("new", "x * 2")):
+            (temp_dir / side).mkdir()
+            (temp_dir / side / "calc.py").write_text(
+                f"def scale(x):\n    return {expression}\n\n\ndef same(x):\n    return x\n", encoding="utf-8")
+        diff, counts = diff_structures(CodeParser(str(temp_dir / "old")).parse(),
+                                       CodeParser(str(temp_dir / "new")).parse())
+        assert find(diff, "scale")["diff"] == "changed"
+        assert counts["changed"] == 1 and counts["unchanged"] == 1
+
+
+class TestLoadSide:
+    """Tests for load_side"""
+
+    def test_sources(self, temp_dir, sample_project, simple_structure):
+        parsed = load_side(str(sample_project))
+        assert parsed["type"] == "project"
+
+        bare = temp_dir / "bare.json"
+        bare.write_text(json.dumps(simple_structure), encoding="utf-8")
+        assert load_side(str(bare)) == simple_structure
+
+        incremental.save_structure(str(temp_dir / "map.html"), simple_structure, "abc")
+        assert load_side(str(temp_dir / "map.html.json")) == simple_structure
+        assert load_side(str(temp_dir / "map.html")) == simple_structure
+
+    def test_map_without_sidecar(self, temp_dir):
+        with pytest.raises(ValueError):
+            load_side(str(temp_dir / "missing.html"))
+
+
+class TestDiffRendering:
+    """Tests for how diff structures are drawn"""
+
+    def test_statuses_are_highlighted(self, old_structure):
+        new = copy.deepcopy(old_structure)
+        new["children"][0]["children"][0]["children"].pop()
+        diff, _ = diff_structures(old_structure, new)
+        html_output = SVGRenderer(diff).render()
+        removed = SVGRenderer.DIFF_THEME["removed"]
+        assert f'stroke="{removed["stroke"]}" fill="{removed["bg"]}"' in html_output
+        assert "drop (removed)" in html_output
+        assert "Diff: 0 added, 1 removed" in html_output
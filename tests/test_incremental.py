@@ -0,0 +1,118 @@
+"""Unit tests for the git-aware incremental update."""
+import pytest
+import shutil
+import subprocess
+from pathlib import Path
+
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from code_big_picture.parser import CodeParser
+from code_big_picture.incremental import (
+    git_head, git_changed_files, patch_structure, save_structure, load_structure
+)
+
+requires_git = pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+
+
+def _git(cwd, *args):
+    subprocess.run(["git", *args], cwd=str(cwd), check=True, capture_output=True)
+
+
+@pytest.fixture
+def git_project(sample_project):
+    """Turns the sample project into a git repository with one commit."""
+    _git(sample_project, "init", "-q")
+    _git(sample_project, "add", "-A")
+    _git(sample_project, "-c", "user.name=t", "-c", "user.email=t@t", "commit", "-qm", "init")
+    return sample_project
+
+
+class TestPatchStructure:
+    """Tests for patch_structure"""
+    
+    def test_patch_matches_full_parse_after_edits(self, sample_project):
+        """Patching changed, added and deleted files should equal a fresh parse."""
+        parser = CodeParser(str(sample_project))
+        structure = parser.parse()
+        
+        (sample_project / "src" / "core.py").write_text("class Core:\n    def run(self): pass", encoding="utf-8")
+        (sample_project / "lib").mkdir()
+        (sample_project / "lib" / "new.py").write_text("def new(): pass", encoding="utf-8")
+        (sample_project / "utils" / "helpers.py").unlink()
+        
+        patch_structure(structure, parser, ["src/core.py", "lib/new.py"], ["utils/helpers.py"])
+        
+        assert structure == CodeParser(str(sample_project)).parse()
+    
+    def test_patch_updates_package_type_when_init_added(self, sample_project):
+        """Adding __init__.py should turn a directory into a package."""
+        parser = CodeParser(str(sample_project))
+        structure = parser.parse()
+        (sample_project / "utils" / "__init__.py").write_text("", encoding="utf-8")
+        
+        patch_structure(structure, parser, ["utils/__init__.py"], [])
+        
+        utils = next(c for c in structure["children"] if c["name"] == "utils")
+        assert utils["type"] == "package"
+    
+    def test_patch_ignores_skipped_directories(self, sample_project):
+        """Files under skipped directories should not be added."""
+        parser = CodeParser(str(sample_project))
+        structure = parser.parse()
+        (sample_project / "venv").mkdir()
+        (sample_project / "venv" / "x.py").write_text("x = 1", encoding="utf-8")
+        
+        patch_structure(structure, parser, ["venv/x.py"], [])
+        
+        assert all(c["name"] != "venv" for c in structure["children"])
+
+
+class TestStructureSidecar:
+    """Tests for save_structure/load_structure"""
+    
+    def test_round_trip_keeps_commit(self, temp_dir, simple_structure):
+        """The stored sidecar should return the structure and commit."""
+        output = str(temp_dir / "map.html")
+        save_structure(output, simple_structure, "abc123")
+        
+        stored = load_structure(output)
+        
+        assert stored == {"commit": "abc123", "structure": simple_structure}
+    
+    def test_load_missing_sidecar_returns_none(self, temp_dir):
+        """A missing sidecar should return None."""
+        assert load_structure(str(temp_dir / "none.html")) is None
+
+
+@requires_git
+class TestGitDiff:
+    """Tests for git_head/git_changed_files"""
+    
+    def test_git_head_outside_repo_returns_none(self, temp_dir):
+        """Directories outside git should have no head."""
+        assert git_head(str(temp_dir)) is None
+    
+    def test_changed_files_lists_py_changes_and_deletes(self, git_project):
+        """Only .py changes should be reported, split into changed and deleted."""
+        head = git_head(str(git_project))
+        (git_project / "main.py").write_text("def main(): return 1", encoding="utf-8")
+        (git_project / "utils" / "helpers.py").unlink()
+        (git_project / "README.md").write_text("changed", encoding="utf-8")
+        
+        changed, deleted = git_changed_files(str(git_project), head)
+        
+        assert changed == ["main.py"]
+        assert deleted == ["utils/helpers.py"]
+    
+    def test_changed_files_include_untracked(self, git_project):
+        """New files not yet added to git should be reported unless ignored."""
+        head = git_head(str(git_project))
+        (git_project / "utils" / "fresh.py").write_text("def fresh(): pass", encoding="utf-8")
+        (git_project / "scratch.py").write_text("x = 1", encoding="utf-8")
+        (git_project / ".gitignore").write_text("scratch.py\n", encoding="utf-8")
+        
+        changed, deleted = git_changed_files(str(git_project), head)
+        
+        assert changed == ["utils/fresh.py"]
+        assert deleted == []
@@ -0,0 +1,113 @@
+"""Unit tests for crash-isolated worker execution."""
+import os
+import signal
+import time
+import pytest
+from pathlib import Path
+
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from code_big_picture import isolation
+from code_big_picture.isolation import run_isolated
+from code_big_picture.parser import CodeParser
+
+requires_limits = pytest.mark.skipif(
+    isolation.resource is None or not hasattr(signal, "setitimer"), reason="needs POSIX rlimits and timers"
+)
+
+
+def _double_or_crash(n):
+    if n == 3:
+        os._exit(1)
+    return n * 2
+
+
+def _sleep_or_double(n):
+    if n == 1:
+        time.sleep(30)
+    return n * 2
+
+
+def _ignore_alarm_and_hang(n):
+    if n == 1:
+        signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGALRM})
+        time.sleep(30)
+    return n * 2
+
+
+def _allocate(n):
+    return len(bytearray(n))
+
+
+def _failure(item, reason):
+    return ("failed", item, reason)
+
+
+@requires_limits
+class TestRunIsolated:
+    """Tests for run_isolated"""
+    
+    def test_results_keep_input_order(self):
+        """Results should line up with the inputs."""
+        assert run_isolated(_allocate, [1, 5, 3], 2, _failure) == [1, 5, 3]
+    
+    def test_crashing_item_is_isolated(self):
+        """Only the item that killed its worker should fail."""
+        results = run_isolated(_double_or_crash, list(range(6)), 3, _failure)
+        
+        assert results[:3] == [0, 2, 4]
+        assert results[3][:2] == ("failed", 3)
+        assert "crashed" in results[3][2]
+        assert results[4:] == [8, 10]
+    
+    def test_timeout_interrupts_slow_item(self):
+        """An item over its wall-time limit should fail without stalling the rest."""
+        start = time.monotonic()
+        results = run_isolated(_sleep_or_double, [0, 1, 2], 2, _failure, timeout=0.5)
+        
+        assert results[0] == 0 and results[2] == 4
+        assert results[1][:2] == ("failed", 1)
+        assert "time limit" in results[1][2]
+        assert time.monotonic() - start < 10
+    
+    def test_hung_worker_is_killed(self, monkeypatch):
+        """Workers that ignore the alarm should be killed after the grace period."""
+        monkeypatch.setattr(isolation, "HARD_TIMEOUT_GRACE", 0.5)
+        
+        results = run_isolated(_ignore_alarm_and_hang, [0, 1, 2, 3], 2, _failure, timeout=0.5)
+        
+        assert results[1][:2] == ("failed", 1)
+        assert [results[0], results[2], results[3]] == [0, 4, 6]
+    
+    def test_memory_limit(self):
+        """Allocations past the memory limit should fail that item only."""
+        results = run_isolated(_allocate, [10, 512 * 1024 * 1024], 1, _failure, max_memory=128 * 1024 * 1024)
+        
+        assert results[0] == 10
+        assert results[1] == ("failed", 512 * 1024 * 1024, "exceeded memory limit")
+
+
+@requires_limits
+class TestCodeParserLimits:
+    """Tests for CodeParser with per-file limits"""
+    
+    def test_limited_parse_matches_plain_parse(self, sample_project):
+        """Limits that are not hit should not change the structure."""
+        expected = CodeParser(str(sample_project)).parse()
+        
+        result = CodeParser(str(sample_project), timeout=30, max_memory=512 * 1024 * 1024).parse()
+        
+        assert result == expected
+    
+    def test_oversized_file_becomes_error_node(self, temp_dir):
+        """A file too large to parse within the memory limit should become an error node."""
+        (temp_dir / "ok.py").write_text("def f():\n    pass\n", encoding="utf-8")
+        (temp_dir / "table.py").write_text("DATA = [" + "1, " * 2_000_000 + "]\n", encoding="utf-8")
+        
+        result = CodeParser(str(temp_dir), max_memory=64 * 1024 * 1024).parse()
+        nodes = {child["name"]: child for child in result["children"]}
+        
+        assert nodes["ok.py"]["type"] == "module"
+        assert nodes["table.py"]["type"] == "error"
+        assert nodes["table.py"]["message"]
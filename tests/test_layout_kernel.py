@@ -0,0 +1,82 @@
+"""Unit tests for the NumPy layout kernel."""
+import random
+import pytest
+from pathlib import Path
+
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from code_big_picture import layout_kernel
+from code_big_picture.renderer import SVGRenderer
+
+
+@pytest.fixture
+def renderer():
+    return SVGRenderer({"name": "Project", "type": "project"})
+
+
+@pytest.fixture
+def wide_sizes():
+    """Mixed int and float sizes, with equal heights of both types and a child wider than a row."""
+    rng = random.Random(7)
+    sizes = [(rng.choice([120, 137.5, 350, 200.0, 161.5]), rng.choice([42, 42.0, 58, 300.5]))
+             for _ in range(1500)]
+    sizes[40] = (950, 42)
+    return sizes
+
+
+def python_layout(renderer, sizes, depth, monkeypatch):
+    with monkeypatch.context() as patch:
+        patch.setattr(layout_kernel, "np", None)
+        return renderer._pack_rows(sizes, depth)
+
+
+class TestFallback:
+    """Tests for the pure-Python path"""
+
+    def test_without_numpy(self, monkeypatch, renderer, wide_sizes):
+        monkeypatch.setattr(layout_kernel, "np", None)
+        assert layout_kernel.pack_rows(wide_sizes, 800, 10) is None
+        assert layout_kernel.leaf_widths([5] * 1000, [0] * 1000, 120, 350) is None
+        rows, _, _, _ = renderer._pack_rows(wide_sizes, 1)
+        assert [i for row in rows for i in row] == list(range(len(wide_sizes)))
+
+    def test_short_lists_stay_in_python(self, wide_sizes):
+        assert layout_kernel.pack_rows(wide_sizes[:10], 800, 10) is None
+
+
+class TestKernel:
+    """Tests that the vectorized path matches the Python loops exactly"""
+
+    @pytest.fixture(autouse=True)
+    def numpy(self):
+        return pytest.importorskip("numpy")
+
+    @pytest.mark.parametrize("depth", [0, 1])
+    def test_pack_rows_matches(self, monkeypatch, renderer, wide_sizes, depth):
+        rows, heights, w, h = renderer._pack_rows(wide_sizes, depth)
+        expected = python_layout(renderer, wide_sizes, depth, monkeypatch)
+        assert [list(row) for row in rows] == expected[0]
+        # repr() also compares int against float, which the SVG markup prints differently
+        assert repr((heights, w, h)) == repr(expected[1:])
+
+    def test_inexact_sizes_fall_back(self, wide_sizes):
+        sizes = [(w + 0.1, h) for w, h in wide_sizes]
+        assert layout_kernel.pack_rows(sizes, 800, 10) is None
+
+    def test_child_offsets_match(self, monkeypatch):
+        structure = {"name": "Project", "type": "project", "children": [
+            {"name": "n" * (i % 40), "type": "function"} for i in range(1200)
+        ]}
+        renderer = SVGRenderer(structure)
+        boxes = renderer.layout_boxes()
+        monkeypatch.setattr(layout_kernel, "np", None)
+        assert repr([box[:5] for box in boxes]) == repr([box[:5] for box in renderer.layout_boxes()])
+
+    def test_leaf_widths_match(self, renderer):
+        names = [i % 60 for i in range(1000)]
+        subtitles = [(i * 7) % 50 for i in range(1000)]
+        widths = layout_kernel.leaf_widths(names, subtitles, renderer.min_leaf_width, renderer.max_leaf_width)
+        expected = [renderer._leaf_size({"name": "x" * n, "type": "aggregate", "summary": "s" * s})[0]
+                    for n, s in zip(names, subtitles)]
+        assert repr(widths) == repr(expected)
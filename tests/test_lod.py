@@ -0,0 +1,130 @@
+"""Unit tests for node-budget aggregation."""
+import pytest
+import copy
+import html
+import re
+from pathlib import Path
+
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from code_big_picture.lod import apply_node_budget, count_nodes, summarize_counts
+from code_big_picture.render_cache import RenderCache
+from code_big_picture.renderer import SVGRenderer
+
+
+@pytest.fixture
+def wide_structure():
+    """Returns a project with one large and one small module."""
+    def cls(name, methods):
+        return {"name": name, "type": "class", "children": [
+            {"name": f"m{i}", "type": "method"} for i in range(methods)
+        ]}
+    return {
+        "name": "Proj", "type": "project", "children": [
+            {"name": "big.py", "type": "module", "children": [cls("A", 10), cls("B", 10)]},
+            {"name": "small.py", "type": "module", "children": [{"name": "f", "type": "function"}]},
+        ]
+    }
+
+
+class TestApplyNodeBudget:
+    """Tests for apply_node_budget"""
+    
+    def test_structure_within_budget_is_returned_unchanged(self, wide_structure):
+        """No aggregation should happen when the budget already holds."""
+        assert apply_node_budget(wide_structure, 100) is wide_structure
+    
+    def test_budget_collapses_deepest_largest_first(self, wide_structure):
+        """Classes should be aggregated before their module."""
+        result = apply_node_budget(wide_structure, 20)
+        big = result["children"][0]
+        
+        assert count_nodes(result) <= 20
+        assert big["type"] == "module"
+        assert sorted(c["type"] for c in big["children"]) == ["aggregate", "class"]
+        aggregate = next(c for c in big["children"] if c["type"] == "aggregate")
+        assert aggregate["summary"] == "10 methods"
+    
+    def test_budget_keeps_collapsed_children(self, wide_structure):
+        """Aggregates should keep the replaced children available."""
+        result = apply_node_budget(wide_structure, 5)
+        big = result["children"][0]
+        
+        assert big["type"] == "aggregate"
+        assert big["kind"] == "module"
+        assert big["summary"] == "2 classes, 20 methods"
+        assert big["collapsed"] == wide_structure["children"][0]["children"]
+    
+    def test_budget_does_not_modify_input(self, wide_structure):
+        """The input structure should be left intact."""
+        original = copy.deepcopy(wide_structure)
+        apply_node_budget(wide_structure, 3)
+        
+        assert wide_structure == original
+    
+    def test_summarize_counts_orders_and_pluralizes(self):
+        """Summaries should follow hierarchy order with plurals."""
+        assert summarize_counts({"method": 3, "class": 1, "module": 2}) == "2 modules, 1 class, 3 methods"
+    
+    def test_aggregate_renders_summary_box(self, wide_structure):
+        """Aggregates should render as leaves with their summary."""
+        result = SVGRenderer(apply_node_budget(wide_structure, 5)).render()
+        
+        assert "2 classes, 20 methods" in result
+        assert "m0" not in re.sub(r'data-detail="[^"]*"', "", result)
+
+
+def aggregate_details(page):
+    return [html.unescape(detail) for detail in re.findall(r'class="aggregate-link"[^>]*data-detail="([^"]*)"', page)]
+
+
+class TestAggregateDetail:
+    """Tests for the collapsed subtrees attached to aggregate boxes"""
+    
+    def test_expanding_aggregate_shows_collapsed_children(self, wide_structure):
+        """The detail behind an aggregate should draw every replaced node, expanded."""
+        page = SVGRenderer(apply_node_budget(wide_structure, 5)).render()
+        details = aggregate_details(page)
+        
+        assert len(details) == 1
+        detail = details[0]
+        assert detail.startswith('<g class="node">')
+        names = re.findall(r'<text x="30" y="20"[^>]*>\s*(\S+)', detail)
+        assert names[:2] == ["big.py", "A"]
+        assert sorted(set(names) - {"big.py"}) == sorted({"A", "B"} | {f"m{i}" for i in range(10)})
+        # Drawn without toggles or ids, so it never joins the page's relayout or search
+        assert "toggleNode" not in detail and 'id="' not in detail
+        assert "toggleAggregate" in page
+    
+    def test_detail_can_be_left_out(self, wide_structure):
+        """Without aggregate_detail the page should hold only the summary box."""
+        page = SVGRenderer(apply_node_budget(wide_structure, 5), aggregate_detail=False).render()
+        
+        assert aggregate_details(page) == []
+        assert "m0" not in page
+    
+    def test_aggregates_with_detail_are_not_templated(self):
+        """Template content is static, so a repeated aggregate should stay inline to keep its detail."""
+        module = {"name": "m.py", "type": "module", "children": [
+            {"name": "C", "type": "class", "children": [{"name": f"m{i}", "type": "method"} for i in range(5)]},
+            {"name": "f", "type": "function"},
+        ]}
+        structure = {"name": "Proj", "type": "project", "children": [
+            {"name": name, "type": "package", "children": [copy.deepcopy(module)]} for name in ("a", "b")
+        ]}
+        page = SVGRenderer(apply_node_budget(structure, 10), dedupe=True).render()
+        
+        assert len(aggregate_details(page)) == 2
+        assert '<symbol id="tpl-' not in page
+    
+    def test_detail_survives_render_cache(self, wide_structure, temp_dir):
+        """Aggregates inside cached fragments should keep their detail."""
+        budgeted = apply_node_budget(wide_structure, 20)
+        cache = RenderCache(str(temp_dir / "cache"))
+        SVGRenderer(copy.deepcopy(budgeted), cache=cache).render()
+        page = SVGRenderer(copy.deepcopy(budgeted), cache=cache).render()
+        
+        assert cache.hits > 0
+        assert len(aggregate_details(page)) == 1
+        assert "m0" in aggregate_details(page)[0]
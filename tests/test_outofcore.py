@@ -0,0 +1,102 @@
+"""Unit tests for the out-of-core pipeline."""
+import itertools
+import json
+import re
+import uuid
+import pytest
+from pathlib import Path
+from unittest import mock
+
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from code_big_picture.outofcore import NodeStore, render_out_of_core
+from code_big_picture.parser import CodeParser, build_structure, iter_events
+from code_big_picture.renderer import SVGRenderer
+
+
+def counting_uuids():
+    """Deterministic uuid4 replacement so two renders can be compared byte for byte."""
+    counter = itertools.count()
+    return lambda: uuid.UUID(int=next(counter))
+
+
+class TestNodeStore:
+    """Tests for NodeStore"""
+
+    def test_write_events_keeps_parents(self, temp_dir, sample_project):
+        with NodeStore(str(temp_dir / "nodes.db")) as store:
+            count = store.write_events(CodeParser(str(sample_project)).iter_parse())
+            rows = store.conn.execute("SELECT id, parent, depth, name FROM nodes ORDER BY id").fetchall()
+        assert count == len(rows)
+        assert rows[0][1] is None and rows[0][2] == 0
+        by_id = {row[0]: row for row in rows}
+        for node_id, parent, depth, _ in rows[1:]:
+            assert parent < node_id
+            assert by_id[parent][2] == depth - 1
+
+    def test_layout_matches_renderer(self, temp_dir, simple_structure):
+        renderer = SVGRenderer(simple_structure)
+        with NodeStore(str(temp_dir / "nodes.db")) as store:
+            store.write_events(iter_events(simple_structure))
+            assert store.layout(renderer) == renderer.layout_boxes()[0][2:4]
+
+    def test_rebuilding_existing_store(self, temp_dir, simple_structure):
+        db_path = str(temp_dir / "nodes.db")
+        with NodeStore(db_path) as store:
+            store.write_events(iter_events(simple_structure))
+        with NodeStore(db_path) as store:
+            assert store.write_events(iter_events(simple_structure)) == 6
+
+
+class TestRenderOutOfCore:
+    """Tests for render_out_of_core"""
+
+    def render_both(self, project, temp_dir, **options):
+        output = temp_dir / "ooc.html"
+        with mock.patch("uuid.uuid4", counting_uuids()):
+            result = render_out_of_core(str(project), str(output), **options)
+        with mock.patch("uuid.uuid4", counting_uuids()):
+            expected = SVGRenderer(CodeParser(str(project)).parse(), **options).render()
+        return result, output.read_text(encoding="utf-8"), expected
+
+    def test_matches_in_memory_render(self, sample_project, temp_dir):
+        result, written, expected = self.render_both(sample_project, temp_dir)
+        assert written == expected
+        assert result["nodes"] == 11
+
+    def test_matches_collapsed_render(self, sample_project, temp_dir):
+        _, written, expected = self.render_both(sample_project, temp_dir, collapse_depth=2,
+                                                collapse_types=["class"])
+        assert written == expected
+        assert 'class="node collapsed"' in written
+
+    def test_minimap_drawn_from_streamed_boxes(self, sample_project, temp_dir):
+        _, written, _ = self.render_both(sample_project, temp_dir, minimap_depth=1)
+        data = json.loads(re.search(r'<script type="application/json" id="minimap-data">(.*?)</script>',
+                                    written, re.S).group(1))
+        assert data["depth"] == 1
+        assert len(data["boxes"]) > 0
+
+    def test_temporary_store_removed(self, sample_project, temp_dir):
+        render_out_of_core(str(sample_project), str(temp_dir / "out" / "map.html"))
+        assert [p.name for p in (temp_dir / "out").iterdir()] == ["map.html"]
+
+    def test_kept_store_holds_nodes(self, sample_project, temp_dir):
+        db_path = temp_dir / "nodes.db"
+        render_out_of_core(str(sample_project), str(temp_dir / "map.html"), db_path=str(db_path))
+        with NodeStore(str(db_path)) as store:
+            assert store.root()["type"] == "project"
+
+    def test_memory_limit_restored(self, sample_project, temp_dir):
+        resource = pytest.importorskip("resource")
+        before = resource.getrlimit(resource.RLIMIT_AS)
+        render_out_of_core(str(sample_project), str(temp_dir / "map.html"), memory_limit=1024 * 1024 * 1024)
+        assert resource.getrlimit(resource.RLIMIT_AS) == before
+
+    def test_store_round_trips_structure(self, temp_dir, simple_structure):
+        # Nodes come back with their data, so tooltips and subtitles are unchanged
+        with NodeStore(str(temp_dir / "nodes.db")) as store:
+            store.write_events(iter_events(simple_structure))
+            assert store.root() == {k: v for k, v in build_structure(iter_events(simple_structure)).items()
+                                    if k != "children"}
@@ -6,7 +6,7 @@ from pathlib import Path
 import sys
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from code_big_picture.parser import CodeParser
+from code_big_picture.parser import CodeParser, build_structure, iter_events
 
 
 class TestCodeParserInit:
@@ -236,3 +236,349 @@ class TestEdgeCases:
         for i in range(10):
             node = next((c for c in node["children"] if c["name"] == f"level_{i}"), None)
             assert node is not None
+
+
+class TestCodeParserExecutorAndCache:
+    """Tests for CodeParser executor and cache support"""
+    
+    def test_parse_with_executor_matches_serial_parse(self, sample_project):
+        """Parsing on a pool should produce the same structure as a serial parse."""
+        from concurrent.futures import ThreadPoolExecutor
+        
+        expected = CodeParser(str(sample_project)).parse()
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            result = CodeParser(str(sample_project), executor=executor).parse()
+        
+        assert result == expected
+    
+    def test_parse_reuses_cached_modules(self, sample_project):
+        """A shared cache should skip files whose stat has not changed."""
+        cache = {}
+        CodeParser(str(sample_project), cache=cache).parse()
+        assert len(cache) == 4
+        
+        calls = []
+        parser = CodeParser(str(sample_project), cache=cache)
+        original = parser._parse_file
+        parser._parse_file = lambda path: calls.append(path) or original(path)
+        parser.parse()
+        
+        assert calls == []
+    
+    def test_parse_does_not_cache_error_nodes(self, temp_dir):
+        """Error nodes should not be cached and should keep their message."""
+        (temp_dir / "bad.py").write_text("def broken(", encoding="utf-8")
+        cache = {}
+        
+        result = CodeParser(str(temp_dir), cache=cache).parse()
+        
+        assert cache == {}
+        assert result["children"][0]["type"] == "error"
+        assert "children" not in result["children"][0]
+
+
+class TestCodeParserMetrics:
+    """Tests for metrics collected while parsing"""
+    
+    def test_parse_records_line_ranges(self, sample_python_file):
+        """Modules, classes and methods should carry their line ranges."""
+        parser = CodeParser(str(sample_python_file.parent))
+        result = parser._parse_file(sample_python_file)
+        calc = next(c for c in result["children"] if c["name"] == "Calculator")
+        
+        assert result["lines"][0] == 1
+        assert calc["lines"] == [2, 9]
+        assert calc["children"][0]["lines"] == [5, 6]
+    
+    def test_module_line_count(self, temp_dir):
+        """A trailing newline ends the last line rather than starting another."""
+        parser = CodeParser(str(temp_dir))
+        assert parser._parse_source("a.py", b"x = 1\ny = 2\n")["lines"] == [1, 2]
+        assert parser._parse_source("b.py", b"x = 1\ny = 2")["lines"] == [1, 2]
+        assert parser._parse_source("c.py", b"")["lines"] == [1, 1]
+    
+    def test_parse_computes_cyclomatic_complexity(self, temp_dir):
+        """Each branch and extra boolean operand should add one to the complexity."""
+        source = '''
+def branchy(x, items):
+    if x and items:
+        return [i for i in items if i]
+    for i in items:
+        while i:
+            i -= 1
+    return x or 0
+'''
+        file_path = temp_dir / "branchy.py"
+        file_path.write_text(source, encoding="utf-8")
+        
+        result = CodeParser(str(temp_dir))._parse_file(file_path)
+        
+        # 1 + if + and + comprehension + comprehension-if + for + while + or
+        assert result["children"][0]["complexity"] == 8
+    
+    def test_nested_definitions_count_toward_enclosing_function(self, temp_dir):
+        """Branches in nested functions and classes should add to the function shown on the map."""
+        source = '''
+def outer(x):
+    def inner(y):
+        return y if y else 0
+    class Local:
+        def method(self):
+            while self:
+                pass
+    return inner(x)
+
+class Shown:
+    def method(self, x):
+        if x:
+            return lambda: x or 1
+'''
+        file_path = temp_dir / "nested.py"
+        file_path.write_text(source, encoding="utf-8")
+        
+        result = CodeParser(str(temp_dir))._parse_file(file_path)
+        outer, shown = result["children"]
+        
+        assert [c["name"] for c in result["children"]] == ["outer", "Shown"]
+        assert "children" not in outer
+        # 1 + inner's conditional expression + Local.method's while
+        assert outer["complexity"] == 3
+        # 1 + if + or
+        assert shown["children"][0]["complexity"] == 3
+    
+    def test_parse_records_decorators(self, temp_dir):
+        """Decorator names should be stored only when present."""
+        source = '''
+@dataclass(frozen=True)
+class Point:
+    @app.route("/x")
+    def handler(self): pass
+    def plain(self): pass
+'''
+        file_path = temp_dir / "deco.py"
+        file_path.write_text(source, encoding="utf-8")
+        
+        result = CodeParser(str(temp_dir))._parse_file(file_path)
+        point = result["children"][0]
+        
+        assert point["decorators"] == ["dataclass"]
+        assert point["children"][0]["decorators"] == ["app.route"]
+        assert "decorators" not in point["children"][1]
+
+
+class TestCodeParserImports:
+    """Tests for import collection"""
+    
+    def test_parse_records_imports_compactly(self, temp_dir):
+        """Imports should be stored once each as [module, level, names]."""
+        source = '''
+import os, json
+from ..pkg import thing, other
+from . import *
+
+def lazy():
+    import os
+'''
+        file_path = temp_dir / "imports.py"
+        file_path.write_text(source, encoding="utf-8")
+        
+        result = CodeParser(str(temp_dir))._parse_file(file_path)
+        
+        assert result["imports"] == [
+            ["os", 0, []],
+            ["json", 0, []],
+            ["pkg", 2, ["thing", "other"]],
+            ["", 1, []],
+        ]
+    
+    def test_nested_imports_in_source_order(self, temp_dir):
+        """Imports inside functions and classes should be found, in the order they appear."""
+        source = '''
+import a
+
+class Holder:
+    def method(self):
+        if self:
+            from b import c
+
+import d
+'''
+        file_path = temp_dir / "nested_imports.py"
+        file_path.write_text(source, encoding="utf-8")
+        
+        result = CodeParser(str(temp_dir))._parse_file(file_path)
+        
+        assert result["imports"] == [["a", 0, []], ["b", 0, ["c"]], ["d", 0, []]]
+        assert result["children"][0]["children"][0]["complexity"] == 2
+    
+    def test_parse_omits_imports_when_none(self, sample_python_file):
+        """Modules without imports should not carry an imports key."""
+        result = CodeParser(str(sample_python_file.parent))._parse_file(sample_python_file)
+        
+        assert "imports" not in result
+
+
+class TestCodeParserPrefetch:
+    """Tests for pipelined reading with reader threads"""
+    
+    def test_prefetched_parse_matches_serial_parse(self, sample_project):
+        """Reader threads should not change the parsed structure."""
+        expected = CodeParser(str(sample_project)).parse()
+        
+        assert CodeParser(str(sample_project), readers=3).parse() == expected
+    
+    def test_prefetch_with_executor_and_tiny_budget(self, sample_project):
+        """A budget smaller than any file should still make progress."""
+        from concurrent.futures import ThreadPoolExecutor
+        
+        expected = CodeParser(str(sample_project)).parse()
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            result = CodeParser(str(sample_project), executor=executor, readers=2, max_buffered_bytes=1).parse()
+        
+        assert result == expected
+    
+    def test_prefetch_reports_unreadable_files(self, temp_dir):
+        """Files that fail to read should become error nodes."""
+        target = temp_dir / "real.py"
+        target.write_text("x = 1", encoding="utf-8")
+        (temp_dir / "dangling.py").symlink_to(temp_dir / "missing.py")
+        
+        result = CodeParser(str(temp_dir), readers=2).parse()
+        dangling = next(c for c in result["children"] if c["name"] == "dangling.py")
+        
+        assert dangling["type"] == "error"
+
+
+class TestCodeParserIterParse:
+    """Tests for the streaming CodeParser.iter_parse event API"""
+    
+    def test_events_follow_structure_order(self, sample_project):
+        """Directories bracket their contents and code events follow their module."""
+        events = [(event, node["name"]) for event, node in CodeParser(str(sample_project)).iter_parse()]
+        
+        assert events == [
+            ("enter_dir", sample_project.name),
+            ("file", "README.md"),
+            ("module", "main.py"),
+            ("function", "main"),
+            ("enter_dir", "src"),
+            ("module", "__init__.py"),
+            ("module", "core.py"),
+            ("class", "Core"),
+            ("exit_dir", "src"),
+            ("enter_dir", "utils"),
+            ("module", "helpers.py"),
+            ("function", "helper"),
+            ("exit_dir", "utils"),
+            ("exit_dir", sample_project.name),
+        ]
+    
+    def test_events_carry_nodes_without_children(self, sample_python_file):
+        """Event nodes should hold their fields but never their children."""
+        events = list(CodeParser(str(sample_python_file.parent)).iter_parse())
+        
+        assert all("children" not in node for _, node in events)
+        method = next(node for event, node in events if event == "method")
+        assert method["name"] == "add" and method["lines"] == [5, 6]
+    
+    def test_empty_directories_are_never_announced(self, temp_dir):
+        """Directories holding nothing to show should produce no events."""
+        (temp_dir / "empty" / "nested").mkdir(parents=True)
+        (temp_dir / "empty" / "nested" / "data.bin").write_bytes(b"\0")
+        (temp_dir / "app.py").write_text("x = 1", encoding="utf-8")
+        
+        events = [event for event, _ in CodeParser(str(temp_dir)).iter_parse()]
+        
+        assert events == ["enter_dir", "module", "exit_dir"]
+    
+    def test_serial_walk_is_lazy(self, sample_project):
+        """Serially, files should only be parsed as the consumer reaches them."""
+        calls = []
+        parser = CodeParser(str(sample_project))
+        original = parser._parse_file
+        parser._parse_file = lambda path: calls.append(path.name) or original(path)
+        events = parser.iter_parse()
+        
+        for event, node in events:
+            if event == "module":
+                break
+        
+        assert calls == ["main.py"]
+        events.close()
+    
+    def test_rebuilt_structure_matches_parse(self, sample_project):
+        """build_structure over the events should give the parse() result."""
+        from concurrent.futures import ThreadPoolExecutor
+        
+        expected = CodeParser(str(sample_project)).parse()
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            events = list(CodeParser(str(sample_project), executor=executor, cache={}).iter_parse())
+        
+        assert build_structure(events) == expected
+        assert build_structure(iter_events(expected)) == expected
+    
+    def test_error_modules_yield_error_event(self, temp_dir):
+        """A file that fails to parse should yield a single error event."""
+        (temp_dir / "bad.py").write_text("def broken(", encoding="utf-8")
+        
+        events = list(CodeParser(str(temp_dir)).iter_parse())
+        
+        assert [event for event, _ in events] == ["enter_dir", "error", "exit_dir"]
+
+
+class TestCodeParserArchives:
+    """Tests for parsing zip, wheel and tar archives in place"""
+    
+    @staticmethod
+    def _members(project):
+        return sorted(p for p in project.rglob("*") if p.is_file())
+    
+    def test_wheel_matches_directory_parse(self, sample_project, tmp_path):
+        """A wheel's members should parse into the same hierarchy as the extracted tree."""
+        import zipfile
+        
+        wheel = tmp_path / "sample-1.0-py3-none-any.whl"
+        with zipfile.ZipFile(wheel, "w") as archive:
+            for path in self._members(sample_project):
+                archive.write(path, path.relative_to(sample_project).as_posix())
+            archive.writestr("src/__pycache__/core.py", "class Stale: pass")
+        
+        expected = CodeParser(str(sample_project)).parse()
+        result = CodeParser(str(wheel)).parse()
+        
+        assert result["name"] == wheel.name
+        assert result["children"] == expected["children"]
+    
+    def test_tarball_is_streamed_into_top_level_directory(self, sample_project, tmp_path):
+        """Release tarballs keep their top-level directory as a child of the project."""
+        import tarfile
+        from concurrent.futures import ThreadPoolExecutor
+        
+        tarball = tmp_path / "sample-1.0.tar.gz"
+        with tarfile.open(tarball, "w:gz") as archive:
+            archive.add(str(sample_project), arcname="sample-1.0")
+        
+        expected = CodeParser(str(sample_project)).parse()
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            result = CodeParser(str(tarball), executor=executor).parse()
+        
+        assert [child["name"] for child in result["children"]] == ["sample-1.0"]
+        assert result["children"][0]["type"] == "directory"
+        assert result["children"][0]["children"] == expected["children"]
+    
+    def test_unsafe_member_paths_are_skipped(self, tmp_path):
+        """Absolute and parent-relative member names should not enter the structure."""
+        import zipfile
+        
+        archive_path = tmp_path / "bundle.zip"
+        with zipfile.ZipFile(archive_path, "w") as archive:
+            archive.writestr("../escape.py", "x = 1")
+            archive.writestr("/abs.py", "x = 1")
+            archive.writestr("pkg/__init__.py", "")
+            archive.writestr("pkg/mod.py", "def f(): pass")
+        
+        result = CodeParser(str(archive_path)).parse()
+        
+        assert [child["name"] for child in result["children"]] == ["pkg"]
+        assert result["children"][0]["type"] == "package"
+        assert [c["name"] for c in result["children"][0]["children"]] == ["__init__.py", "mod.py"]
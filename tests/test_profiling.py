@@ -0,0 +1,165 @@
+"""Unit tests for joining profiler data onto the structure."""
+import cProfile
+import tracemalloc
+import pytest
+from pathlib import Path
+
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from code_big_picture.parser import CodeParser
+from code_big_picture.profiling import ProfileIndex, apply_profile
+
+WORKLOAD = '''
+import functools
+
+
+def cached(fn):
+    return functools.wraps(fn)(fn)
+
+
+class Worker:
+    def busy(self, n):
+        return sum([i * i for i in range(n)])
+
+    @cached
+    def decorated(self):
+        return self.busy(1000)
+
+
+def run():
+    worker = Worker()
+    for _ in range(20):
+        worker.busy(20000)
+    return worker.decorated()
+
+
+def allocate():
+    return [bytes(1024) for _ in range(200)]
+'''
+
+
+@pytest.fixture
+def profiled_project(temp_dir):
+    """A project with one module and the path it is executed from."""
+    package = temp_dir / "proj" / "pkg"
+    package.mkdir(parents=True)
+    (package / "__init__.py").write_text("", encoding="utf-8")
+    module_path = package / "work.py"
+    module_path.write_text(WORKLOAD, encoding="utf-8")
+
+    namespace = {}
+    exec(compile(WORKLOAD, str(module_path), "exec"), namespace)
+    return temp_dir / "proj", namespace
+
+
+def _find(node, name):
+    if node.get("name") == name:
+        return node
+    for child in node.get("children", []):
+        found = _find(child, name)
+        if found is not None:
+            return found
+    return None
+
+
+class TestProfileIndex:
+    """Tests for ProfileIndex"""
+    
+    def test_enclosing_resolves_function_module_and_foreign_files(self, profiled_project):
+        """Lines map to their function, stray lines to the module, other files to nothing."""
+        root, _ = profiled_project
+        structure = CodeParser(str(root)).parse()
+        index = ProfileIndex(structure)
+        filename = str(root / "pkg" / "work.py")
+        
+        assert index.enclosing(filename, 11)["name"] == "busy"
+        assert index.enclosing(filename, 2)["type"] == "module"
+        assert index.enclosing("/usr/lib/python3/json/__init__.py", 1) is None
+    
+    def test_installed_copy_matches_without_root_name(self, profiled_project):
+        """Files below the root should match from another checkout or site-packages."""
+        root, _ = profiled_project
+        index = ProfileIndex(CodeParser(str(root)).parse())
+        
+        assert index.module_key("/venv/lib/site-packages/pkg/work.py") == "pkg/work.py"
+        assert index.module_key("/elsewhere/__init__.py") is None
+
+
+class TestApplyProfile:
+    """Tests for apply_profile"""
+    
+    def test_pstats_timings_land_on_methods(self, profiled_project, tmp_path):
+        """Cumulative time should attach to the function whose code object ran."""
+        root, namespace = profiled_project
+        profiler = cProfile.Profile()
+        profiler.runcall(namespace["run"])
+        stats_path = tmp_path / "run.pstats"
+        profiler.dump_stats(str(stats_path))
+        structure = CodeParser(str(root)).parse()
+        
+        kind, matched = apply_profile(structure, str(stats_path))
+        
+        busy = _find(structure, "busy")
+        run = _find(structure, "run")
+        assert kind == "time" and matched > 0
+        assert busy["calls"] == 21
+        assert _find(structure, "decorated")["calls"] == 1
+        # The list comprehension's own time is folded into busy's self time
+        assert busy["self_time"] > 0
+        assert run["cum_time"] >= busy["cum_time"] > 0
+        assert "calls" not in _find(structure, "allocate")
+    
+    def test_multi_line_decorators_start_the_function(self, temp_dir, tmp_path):
+        """A decorator call spread over lines, with a comment and blank line after it, belongs to the function."""
+        source = '''
+def tag(*names):
+    return lambda fn: fn
+
+
+@tag(
+    "a",
+    "b",
+)
+# between decorators
+
+@tag("c")
+def tagged():
+    return sum(range(100))
+'''
+        module_path = temp_dir / "proj" / "tags.py"
+        module_path.parent.mkdir()
+        module_path.write_text(source, encoding="utf-8")
+        namespace = {}
+        exec(compile(source, str(module_path), "exec"), namespace)
+        profiler = cProfile.Profile()
+        profiler.runcall(namespace["tagged"])
+        stats_path = tmp_path / "tags.pstats"
+        profiler.dump_stats(str(stats_path))
+        structure = CodeParser(str(temp_dir / "proj")).parse()
+        
+        apply_profile(structure, str(stats_path))
+        
+        tagged = _find(structure, "tagged")
+        assert tagged["decorator_lines"] == 7
+        assert tagged["calls"] == 1 and tagged["cum_time"] > 0
+        assert ProfileIndex(structure).enclosing(str(module_path), 6) is tagged
+    
+    def test_tracemalloc_snapshot_lands_on_allocating_function(self, profiled_project, tmp_path):
+        """Allocated bytes should attach to the function whose lines allocated them."""
+        root, namespace = profiled_project
+        tracemalloc.start()
+        try:
+            kept = namespace["allocate"]()
+            snapshot = tracemalloc.take_snapshot()
+        finally:
+            tracemalloc.stop()
+        snapshot_path = tmp_path / "heap.snapshot"
+        snapshot.dump(str(snapshot_path))
+        structure = CodeParser(str(root)).parse()
+        
+        kind, matched = apply_profile(structure, str(snapshot_path))
+        
+        assert kind == "alloc" and matched > 0
+        assert _find(structure, "allocate")["alloc_bytes"] >= 200 * 1024
+        assert len(kept) == 200
@@ -0,0 +1,93 @@
+"""Unit tests for subtree hashing and the render cache."""
+import copy
+import re
+from pathlib import Path
+
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from code_big_picture.render_cache import RenderCache, compute_hashes
+from code_big_picture.renderer import SVGRenderer
+
+
+class TestComputeHashes:
+    """Tests for compute_hashes"""
+    
+    def test_every_node_gets_a_hash(self, simple_structure):
+        """Hashes should be stored on all nodes."""
+        compute_hashes(simple_structure)
+        
+        module = simple_structure["children"][0]
+        assert all("hash" in n for n in [simple_structure, module] + module["children"])
+    
+    def test_identical_subtrees_share_a_hash(self, simple_structure):
+        """Structurally identical subtrees should hash equally wherever they sit."""
+        module = simple_structure["children"][0]
+        simple_structure["children"].append({"name": "other", "type": "package", "children": [copy.deepcopy(module)]})
+        
+        compute_hashes(simple_structure)
+        
+        assert simple_structure["children"][1]["children"][0]["hash"] == module["hash"]
+    
+    def test_changes_propagate_to_ancestors_only(self, simple_structure):
+        """Renaming a leaf should change its ancestors' hashes but not its siblings'."""
+        compute_hashes(simple_structure)
+        module = simple_structure["children"][0]
+        root_hash, helper_hash = simple_structure["hash"], module["children"][1]["hash"]
+        
+        module["children"][0]["children"][0]["name"] = "renamed"
+        compute_hashes(simple_structure)
+        
+        assert simple_structure["hash"] != root_hash
+        assert module["children"][1]["hash"] == helper_hash
+    
+    def test_source_digest_does_not_invalidate(self, simple_structure):
+        """A function edited in place draws the same, so its hash should not change."""
+        method = simple_structure["children"][0]["children"][0]["children"][0]
+        method["digest"] = "0" * 16
+        root_hash = compute_hashes(simple_structure)
+        
+        method["digest"] = "1" * 16
+        
+        assert compute_hashes(simple_structure) == root_hash
+
+
+class TestRenderCache:
+    """Tests for RenderCache and its use by SVGRenderer"""
+    
+    def test_put_then_get_round_trips(self, temp_dir):
+        """Stored entries should be returned unchanged."""
+        cache = RenderCache(str(temp_dir / "cache"))
+        cache.put("abcd", ("<g/>", 10.5, 20))
+        
+        assert cache.get("abcd") == ("<g/>", 10.5, 20)
+        assert cache.get("missing") is None
+    
+    def test_second_render_reuses_subtrees(self, temp_dir, deeply_nested_structure):
+        """A repeat render should hit the cache and give the same geometry."""
+        first = SVGRenderer(deeply_nested_structure, cache=RenderCache(str(temp_dir))).render()
+        cache = RenderCache(str(temp_dir))
+        second = SVGRenderer(deeply_nested_structure, cache=cache).render()
+        
+        assert cache.hits == 1
+        assert re.sub(r'node-[0-9a-f]{8}', 'x', first) == re.sub(r'node-[0-9a-f]{8}', 'x', second)
+    
+    def test_reused_fragments_get_fresh_ids(self, temp_dir, simple_structure):
+        """Identical subtrees reused in one document should not share node ids."""
+        simple_structure["children"].append(copy.deepcopy(simple_structure["children"][0]))
+        cache = RenderCache(str(temp_dir))
+        SVGRenderer(simple_structure, cache=cache).render()
+        
+        result = SVGRenderer(simple_structure, cache=cache).render()
+        ids = re.findall(r'id="(node-[0-9a-f]{8})"', result)
+        
+        assert len(ids) == len(set(ids))
+    
+    def test_settings_change_invalidates_entries(self, temp_dir, simple_structure):
+        """A different color mode should not reuse fragments from another mode."""
+        SVGRenderer(simple_structure, cache=RenderCache(str(temp_dir))).render()
+        cache = RenderCache(str(temp_dir))
+        
+        SVGRenderer(simple_structure, cache=cache, color_by="loc").render()
+        
+        assert cache.hits == 0
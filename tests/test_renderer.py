@@ -6,6 +6,7 @@ from pathlib import Path
 import sys
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from code_big_picture.parser import CodeParser
 from code_big_picture.renderer import SVGRenderer
 
 
@@ -221,3 +222,447 @@ class TestThemes:
         
         for node_type in common_types:
             assert node_type in SVGRenderer.THEME, f"Missing theme for {node_type}"
+
+
+class TestBuildMetadata:
+    """Tests for build metadata in the document head"""
+    
+    def test_render_records_commit(self, simple_structure):
+        """The source commit should be recorded in a meta tag."""
+        result = SVGRenderer(simple_structure, commit="abc123").render()
+        
+        assert '<meta name="code-big-picture-commit" content="abc123">' in result
+    
+    def test_render_without_commit_omits_meta(self, simple_structure):
+        """No commit meta tag should be emitted when no commit is known."""
+        result = SVGRenderer(simple_structure).render()
+        
+        assert "code-big-picture-commit" not in result
+
+
+class TestHeatmapModes:
+    """Tests for metric-driven heatmap coloring"""
+    
+    @pytest.fixture
+    def metric_structure(self):
+        return {
+            "name": "Proj", "type": "project", "children": [
+                {"name": "a.py", "type": "module", "lines": [1, 100], "children": [
+                    {"name": "hot", "type": "function", "lines": [1, 80], "complexity": 20},
+                    {"name": "cold", "type": "function", "lines": [81, 82], "complexity": 1},
+                ]},
+            ]
+        }
+    
+    def test_unknown_color_mode_is_rejected(self, simple_structure):
+        """Unknown metric names should raise ValueError."""
+        with pytest.raises(ValueError):
+            SVGRenderer(simple_structure, color_by="nope")
+    
+    def test_heat_colors_hottest_function_red(self, metric_structure):
+        """The most complex function should get the hottest color."""
+        renderer = SVGRenderer(metric_structure, color_by="complexity")
+        renderer._metric_max = renderer._collect_metric_max(metric_structure)
+        
+        hot, cold = metric_structure["children"][0]["children"]
+        
+        hot_hue = int(renderer._node_theme(hot)["bg"][4:].split(",")[0])
+        cold_hue = int(renderer._node_theme(cold)["bg"][4:].split(",")[0])
+        
+        assert hot_hue == 0
+        assert cold_hue > 90
+    
+    def test_metrics_aggregate_up_the_tree(self, metric_structure):
+        """Containers should sum method counts and take the max complexity."""
+        module = metric_structure["children"][0]
+        
+        assert SVGRenderer(metric_structure, color_by="methods")._metric(metric_structure) == 2
+        assert SVGRenderer(metric_structure, color_by="complexity")._metric(metric_structure) == 20
+        assert SVGRenderer(metric_structure, color_by="loc")._metric(module) == 100
+    
+    def test_render_heatmap_includes_metric_tooltip(self, metric_structure):
+        """Heatmap renders should show the metric value in tooltips."""
+        result = SVGRenderer(metric_structure, color_by="loc").render()
+        
+        assert "<title>hot (loc: 80)</title>" in result
+        assert "Color: loc" in result
+    
+    def test_profile_metrics_aggregate_and_size_leaves(self, metric_structure):
+        """Self time sums up including module-level code; hot leaves are drawn wider."""
+        module = metric_structure["children"][0]
+        hot, cold = module["children"]
+        module["self_time"] = 0.5
+        hot.update(self_time=2.0, cum_time=3.0)
+        cold.update(self_time=0.25, cum_time=0.25)
+        
+        assert SVGRenderer(metric_structure, color_by="time")._metric(metric_structure) == 2.75
+        assert SVGRenderer(metric_structure, color_by="cumtime")._metric(module) == 3.0
+        
+        renderer = SVGRenderer(metric_structure, color_by="cumtime")
+        renderer._metric_max = renderer._collect_metric_max(metric_structure)
+        _, hot_w, _ = renderer._generate_box(hot, 2)
+        _, cold_w, _ = renderer._generate_box(cold, 2)
+        
+        assert hot_w == renderer.max_leaf_width
+        assert cold_w < hot_w
+
+
+class TestDependencyOverlay:
+    """Tests for the import dependency overlay"""
+    
+    @pytest.fixture
+    def importing_structure(self):
+        return {
+            "name": "Proj", "type": "project", "children": [
+                {"name": "a", "type": "package", "children": [
+                    {"name": "__init__.py", "type": "module", "children": []},
+                    {"name": "x.py", "type": "module", "children": [], "imports": [["b.y", 0, []]]},
+                ]},
+                {"name": "b", "type": "package", "children": [
+                    {"name": "__init__.py", "type": "module", "children": []},
+                    {"name": "y.py", "type": "module", "children": []},
+                ]},
+            ]
+        }
+    
+    def test_overlay_emits_bundled_edges(self, importing_structure):
+        """The page should carry package-level edges and the toggle button."""
+        result = SVGRenderer(importing_structure, dependencies=True).render()
+        
+        assert '<script type="application/json" id="dep-edges">[["a","b",1]]</script>' in result
+        assert "toggleDependencies()" in result
+        assert 'data-name="a"' in result
+    
+    def test_overlay_is_off_by_default(self, importing_structure):
+        """Without the option no overlay data should be emitted."""
+        result = SVGRenderer(importing_structure).render()
+        
+        assert "dep-edges" not in result
+        assert "data-name" not in result
+
+
+class TestParallelLayout:
+    """Tests for laying out subtrees on an executor"""
+    
+    @staticmethod
+    def _strip_ids(html):
+        return re.sub(r'node-[0-9a-f]{8}', 'node-x', html)
+    
+    def test_parallel_render_matches_serial(self, deeply_nested_structure):
+        """Stitched worker fragments should give the same document as a serial render."""
+        from concurrent.futures import ThreadPoolExecutor
+        
+        serial = SVGRenderer(deeply_nested_structure).render()
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            parallel = SVGRenderer(deeply_nested_structure, executor=executor, parallel_depth=1).render()
+        
+        assert self._strip_ids(parallel) == self._strip_ids(serial)
+    
+    @pytest.mark.parametrize("pool", ["thread", "process"])
+    @pytest.mark.parametrize("dedupe", [False, True])
+    def test_parallel_render_with_sibling_subtrees(self, pool, dedupe):
+        """Several subtrees at the parallel depth, each laid out by its own worker task."""
+        from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+        
+        structure = {"name": "Wide", "type": "project", "children": [
+            {"name": f"pkg{p}", "type": "package", "children": [
+                {"name": f"mod{m}.py", "type": "module", "children": [
+                    {"name": f"func{f}", "type": "function"} for f in range(3)
+                ]} for m in range(3)
+            ]} for p in range(6)
+        ]}
+        serial = SVGRenderer(structure, dedupe=dedupe).render()
+        executor_type = ThreadPoolExecutor if pool == "thread" else ProcessPoolExecutor
+        with executor_type(max_workers=4) as executor:
+            parallel = SVGRenderer(structure, executor=executor, parallel_depth=1, dedupe=dedupe).render()
+        
+        assert self._strip_ids(parallel) == self._strip_ids(serial)
+    
+    def test_pickled_renderer_drops_structure_and_executor(self, simple_structure):
+        """Workers should receive layout settings, not the whole structure."""
+        import pickle
+        from concurrent.futures import ThreadPoolExecutor
+        
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            renderer = SVGRenderer(simple_structure, executor=executor)
+            clone = pickle.loads(pickle.dumps(renderer))
+        
+        assert clone.structure is None
+        assert clone.executor is None
+        assert clone.padding == renderer.padding
+
+
+class TestTemplateDedupe:
+    """Tests for <symbol>/<use> deduplication of repeated subtrees"""
+    
+    @pytest.fixture
+    def repetitive_structure(self):
+        def serializer(name):
+            return {"name": name, "type": "class", "children": [
+                {"name": "create", "type": "method"}, {"name": "update", "type": "method"}
+            ]}
+        return {
+            "name": "Proj", "type": "project", "children": [
+                {"name": "a.py", "type": "module", "children": [serializer("UserSerializer"), serializer("GroupSerializer")]},
+                {"name": "b.py", "type": "module", "children": [serializer("ItemSerializer")]},
+            ]
+        }
+    
+    def test_repeated_shapes_become_one_symbol(self, repetitive_structure):
+        """Identical method sets should be emitted once and referenced per instance."""
+        result = SVGRenderer(repetitive_structure, dedupe=True).render()
+        
+        assert result.count('<symbol id="tpl-') == 1
+        assert result.count('<use href="#tpl-') == 3
+        assert result.count("<title>create</title>") == 1
+    
+    def test_instances_keep_their_own_labels(self, repetitive_structure):
+        """Each instance should still show its own class name."""
+        result = SVGRenderer(repetitive_structure, dedupe=True).render()
+        
+        for name in ("UserSerializer", "GroupSerializer", "ItemSerializer"):
+            assert f"<title>{name}</title>" in result
+    
+    def test_dedupe_keeps_geometry(self, repetitive_structure):
+        """Templated layout should report the same overall size as the inline one."""
+        _, w, h = SVGRenderer(repetitive_structure)._generate_box(repetitive_structure)
+        renderer = SVGRenderer(repetitive_structure, dedupe=True)
+        renderer.render()
+        
+        assert renderer._generate_box(repetitive_structure)[1:] == (w, h)
+    
+    def test_unique_subtrees_are_not_templated(self, simple_structure):
+        """Without repeats no templates should be emitted."""
+        result = SVGRenderer(simple_structure, dedupe=True).render()
+        
+        assert "<symbol id=\"tpl-" not in result
+    
+    @pytest.fixture
+    def parsed_repeats(self, temp_dir):
+        """A parsed module with six identical classes at different lines, one with a decorator."""
+        body = "    def create(self, x):\n        return x or 1\n\n    def update(self):\n        pass\n"
+        source = "".join(f"class Serializer{i}:\n{body}\n" for i in range(6))
+        source = source.replace("    def update", "    @property\n    def update", 1)
+        (temp_dir / "serializers.py").write_text(source, encoding="utf-8")
+        return CodeParser(str(temp_dir)).parse()
+    
+    @pytest.mark.parametrize("color_by", ["type", "complexity"])
+    def test_parsed_repeats_share_a_template(self, parsed_repeats, color_by):
+        """Classes drawn alike should share a template whatever their line numbers and decorators."""
+        result = SVGRenderer(parsed_repeats, dedupe=True, color_by=color_by).render()
+        
+        assert result.count('<symbol id="tpl-') == 1
+        assert result.count('<use href="#tpl-') == 6
+    
+    def test_active_metric_separates_shapes(self, parsed_repeats):
+        """Under a heat mode, methods whose metric differs should not share a drawing."""
+        module = parsed_repeats["children"][0]
+        module["children"][0]["children"][0]["complexity"] = 5
+        
+        by_type = SVGRenderer(parsed_repeats, dedupe=True).render()
+        by_complexity = SVGRenderer(parsed_repeats, dedupe=True, color_by="complexity").render()
+        
+        assert by_type.count('<use href="#tpl-') == 6
+        assert by_complexity.count('<use href="#tpl-') == 5
+
+
+class TestProgressiveChunks:
+    """Tests for chunked, progressive HTML output"""
+    
+    def test_chunked_content_follows_the_runtime(self, deeply_nested_structure):
+        """Content below the chunk depth should come after the scripts, in templates."""
+        result = SVGRenderer(deeply_nested_structure, chunk_depth=1).render()
+        
+        runtime_end = result.index("window.toggleNode")
+        assert result.index("leaf_5") > runtime_end
+        assert result.index("level_0") < runtime_end
+        assert result.count('<template id="chunk-') == 1
+    
+    def test_chunk_targets_match_placeholders(self, deeply_nested_structure):
+        """Each chunk should be attached to an empty, pending content group."""
+        result = SVGRenderer(deeply_nested_structure, chunk_depth=2).render()
+        
+        node_id = re.search(r"attachChunk\('(node-[0-9a-f]+)'\)", result).group(1)
+        assert f'id="content-{node_id}" class="node-content" transform="translate(0, 5)" data-chunk="pending"' in result
+        assert f'<template id="chunk-{node_id}">' in result
+    
+    def test_chunking_keeps_geometry(self, deeply_nested_structure):
+        """Splitting content out should not change the computed sizes."""
+        _, w, h = SVGRenderer(deeply_nested_structure)._generate_box(deeply_nested_structure)
+        
+        assert SVGRenderer(deeply_nested_structure, chunk_depth=1)._generate_box(deeply_nested_structure)[1:] == (w, h)
+    
+    def test_no_chunks_by_default(self, simple_structure):
+        """Without a chunk depth the document should be emitted inline."""
+        assert "attachChunk" not in SVGRenderer(simple_structure).render()
+
+
+class TestInitialCollapse:
+    """Tests for server-side initial collapse state"""
+    
+    def test_collapse_depth_collapses_nodes_with_header_height(self, deeply_nested_structure):
+        """Nodes at the collapse depth should report header-only height."""
+        renderer = SVGRenderer(deeply_nested_structure, collapse_depth=1)
+        
+        svg, _, h = renderer._generate_box(deeply_nested_structure["children"][0], depth=1)
+        
+        assert h == renderer.header_height
+        assert 'class="node collapsed"' in svg
+        assert 'style="display: none"' in svg
+    
+    def test_collapsed_parent_layout_uses_collapsed_heights(self, simple_structure):
+        """Ancestors should be packed around the collapsed heights."""
+        full = SVGRenderer(simple_structure)._generate_box(simple_structure)[2]
+        collapsed = SVGRenderer(simple_structure, collapse_types=["class"])._generate_box(simple_structure)[2]
+        
+        assert collapsed < full
+    
+    def test_collapsed_rect_keeps_expanded_height(self, simple_structure):
+        """The rect should remember its expanded height and show a '+' toggle."""
+        renderer = SVGRenderer(simple_structure, collapse_types=["class"])
+        svg, _, _ = renderer._generate_box(simple_structure)
+        
+        class_rect = re.search(r'<rect class="box-rect"[^>]*height="35"[^>]*data-full-h="([0-9.]+)"', svg)
+        assert class_rect is not None
+        assert float(class_rect.group(1)) > 35
+        assert ">+</text>" in svg
+    
+    def test_nothing_collapsed_by_default(self, simple_structure):
+        """Without options every node should start expanded."""
+        assert "node collapsed" not in SVGRenderer(simple_structure).render()
+
+
+class TestLayoutWorker:
+    """Tests for the Web Worker running search and relayout"""
+    
+    def test_worker_source_is_inlined_before_the_runtime(self, simple_structure):
+        """The worker source should ship as a non-executing block the page turns into a Blob URL."""
+        result = SVGRenderer(simple_structure).render()
+        
+        source_start = result.index('<script type="text/js-worker" id="layout-worker-src">')
+        assert source_start < result.index("function startLayoutWorker")
+        assert "new Worker(URL.createObjectURL(new Blob([source]" in result
+        assert "document.addEventListener('DOMContentLoaded', startLayoutWorker)" in result
+    
+    def test_interactions_post_to_the_worker(self, simple_structure):
+        """Toggles, expand/collapse-all and search should be messages, with main-thread fallbacks."""
+        result = SVGRenderer(simple_structure).render()
+        
+        assert "op: 'toggle'" in result
+        assert "op: 'setAll'" in result
+        assert "op: 'search'" in result
+        assert "performSearch(query);" in result
+        assert "recalculateFromNode(nodeG);" in result
+    
+    def test_dependency_overlay_follows_relayouts(self, simple_structure):
+        """The overlay should redraw on layout changes, whichever thread computed them."""
+        result = SVGRenderer(simple_structure, dependencies=True).render()
+        
+        assert "document.addEventListener('layoutchange'" in result
+        assert "baseToggleNode" not in result
+
+
+class TestMinimap:
+    """Tests for the minimap panel and its emitted geometry"""
+    
+    @staticmethod
+    def _minimap_data(html_output):
+        import json
+        match = re.search(r'<script type="application/json" id="minimap-data">(.*?)</script>', html_output)
+        return json.loads(match.group(1))
+    
+    def test_geometry_covers_top_levels_only(self, deeply_nested_structure):
+        """The flat array should hold six numbers per box down to the minimap depth."""
+        data = self._minimap_data(SVGRenderer(deeply_nested_structure, minimap_depth=1).render())
+        boxes = data["boxes"]
+        
+        assert len(boxes) % 6 == 0
+        assert {boxes[i + 4] for i in range(0, len(boxes), 6)} == {0, 1}
+        assert max(boxes[i + 5] for i in range(0, len(boxes), 6)) < len(data["colors"])
+    
+    def test_geometry_matches_rendered_boxes(self, simple_structure):
+        """Box sizes should be the ones the SVG is drawn with."""
+        renderer = SVGRenderer(simple_structure)
+        data = self._minimap_data(renderer.render())
+        _, root_w, root_h = SVGRenderer(simple_structure)._generate_box(simple_structure)
+        child_sizes = [SVGRenderer(simple_structure)._generate_box(child, 1)[1:] for child in simple_structure["children"]]
+        
+        assert (data["width"], data["height"]) == (round(root_w), round(root_h))
+        depth_one = [(data["boxes"][i + 2], data["boxes"][i + 3]) for i in range(0, len(data["boxes"]), 6)
+                     if data["boxes"][i + 4] == 1]
+        assert depth_one == [(round(w), round(h)) for w, h in child_sizes]
+    
+    def test_geometry_follows_initial_collapse(self, deeply_nested_structure):
+        """Nodes starting collapsed should appear header-only, without their contents."""
+        renderer = SVGRenderer(deeply_nested_structure, collapse_depth=1)
+        data = self._minimap_data(renderer.render())
+        boxes = data["boxes"]
+        
+        assert data["height"] == round(SVGRenderer(deeply_nested_structure, collapse_depth=1)._generate_box(deeply_nested_structure)[2])
+        assert all(boxes[i + 4] <= 1 for i in range(0, len(boxes), 6))
+        assert all(boxes[i + 3] == renderer.header_height for i in range(0, len(boxes), 6) if boxes[i + 4] == 1)
+    
+    def test_view_syncs_with_pan_zoom_and_relayouts(self, simple_structure):
+        """The viewport frame should follow Panzoom, and toggles should redraw the map."""
+        result = SVGRenderer(simple_structure).render()
+        
+        assert '<canvas id="minimap-canvas"></canvas>' in result
+        assert "elem.addEventListener('panzoomchange', scheduleMinimapView)" in result
+        assert "const data = minimapFromDom();" in result
+    
+    def test_minimap_can_be_disabled(self, simple_structure):
+        """minimap_depth=None should leave the panel and its data out."""
+        result = SVGRenderer(simple_structure, minimap_depth=None).render()
+        
+        assert 'id="minimap-data"' not in result
+        assert 'id="minimap"' not in result
+
+
+class TestSizeReport:
+    """Tests for SVGRenderer.size_report"""
+    
+    def test_report_totals(self, simple_structure):
+        """Bytes, elements and nodes should describe the rendered page."""
+        renderer = SVGRenderer(simple_structure, measure=True)
+        html_output = renderer.render()
+        report = renderer.size_report(html_output)
+        
+        assert report["total_bytes"] == len(html_output.encode("utf-8"))
+        assert report["map_bytes"] + report["page_bytes"] == report["total_bytes"]
+        assert report["nodes"] == 6
+        assert report["elements"] > 6 * 3
+        assert report["estimated_memory_bytes"] > report["total_bytes"]
+    
+    def test_bytes_by_type_add_up_to_the_map(self, simple_structure):
+        """Own sizes per node type should account for every emitted map character."""
+        renderer = SVGRenderer(simple_structure, measure=True)
+        report = renderer.size_report(renderer.render())
+        
+        assert sum(report["bytes_by_type"].values()) == report["map_bytes"]
+        assert set(report["bytes_by_type"]) == {"project", "module", "class", "method", "function"}
+    
+    def test_largest_subtrees_are_ranked(self, deeply_nested_structure):
+        """Largest subtrees should list nested containers biggest first, without the root."""
+        renderer = SVGRenderer(deeply_nested_structure, measure=True)
+        report = renderer.size_report(renderer.render(), top=2)
+        
+        assert [entry["path"] for entry in report["largest_subtrees"]] == ["level_0", "level_0/level_1"]
+        assert report["largest_subtrees"][0]["nodes"] == 6
+        assert report["largest_subtrees"][0]["bytes"] > report["largest_subtrees"][1]["bytes"]
+    
+    def test_chunked_content_is_counted(self, deeply_nested_structure):
+        """Content moved into chunks should still count towards its subtree."""
+        plain = SVGRenderer(deeply_nested_structure, measure=True)
+        plain_report = plain.size_report(plain.render())
+        chunked = SVGRenderer(deeply_nested_structure, measure=True, chunk_depth=1)
+        chunked_report = chunked.size_report(chunked.render())
+        
+        assert chunked_report["largest_subtrees"][0]["bytes"] >= plain_report["largest_subtrees"][0]["bytes"] - 50
+        assert sum(chunked_report["bytes_by_type"].values()) == chunked_report["map_bytes"]
+    
+    def test_requires_measure(self, simple_structure):
+        """Without measure=True no sizes are kept, so the report is refused."""
+        renderer = SVGRenderer(simple_structure)
+        
+        with pytest.raises(ValueError):
+            renderer.size_report(renderer.render())
@@ -0,0 +1,85 @@
+"""Unit tests for sharded multi-page output."""
+import copy
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from code_big_picture.renderer import SVGRenderer
+from code_big_picture.shards import render_sharded, split_structure
+
+
+@pytest.fixture
+def monorepo_structure():
+    """Two top-level packages with clashing slugs plus a root-level module."""
+    return {
+        "name": "Mono", "type": "project", "children": [
+            {"name": "svc a", "type": "package", "children": [
+                {"name": "api.py", "type": "module", "lines": [1, 50], "children": [
+                    {"name": "handler", "type": "function", "lines": [1, 40]},
+                ]},
+            ]},
+            {"name": "svc_a", "type": "directory", "children": [
+                {"name": "job.py", "type": "module", "lines": [1, 5], "children": [
+                    {"name": "run", "type": "function", "lines": [1, 3]},
+                ]},
+            ]},
+            {"name": "README.md", "type": "file"},
+        ]
+    }
+
+
+class TestSplitStructure:
+    """Tests for split_structure"""
+    
+    def test_subtrees_become_linked_summaries(self, monorepo_structure):
+        """Containers at the split depth should turn into aggregate leaves with links."""
+        original = copy.deepcopy(monorepo_structure)
+        
+        overview, shards = split_structure(monorepo_structure, 1, "map_shards")
+        
+        first, second, readme = overview["children"]
+        assert first["type"] == "aggregate" and first["kind"] == "package"
+        assert first["summary"] == "1 module, 1 function"
+        assert first["link"] == "map_shards/svc_a.html"
+        assert second["link"] == "map_shards/svc_a-2.html"
+        assert readme == {"name": "README.md", "type": "file"}
+        assert [name for _, name in shards] == ["svc_a.html", "svc_a-2.html"]
+        assert shards[0][0] is monorepo_structure["children"][0]
+        assert monorepo_structure == original
+
+
+class TestRenderSharded:
+    """Tests for render_sharded"""
+    
+    def test_writes_overview_shards_and_shared_assets(self, monorepo_structure, temp_dir):
+        """Pages should link the shared assets instead of inlining the runtime."""
+        output = temp_dir / "out" / "map.html"
+        
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            written = render_sharded(monorepo_structure, str(output), 1, executor=executor)
+        
+        assert written["overview"] == str(output)
+        assert len(written["shards"]) == 2
+        assert sorted(Path(p).name for p in written["assets"]) == [SVGRenderer.STYLESHEET_FILE, SVGRenderer.RUNTIME_FILE]
+        overview = output.read_text(encoding="utf-8")
+        shard = Path(written["shards"][0]).read_text(encoding="utf-8")
+        assert 'href="map_shards/svc_a.html"' in overview
+        assert f'<script src="{SVGRenderer.RUNTIME_FILE}"></script>' in overview
+        assert f'<script src="../{SVGRenderer.RUNTIME_FILE}"></script>' in shard
+        assert 'href="../map.html"' in shard
+        assert "window.toggleNode" not in shard
+        assert "handler" in shard and "handler" not in overview
+    
+    def test_heat_scale_is_shared_across_pages(self, monorepo_structure, temp_dir):
+        """A shard's colors should be scaled against the whole map, not just itself."""
+        output = temp_dir / "map.html"
+        
+        written = render_sharded(monorepo_structure, str(output), 1, color_by="loc")
+        
+        small_shard = Path(written["shards"][1]).read_text(encoding="utf-8")
+        alone = SVGRenderer(monorepo_structure["children"][1], color_by="loc").render()
+        # Alone, its module and function are the hottest of their type; in the full map they are not
+        assert small_shard.count('fill="hsl(0,') < alone.count('fill="hsl(0,')
@@ -0,0 +1,121 @@
+"""Unit tests for the SQLite symbol store."""
+import copy
+import pytest
+from pathlib import Path
+
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from code_big_picture.renderer import SVGRenderer
+from code_big_picture.symbols import SymbolStore
+
+
+@pytest.fixture
+def project_structure():
+    """A small parsed-looking project with a package, a module and a class."""
+    return {
+        "name": "proj", "type": "project", "children": [
+            {"name": "core", "type": "package", "children": [
+                {"name": "cache.py", "type": "module", "lines": [1, 40], "children": [
+                    {"name": "RenderCache", "type": "class", "lines": [3, 30], "complexity": 4, "children": [
+                        {"name": "get", "type": "method", "lines": [5, 10]},
+                        {"name": "put", "type": "method", "lines": [12, 20]},
+                    ]},
+                    {"name": "make_cache", "type": "function", "lines": [32, 40]},
+                ]},
+            ]},
+            {"name": "main.py", "type": "module", "lines": [1, 5], "children": [
+                {"name": "ParseCache", "type": "function", "lines": [1, 5]},
+            ]},
+        ]
+    }
+
+
+@pytest.fixture
+def store(temp_dir):
+    with SymbolStore(str(temp_dir / "symbols.db")) as symbol_store:
+        yield symbol_store
+
+
+class TestSymbolStoreSearch:
+    """Tests for indexing and querying"""
+
+    def test_index_counts_every_node(self, store, project_structure):
+        assert store.index_structure("/src/proj", project_structure) == 9
+
+    def test_glob_with_type_filter(self, store, project_structure):
+        store.index_structure("/src/proj", project_structure)
+        hits = store.search("*Cache", node_type="class")
+        assert [(h["name"], h["path"], h["lines"]) for h in hits] == [
+            ("RenderCache", "core/cache.py::RenderCache", [3, 30])
+        ]
+        assert {h["name"] for h in store.search("*Cache")} == {"RenderCache", "ParseCache"}
+
+    def test_plain_text_matches_substring(self, store, project_structure):
+        store.index_structure("/src/proj", project_structure)
+        assert {h["name"] for h in store.search("cache")} == {"cache.py", "make_cache"}
+
+    def test_root_filter(self, store, project_structure):
+        store.index_structure("/src/proj", project_structure)
+        other = copy.deepcopy(project_structure)
+        other["name"] = "other"
+        store.index_structure("/src/other", other)
+        assert len(store.search("RenderCache")) == 2
+        assert [h["root"] for h in store.search("RenderCache", root="other")] == ["/src/other"]
+
+    def test_reindex_replaces_root(self, store, project_structure):
+        store.index_structure("/src/proj", project_structure)
+        project_structure["children"].pop()
+        store.index_structure("/src/proj", project_structure)
+        assert store.search("ParseCache") == []
+        assert len(store.search("RenderCache")) == 1
+
+    def test_subtree_round_trips(self, store, project_structure):
+        store.index_structure("/src/proj", project_structure)
+        hit = store.search("RenderCache")[0]
+        assert store.subtree(hit["id"]) == project_structure["children"][0]["children"][0]["children"][0]
+
+    def test_results_structure_renders(self, store, project_structure):
+        store.index_structure("/src/proj", project_structure)
+        structure = store.results_structure(store.search("*Cache"), "*Cache")
+        assert structure["children"][0]["name"] == "/src/proj"
+        names = {child["name"] for child in structure["children"][0]["children"]}
+        assert names == {"core/cache.py::RenderCache", "main.py::ParseCache"}
+        html_output = SVGRenderer(structure).render()
+        assert "RenderCache" in html_output
+
+
+class TestSymbolStoreUpdates:
+    """Tests for per-file incremental updates"""
+
+    def test_changed_file_is_replaced(self, store, project_structure):
+        store.index_structure("/src/proj", project_structure)
+        module = project_structure["children"][0]["children"][0]
+        module["children"][0]["name"] = "LayoutCache"
+        written = store.update_files("/src/proj", project_structure, ["core/cache.py"], [])
+        assert written == 5
+        assert store.search("RenderCache") == []
+        assert [h["path"] for h in store.search("LayoutCache")] == ["core/cache.py::LayoutCache"]
+        assert len(store.search("ParseCache")) == 1
+
+    def test_new_file_in_new_directory(self, store, project_structure):
+        store.index_structure("/src/proj", project_structure)
+        project_structure["children"].append({"name": "tools", "type": "directory", "children": [
+            {"name": "gen.py", "type": "module", "lines": [1, 3], "children": [
+                {"name": "GenCache", "type": "class", "lines": [1, 3]},
+            ]},
+        ]})
+        store.update_files("/src/proj", project_structure, ["tools/gen.py"], [])
+        hit = store.search("tools", node_type="directory")[0]
+        assert store.subtree(hit["id"]) == project_structure["children"][-1]
+
+    def test_deleting_last_file_prunes_directory(self, store, project_structure):
+        store.index_structure("/src/proj", project_structure)
+        project_structure["children"].pop(0)
+        store.update_files("/src/proj", project_structure, [], ["core/cache.py"])
+        assert store.search("core") == []
+        assert store.search("RenderCache") == []
+        assert len(store.search("ParseCache")) == 1
+
+    def test_unknown_root_falls_back_to_full_index(self, store, project_structure):
+        assert store.update_files("/src/proj", project_structure, ["main.py"], []) == 9
@@ -0,0 +1,102 @@
+"""Unit tests for the deep-zoom tile export."""
+import json
+import math
+import re
+import pytest
+from pathlib import Path
+
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from code_big_picture.renderer import SVGRenderer
+from code_big_picture.tiles import export_tiles
+
+
+@pytest.fixture
+def wide_structure():
+    """A project with enough modules to span several tile levels."""
+    return {
+        "name": "Org", "type": "project", "children": [
+            {"name": f"pkg_{p}", "type": "package", "children": [
+                {"name": f"mod_{m}.py", "type": "module", "children": [
+                    {"name": f"func_{f}", "type": "function"} for f in range(6)
+                ]} for m in range(8)
+            ]} for p in range(6)
+        ]
+    }
+
+
+class TestLayoutBoxes:
+    """Tests for SVGRenderer.layout_boxes"""
+    
+    def test_root_matches_rendered_size(self, wide_structure):
+        """The root box should have the size the SVG layout computes."""
+        boxes = SVGRenderer(wide_structure).layout_boxes()
+        _, w, h = SVGRenderer(wide_structure)._generate_box(wide_structure)
+        
+        assert boxes[0][:4] == (0.0, 0.0, w, h)
+        assert len(boxes) == 1 + 6 + 6 * 8 + 6 * 8 * 6
+    
+    def test_children_sit_inside_their_parents(self, wide_structure):
+        """Every box should lie within the box of its parent."""
+        boxes = SVGRenderer(wide_structure).layout_boxes()
+        by_node = {id(box[5]): box for box in boxes}
+        
+        for x, y, w, h, depth, node in boxes:
+            for child in node.get("children", []):
+                cx, cy, cw, ch, child_depth, _ = by_node[id(child)]
+                assert child_depth == depth + 1
+                assert x <= cx and cx + cw <= x + w
+                assert y <= cy and cy + ch <= y + h
+
+
+class TestExportTiles:
+    """Tests for export_tiles"""
+    
+    def test_writes_pyramid_metadata_and_viewer(self, wide_structure, temp_dir):
+        """The export should write a level-0 tile, tiles.json and the viewer page."""
+        meta = export_tiles(SVGRenderer(wide_structure), str(temp_dir), tile_size=128)
+        
+        assert meta["levels"] > 2
+        assert meta["tiles"][0] == 1
+        assert json.loads((temp_dir / "tiles.json").read_text(encoding="utf-8")) == meta
+        assert (temp_dir / "tiles" / "0" / "0_0.svg").exists()
+        viewer = (temp_dir / "index.html").read_text(encoding="utf-8")
+        assert "Panzoom(world" in viewer
+        assert "'tiles/' + key + '.svg'" in viewer
+    
+    def test_small_boxes_only_appear_at_deep_levels(self, wide_structure, temp_dir):
+        """Functions should be culled from the overview tile but drawn when zoomed in."""
+        meta = export_tiles(SVGRenderer(wide_structure), str(temp_dir), tile_size=128, min_pixels=8)
+        overview = (temp_dir / "tiles" / "0" / "0_0.svg").read_text(encoding="utf-8")
+        deepest = meta["levels"] - 1
+        deep_tiles = list((temp_dir / "tiles" / str(deepest)).glob("*.svg"))
+        
+        assert "func_" not in overview
+        assert any("func_" in tile.read_text(encoding="utf-8") for tile in deep_tiles)
+    
+    def test_tiles_only_hold_intersecting_boxes(self, wide_structure, temp_dir):
+        """Each rect in a tile should overlap that tile's viewBox."""
+        export_tiles(SVGRenderer(wide_structure), str(temp_dir), tile_size=128)
+        
+        for tile in (temp_dir / "tiles").glob("*/*.svg"):
+            content = tile.read_text(encoding="utf-8")
+            x0, y0, side, _ = map(float, re.search(r'viewBox="([^"]+)"', content).group(1).split())
+            for x, y, w, h in re.findall(r'<rect x="([^"]+)" y="([^"]+)" width="([^"]+)" height="([^"]+)"', content):
+                x, y, w, h = map(float, (x, y, w, h))
+                assert x < x0 + side and x + w > x0 and y < y0 + side and y + h > y0
+    
+    def test_flat_tiles_are_skipped(self, temp_dir):
+        """Tiles entirely inside one unlabeled stretch of a box should not be written."""
+        structure = {"name": "P", "type": "project", "children": [
+            {"name": "m.py", "type": "module", "children": [
+                {"name": f"f{i}", "type": "function"} for i in range(40)
+            ]}
+        ]}
+        
+        meta = export_tiles(SVGRenderer(structure), str(temp_dir), tile_size=16)
+        
+        deepest = meta["levels"] - 1
+        side = meta["world"] / 2 ** deepest
+        covering = math.ceil(meta["width"] / side) * math.ceil(meta["height"] / side)
+        assert 0 < meta["tiles"][deepest] < covering